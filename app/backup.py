@@ -0,0 +1,389 @@
+"""Whole-database export, import and scheduled backups.
+
+Exports are point-in-time snapshots written with VACUUM INTO, which reads
+inside one transaction while writers carry on. The latest snapshot is kept
+and served again for as long as the data version it was taken at (schema
+version plus every table version) is current.
+
+An uploaded replacement is streamed to a temp file next to the database, checked
+(integrity_check, expected tables and columns) and brought up to the
+current schema there. Only then are its pages copied into the live file
+with SQLite's online backup API, which writes through SQLite's own locking
+in a single transaction: open connections never see a half-written file
+and a failed copy leaves the old data in place. Everything past the
+upload runs in worker threads.
+
+Scheduled backups are copied with the online backup API a few pages at a
+time, sleeping between steps, inside one read transaction: writers carry
+on, the copy is consistent and it never restarts. A backup is skipped when
+nothing changed since the last one. The newest backup of each of the last
+KEEP_HOURLY hours and KEEP_DAILY days is kept.
+
+    ROADMAP_BACKUP_DIR           where backups go (default: backups/ beside the database)
+    ROADMAP_BACKUP_INTERVAL      seconds between backups; 0 disables them (default 3600)
+    ROADMAP_BACKUP_KEEP_HOURLY   hourly backups kept (default 24)
+    ROADMAP_BACKUP_KEEP_DAILY    daily backups kept (default 7)
+    ROADMAP_BACKUP_STEP_PAGES    pages copied per step (default 256)
+    ROADMAP_BACKUP_STEP_SLEEP    seconds slept between steps (default 0.005)
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.database import Base, DATABASE_PATH, SQLITE_PRAGMAS, apply_sqlite_pragmas
+from app import models, migrations, rollups, versions  # noqa: F401  (models registers the tables)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+BACKUP_DIR = os.getenv("ROADMAP_BACKUP_DIR") or os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), "backups")
+BACKUP_INTERVAL = float(os.getenv("ROADMAP_BACKUP_INTERVAL", "3600"))
+KEEP_HOURLY = int(os.getenv("ROADMAP_BACKUP_KEEP_HOURLY", "24"))
+KEEP_DAILY = int(os.getenv("ROADMAP_BACKUP_KEEP_DAILY", "7"))
+STEP_PAGES = int(os.getenv("ROADMAP_BACKUP_STEP_PAGES", "256"))
+STEP_SLEEP = float(os.getenv("ROADMAP_BACKUP_STEP_SLEEP", "0.005"))
+
+BACKUP_NAME = "roadmap-%Y%m%d-%H%M%S.db"
+BACKUP_PATTERN = re.compile(r"roadmap-\d{8}-\d{6}\.db")
+
+BackupInfo = namedtuple("BackupInfo", "name created_at size")
+
+# Tables an importable file must have; the rest are created or rebuilt on import
+REQUIRED_TABLES = ("members", "goals", "milestones", "tasks", "ideas", "comments")
+
+# Added by migrations, so files from older versions may lack them
+MIGRATED_COLUMNS = {"task_count", "task_progress_sum", "change_seq"}
+
+
+class InvalidDatabase(Exception):
+    pass
+
+
+def busy_timeout():
+    return int(SQLITE_PRAGMAS["busy_timeout"]) / 1000
+
+
+async def receive(upload):
+    """Stream an UploadFile to a temp file beside the database, a chunk at a time. Returns its path."""
+    path = _temp_path(".import-")
+    try:
+        with open(path, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        discard(path)
+        raise
+    return path
+
+
+def _temp_path(prefix):
+    directory = os.path.dirname(os.path.abspath(DATABASE_PATH))
+    fd, path = tempfile.mkstemp(suffix=".db", prefix=prefix, dir=directory)
+    os.close(fd)
+    return path
+
+
+def discard(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def validate(path):
+    """Raise InvalidDatabase unless `path` is an intact SQLite file with the roadmap tables."""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            if problems != ["ok"]:
+                raise InvalidDatabase(f"integrity check failed: {'; '.join(problems[:5])}")
+            for table in REQUIRED_TABLES:
+                found = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if not found:
+                    raise InvalidDatabase(f"missing table {table}")
+                expected = {column.name for column in Base.metadata.tables[table].columns} - MIGRATED_COLUMNS
+                missing = expected - found
+                if missing:
+                    names = ", ".join(f"{table}.{name}" for name in sorted(missing))
+                    raise InvalidDatabase(f"missing columns {names}")
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as error:
+        raise InvalidDatabase(str(error))
+
+
+def prepare(path):
+    """Validate the file and migrate it, with a fresh epoch and rebuilt rollups, before it goes live."""
+    validate(path)
+    candidate = create_engine(f"sqlite:///{path}")
+    event.listen(candidate, "connect", apply_sqlite_pragmas)
+    try:
+        Base.metadata.create_all(bind=candidate)
+        migrations.upgrade(candidate)
+        with Session(candidate) as db:
+            rollups.rebuild(db)
+            versions.new_epoch(db.connection())
+            db.commit()
+        with candidate.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        candidate.dispose()
+    _match_page_size(path)
+
+
+def _match_page_size(path):
+    # A backup into a WAL database fails unless both use the same page size
+    if not os.path.exists(DATABASE_PATH):
+        return
+    live = sqlite3.connect(DATABASE_PATH, timeout=busy_timeout())
+    try:
+        page_size = live.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        live.close()
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("PRAGMA page_size").fetchone()[0] != page_size:
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.execute(f"PRAGMA page_size = {page_size}")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def copy_database(source_path, target_path, pages=-1, sleep=0.0):
+    """Copy one database into another with the backup API; `pages` per step, `sleep` seconds between steps."""
+    source = sqlite3.connect(source_path, timeout=busy_timeout())
+    try:
+        target = sqlite3.connect(target_path, timeout=busy_timeout())
+        try:
+            apply_sqlite_pragmas(target)
+            source.backup(target, pages=pages, sleep=sleep)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def restore(path):
+    """Validate, migrate and copy `path` over the live database."""
+    prepare(path)
+    copy_database(path, DATABASE_PATH)
+
+
+def data_version(conn):
+    """Schema version plus every table version; changes with any write to the database."""
+    schema = conn.execute("PRAGMA user_version").fetchone()[0]
+    return (schema,) + tuple(conn.execute("SELECT name, version FROM table_versions ORDER BY name"))
+
+
+def snapshot(path):
+    """Write a consistent, compacted copy of the live database to `path`. Returns its data version."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=busy_timeout(), isolation_level=None)
+    try:
+        conn.execute("VACUUM INTO ?", (path,))
+    finally:
+        conn.close()
+    # Read from the copy, so the version is exactly the one it was taken at
+    copy = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return data_version(copy)
+    finally:
+        copy.close()
+
+
+class SnapshotCache:
+    """The latest export snapshot, reused until the live data version moves on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.path = None
+        self.version = None
+
+    def open(self):
+        """An open file of a snapshot of the current data, taking a new one if needed."""
+        with self._lock:
+            live = sqlite3.connect(DATABASE_PATH, timeout=busy_timeout())
+            try:
+                version = data_version(live)
+            finally:
+                live.close()
+            if self.path is None or version != self.version:
+                path = _temp_path(".snapshot-")
+                try:
+                    version = snapshot(path)
+                except BaseException:
+                    discard(path)
+                    raise
+                if self.path is not None:
+                    # Downloads still reading the old file keep their open handle
+                    discard(self.path)
+                self.path, self.version = path, version
+            return open(self.path, "rb")
+
+    def clear(self):
+        with self._lock:
+            if self.path is not None:
+                discard(self.path)
+            self.path = self.version = None
+
+
+snapshots = SnapshotCache()
+
+
+def read_chunks(file, compress=None):
+    """Chunks of an open file, gzip-compressed on the fly when `compress` is "gzip". Closes the file."""
+    encoder = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress == "gzip" else None
+    try:
+        while chunk := file.read(CHUNK_SIZE):
+            if encoder is not None:
+                chunk = encoder.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+        if encoder is not None:
+            yield encoder.flush()
+    finally:
+        file.close()
+
+
+def remove_stale():
+    """Delete temp files and unfinished backups a previous process left behind."""
+    directory = os.path.dirname(os.path.abspath(DATABASE_PATH))
+    for name in os.listdir(directory):
+        if name.startswith((".import-", ".snapshot-")) and name.endswith(".db"):
+            discard(os.path.join(directory, name))
+    if os.path.isdir(BACKUP_DIR):
+        for name in os.listdir(BACKUP_DIR):
+            if name.endswith(".partial"):
+                discard(os.path.join(BACKUP_DIR, name))
+
+
+def list_backups():
+    """Backups in BACKUP_DIR, newest first."""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    backups = [
+        BackupInfo(name, datetime.strptime(name, BACKUP_NAME), os.path.getsize(os.path.join(BACKUP_DIR, name)))
+        for name in os.listdir(BACKUP_DIR) if BACKUP_PATTERN.fullmatch(name)
+    ]
+    return sorted(backups, key=lambda backup: backup.created_at, reverse=True)
+
+
+def backup_path(name):
+    """Path of the backup called `name`, or None when there is none (or the name isn't one)."""
+    if not BACKUP_PATTERN.fullmatch(name):
+        return None
+    path = os.path.join(BACKUP_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def _backup_version(name):
+    conn = sqlite3.connect(f"file:{os.path.join(BACKUP_DIR, name)}?mode=ro", uri=True)
+    try:
+        return data_version(conn)
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+
+
+_backup_lock = threading.Lock()
+
+
+def take_backup(now=None, prune_old=True):
+    """Back up the live database unless it is unchanged since the newest backup. Returns the newest backup."""
+    with _backup_lock:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        backups = list_backups()
+        source = sqlite3.connect(DATABASE_PATH, timeout=busy_timeout(), isolation_level=None)
+        try:
+            # Held for the whole copy, so every step reads the same snapshot and writers never restart it
+            source.execute("BEGIN")
+            version = data_version(source)
+            if backups and _backup_version(backups[0].name) == version:
+                return backups[0]
+            name = (now or datetime.now()).strftime(BACKUP_NAME)
+            path = os.path.join(BACKUP_DIR, name)
+            if os.path.exists(path):
+                return backups[0]
+            partial = path + ".partial"
+            target = sqlite3.connect(partial)
+            try:
+                # sqlite3 only sleeps between steps when busy, so pause in the progress callback
+                source.backup(target, pages=STEP_PAGES, progress=lambda *args: time.sleep(STEP_SLEEP))
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+            source.execute("COMMIT")
+        finally:
+            source.close()
+        os.replace(partial, path)
+        if prune_old:
+            prune()
+        return list_backups()[0]
+
+
+def retained(backups):
+    """Names to keep: the newest backup of each of the last KEEP_HOURLY hours and KEEP_DAILY days."""
+    keep, hours, days = set(), set(), set()
+    for backup in backups:
+        hour = backup.created_at.strftime("%Y%m%d%H")
+        day = backup.created_at.strftime("%Y%m%d")
+        if hour not in hours and len(hours) < KEEP_HOURLY:
+            hours.add(hour)
+            keep.add(backup.name)
+        if day not in days and len(days) < KEEP_DAILY:
+            days.add(day)
+            keep.add(backup.name)
+    return keep
+
+
+def prune():
+    backups = list_backups()
+    keep = retained(backups)
+    for backup in backups:
+        if backup.name not in keep:
+            discard(os.path.join(BACKUP_DIR, backup.name))
+
+
+def restore_backup(name):
+    """Restore the backup called `name` over the live database; the backup itself is left as it was."""
+    source = backup_path(name)
+    path = _temp_path(".import-")
+    try:
+        shutil.copyfile(source, path)
+        # Keep the data being replaced, so the restore can be undone. Without pruning: the new backup takes
+        # this hour's slot, and the one being restored may be the one it would push out
+        take_backup(prune_old=False)
+        restore(path)
+    finally:
+        discard(path)
+
+
+async def run_scheduler():
+    """Take a backup every BACKUP_INTERVAL seconds, counting from the newest one so restarts keep the pace."""
+    backups = await run_in_threadpool(list_backups)
+    delay = 0
+    if backups:
+        delay = max(0.0, BACKUP_INTERVAL - (datetime.now() - backups[0].created_at).total_seconds())
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await run_in_threadpool(take_backup)
+        except Exception:
+            logger.exception("Scheduled backup failed")
+        delay = BACKUP_INTERVAL
@@ -0,0 +1,143 @@
+"""In-process cache of rendered JSON for the aggregate read endpoints.
+
+Entries are keyed by endpoint and parameters and tagged with the tables they
+read and the year they cover (None when they span every year). Write
+handlers call `invalidate` with the tables they touched and the year(s)
+affected once their transaction has committed, so entries for other years
+survive. Each entry also keeps the ETag (the table versions, see
+app.versions) it was built under, and is only served with that same ETag:
+writes made outside this process (CLI tools, other workers) bump the
+versions, which turns the entry into a miss. The TTL only bounds how long
+unused entries hold memory.
+
+    ROADMAP_CACHE_MAX_BYTES   size bound; 0 disables the cache (default 64 MiB)
+    ROADMAP_CACHE_TTL         seconds an entry is kept (default 300)
+"""
+import os
+import time
+from collections import OrderedDict, namedtuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+_Entry = namedtuple("_Entry", "body tables year version expires")
+
+
+class ResponseCache:
+    """LRU of JSON bodies bounded by total size, with a TTL per entry.
+
+    Entries are stored, looked up and evicted by coroutines on the event loop only (a build
+    awaits its queries in the threadpool, but the body is put on the loop), so the OrderedDict
+    and `size` need no lock.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.size = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, version=None):
+        """The body cached for `key`, if it was built under `version`."""
+        entry = self._entries.get(key)
+        if entry is not None and (entry.version != version or entry.expires <= time.monotonic()):
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.body
+
+    def put(self, key, body, tables, year, version=None):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _Entry(
+            body, frozenset(tables), year, version, time.monotonic() + self.ttl
+        )
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        self.size -= len(self._entries.pop(key).body)
+
+    def invalidate(self, tables, *years):
+        """Drop entries that read any of `tables` for one of `years` (every year when none are given)."""
+        self._generation += 1
+        tables = set(tables)
+        for key, entry in list(self._entries.items()):
+            if entry.tables & tables and (not years or entry.year is None or entry.year in years):
+                self._drop(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    async def serve(self, response: Response, key, tables, year, build):
+        """Return the cached body for `key`, or await `build()` and cache its rendered JSON.
+
+        Headers already set on `response` are carried over. Its ETag is the version the body is
+        cached under: a body built under other table versions is never sent with it.
+        """
+        version = response.headers.get("ETag")
+        body = self.get(key, version)
+        if body is None:
+            generation = self._generation
+            body = ORJSONResponse(jsonable_encoder(await build())).body
+            # A write that committed while building may not be reflected in it
+            if generation == self._generation:
+                self.put(key, body, tables, year, version)
+        return Response(body, media_type="application/json", headers=dict(response.headers))
+
+    def stream(self, response: Response, key, tables, year, chunks, media_type="application/json"):
+        """Like `serve` for a streamed body: `chunks()` yields bytes, kept for the cache as they go out."""
+        version = response.headers.get("ETag")
+        body = self.get(key, version)
+        if body is not None:
+            return Response(body, media_type=media_type, headers=dict(response.headers))
+        return StreamingResponse(
+            self._tee(key, tables, year, version, chunks()), media_type=media_type, headers=dict(response.headers)
+        )
+
+    async def _tee(self, key, tables, year, version, chunks):
+        generation = self._generation
+        parts, size = [], 0
+        async for chunk in chunks:
+            yield chunk
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None  # can't fit the cache anyway
+                else:
+                    parts.append(chunk)
+        if parts is not None and generation == self._generation:
+            self.put(key, b"".join(parts), tables, year, version)
+
+
+response_cache = ResponseCache(
+    max_bytes=int(os.getenv("ROADMAP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("ROADMAP_CACHE_TTL", "300")),
+)
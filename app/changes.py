@@ -0,0 +1,146 @@
+"""Incremental change feed for client-side mirrors.
+
+Triggers (see migrations) stamp every row written to an entity table with
+the next number of one database-wide sequence (`change_seq`), and record a
+tombstone in `deletions` for every row deleted. A client keeps the token of
+its last sync and asks for everything stamped after it: the rows as they
+are now, and the ids deleted since. Rows updated several times come back
+once, so a sync costs what changed, not how often.
+
+A token is `<epoch>.<seq>`. One from another copy of the data (an imported
+or restored file) or older than the pruned tombstones can't be continued
+from; the client is told to reset and gets everything again.
+
+    ROADMAP_DELETIONS_KEEP_DAYS       days tombstones are kept (default 30)
+    ROADMAP_DELETIONS_PRUNE_INTERVAL  seconds between prunes; 0 prunes at startup only (default 86400)
+"""
+import asyncio
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models, versions
+from app.database import SessionLocal, begin_write, write_lock
+from app.migrations import CHANGE_TABLES
+
+KEEP_DAYS = int(os.getenv("ROADMAP_DELETIONS_KEEP_DAYS", "30"))
+PRUNE_INTERVAL = float(os.getenv("ROADMAP_DELETIONS_PRUNE_INTERVAL", "86400"))
+
+logger = logging.getLogger(__name__)
+
+# table_versions rows: the last sequence number handed out, and the newest tombstone pruned
+CHANGES = "changes"
+PRUNED = "deletions_pruned"
+
+MODELS = {
+    "goals": models.Goal, "milestones": models.Milestone, "tasks": models.Task, "members": models.Member,
+    "ideas": models.Idea, "comments": models.Comment,
+}
+
+
+def encode_token(epoch, seq):
+    return f"{epoch}.{seq}"
+
+
+def decode_token(token):
+    """(epoch, seq), or None for a malformed token."""
+    epoch, _, seq = (token or "").partition(".")
+    if not (epoch.isdigit() and seq.isdigit()):
+        return None
+    return int(epoch), int(seq)
+
+
+def _counters(db: Session):
+    rows = db.execute(
+        select(models.TableVersion.name, models.TableVersion.version)
+        .where(models.TableVersion.name.in_((versions.EPOCH, CHANGES, PRUNED)))
+    ).all()
+    return {name: version for name, version in rows}
+
+
+def _row_changes(db: Session, table, since, limit):
+    model = MODELS[table]
+    columns = [column for column in model.__table__.columns if column.name != "change_seq"]
+    rows = db.execute(
+        select(model.change_seq, *columns).where(model.change_seq > since).order_by(model.change_seq).limit(limit)
+    )
+    for row in rows:
+        seq, *values = row
+        yield seq, "upsert", CHANGE_TABLES[table], dict(zip((column.name for column in columns), values))
+
+
+def _deletions(db: Session, since, limit):
+    rows = db.execute(
+        select(models.Deletion.seq, models.Deletion.entity, models.Deletion.entity_id)
+        .where(models.Deletion.seq > since).order_by(models.Deletion.seq).limit(limit)
+    )
+    for seq, entity, entity_id in rows:
+        yield seq, "delete", entity, entity_id
+
+
+def changes_since(db: Session, token=None, limit=1000):
+    """Up to `limit` row writes and deletions after `token`, oldest first, with the token to continue from.
+
+    Deletes in a page are older than any upsert of the same id, so apply them first.
+    """
+    # SELECTs don't open a transaction by themselves; without one, a write committing between the
+    # reads of two tables could land behind the returned token and never be sent
+    db.connection().exec_driver_sql("BEGIN")
+    counters = _counters(db)
+    epoch = counters.get(versions.EPOCH, 0)
+    decoded = decode_token(token)
+    reset = decoded is None or decoded[0] != epoch or decoded[1] < counters.get(PRUNED, 0)
+    since = 0 if reset else decoded[1]
+
+    # Each source is already in sequence order; merge them and keep the first `limit`
+    sources = [_row_changes(db, table, since, limit + 1) for table in MODELS] + [_deletions(db, since, limit + 1)]
+    page = list(heapq.merge(*sources, key=lambda change: change[0]))
+    more = len(page) > limit
+    page = page[:limit]
+
+    upserts, deletes = {}, {}
+    for _, kind, entity, payload in page:
+        if kind == "upsert":
+            upserts.setdefault(entity, []).append(payload)
+        else:
+            deletes.setdefault(entity, []).append(payload)
+    last = page[-1][0] if page else since
+    if not more:
+        # Numbers up to the counter that weren't read were superseded by later stamps on the same rows
+        last = max(last, counters.get(CHANGES, 0))
+    return {
+        "token": encode_token(epoch, last), "reset": reset, "more": more, "upserts": upserts, "deletes": deletes,
+    }
+
+
+def prune_deletions(keep_days=KEEP_DAYS, now=None):
+    """Drop tombstones older than `keep_days`; tokens from before the newest dropped one must reset."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=keep_days)
+    db = SessionLocal()
+    try:
+        begin_write(db)
+        newest = db.scalar(select(func.max(models.Deletion.seq)).where(models.Deletion.deleted_at < cutoff))
+        if newest is None:
+            return 0
+        pruned = db.execute(delete(models.Deletion).where(models.Deletion.seq <= newest)).rowcount
+        db.merge(models.TableVersion(name=PRUNED, version=newest))
+        db.commit()
+        return pruned
+    finally:
+        db.close()
+
+
+async def run_pruner():
+    """Prune tombstones every PRUNE_INTERVAL seconds, so a server that stays up doesn't keep them all."""
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL)
+        try:
+            async with write_lock():
+                await run_in_threadpool(prune_deletions)
+        except Exception:
+            logger.exception("Pruning deletions failed")
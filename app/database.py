@@ -1,20 +1,214 @@
-from sqlalchemy import create_engine
+import asyncio
+import os
+import weakref
+from contextlib import AsyncExitStack
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import CursorResult, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+SQLALCHEMY_DATABASE_URL = os.getenv("ROADMAP_DATABASE_URL", "sqlite:///./roadmap.db")
+DATABASE_PATH = make_url(SQLALCHEMY_DATABASE_URL).database
+
+# Serve requests through aiosqlite on the event loop instead of sync sessions in the threadpool
+USE_ASYNC_DB = os.getenv("ROADMAP_ASYNC_DB", "").lower() in ("1", "true", "yes")
+
+POOL_SIZE = int(os.getenv("ROADMAP_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("ROADMAP_DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = int(os.getenv("ROADMAP_DB_POOL_TIMEOUT", "30"))
+
+# Applied to every new connection; each can be overridden with ROADMAP_SQLITE_<NAME>.
+# WAL lets readers run alongside the single writer, and busy_timeout makes a second
+# writer wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    name: os.getenv(f"ROADMAP_SQLITE_{name.upper()}", default)
+    for name, default in {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",         # ms
+        "mmap_size": "268435456",       # 256 MiB
+        "cache_size": "-65536",         # negative = KiB, so 64 MiB
+        "temp_store": "MEMORY",
+    }.items()
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./roadmap.db"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},
+    pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT
 )
+event.listen(engine, "connect", apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    async_engine = create_async_engine(
+        make_url(SQLALCHEMY_DATABASE_URL).set(drivername="sqlite+aiosqlite"),
+        poolclass=AsyncAdaptedQueuePool, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT
+    )
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    # Async sessions can't lazy-load, so attributes must stay usable after commit
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+async def close_db_connections():
+    """Close pooled connections so none keeps pages of a database that was replaced underneath it"""
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+class ThreadedSession:
+    """The subset of AsyncSession the routers use, backed by a sync Session.
+
+    Each database call runs in the threadpool, so handlers are written once
+    against the async API whether or not aiosqlite is enabled.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        # Buffer rows in the worker thread, like AsyncSession does
+        def execute():
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            if isinstance(result, CursorResult) and not result.returns_rows:
+                return result
+            return result.freeze()()
+        return await run_in_threadpool(execute)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+# A threaded session keeps its pooled connection between threadpool hops. Waiting for a free
+# connection must happen on the event loop, or blocked workers can starve the requests that
+# would release one.
+_session_slots = weakref.WeakKeyDictionary()
+
+
+def _threaded_session_slots():
+    loop = asyncio.get_running_loop()
+    if loop not in _session_slots:
+        _session_slots[loop] = asyncio.Semaphore(POOL_SIZE + MAX_OVERFLOW)
+    return _session_slots[loop]
+
+
+# Write requests queue here, in arrival order, before taking SQLite's write lock. Left to the
+# busy handler, which retries blindly, a writer can lose every race for busy_timeout under load.
+_write_locks = weakref.WeakKeyDictionary()
+
+
+def write_lock():
+    loop = asyncio.get_running_loop()
+    if loop not in _write_locks:
+        _write_locks[loop] = asyncio.Lock()
+    return _write_locks[loop]
+
+
+def begin_write(session):
+    """Open the session's transaction with SQLite's write lock already taken.
+
+    pysqlite only begins a transaction at the first INSERT/UPDATE/DELETE, so a row a write
+    handler reads before that can be changed by another writer before it writes, and
+    counters moved by deltas taken from it drift. After BEGIN IMMEDIATE every read is current.
+    """
+    session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def get_async_db(request: Request):
+    """A session for the request; for anything but a read, one that holds the write lock."""
+    write = request.method not in ("GET", "HEAD", "OPTIONS")
+    async with AsyncExitStack() as stack:
+        if write:
+            await stack.enter_async_context(write_lock())
+        if USE_ASYNC_DB:
+            db = await stack.enter_async_context(AsyncSessionLocal())
+        else:
+            await stack.enter_async_context(_threaded_session_slots())
+            db = ThreadedSession(SessionLocal(expire_on_commit=False))
+            stack.push_async_callback(db.close)
+        if write:
+            await db.run_sync(begin_write)
+        yield db
+
+
+async def stream_rows(statement, batch_size=500):
+    """Yield the rows of a Core select in batches, on a connection of their own.
+
+    Streaming responses outlive the request's session, and rows are fetched as the
+    client consumes them rather than buffered up front.
+    """
+    if USE_ASYNC_DB:
+        async with async_engine.connect() as conn:
+            result = await conn.stream(statement)
+            async for batch in result.partitions(batch_size):
+                yield batch
+    else:
+        async with _threaded_session_slots():
+            conn = await run_in_threadpool(engine.connect)
+            try:
+                result = await run_in_threadpool(conn.execute, statement)
+                while batch := await run_in_threadpool(result.fetchmany, batch_size):
+                    yield batch
+            finally:
+                await run_in_threadpool(conn.close)
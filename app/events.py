@@ -0,0 +1,134 @@
+"""In-process pub/sub of change notifications, fanned out to `/api/events`.
+
+Write handlers call `event_bus.publish` once their transaction has committed, with
+the entity, id, year and op they changed. Each notification is encoded as
+one Server-Sent Event up front and put on every subscriber's queue, so the
+cost of a write is one `put_nowait` per open connection.
+
+Queues are bounded. A client that falls behind has its queue replaced by a
+single `resync` event and is expected to reload what it shows. A short
+history lets a reconnecting EventSource pick up after its `Last-Event-ID`;
+ids carry a per-process prefix, so a client coming back after a restart
+(or from further back than the history reaches) is told to resync as well.
+
+Idle connections cost a queue and a suspended coroutine: one heartbeat
+task writes an SSE comment to every queue, so no connection keeps a timer
+of its own. Writes made outside this process are not seen.
+
+    ROADMAP_EVENTS_QUEUE       events buffered per client (default 256)
+    ROADMAP_EVENTS_HISTORY     events kept for Last-Event-ID replay (default 1024)
+    ROADMAP_EVENTS_HEARTBEAT   seconds between heartbeats (default 15)
+"""
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+
+QUEUE_SIZE = int(os.getenv("ROADMAP_EVENTS_QUEUE", "256"))
+HISTORY_SIZE = int(os.getenv("ROADMAP_EVENTS_HISTORY", "1024"))
+HEARTBEAT_INTERVAL = float(os.getenv("ROADMAP_EVENTS_HEARTBEAT", "15"))
+
+RETRY_MS = 3000
+HEARTBEAT = b": ping\n\n"
+
+
+def _encode(event_id, name, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {name}\ndata: {payload}\n\n".encode()
+
+
+class EventBus:
+    """Fan-out of encoded events to bounded per-subscriber queues.
+
+    asyncio queues aren't thread-safe: publish from the event loop, as the handlers do after
+    their commit, never from the threadpool.
+    """
+
+    def __init__(self, queue_size, history_size):
+        self.queue_size = queue_size
+        self.prefix = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self.published = self.overflows = 0
+
+    def _resync(self):
+        return _encode(f"{self.prefix}-{self.sequence}", "resync", {})
+
+    def publish(self, entity, op, id=None, year=None, parent=None):
+        """Notify subscribers that `entity` `id` was created, updated or deleted (`op`).
+
+        `parent` is the goal of a milestone, the milestone of a task or the idea of a comment.
+        `op="reset"` with no entity means anything may have changed.
+        """
+        self.sequence += 1
+        data = {"entity": entity, "id": id, "year": year, "op": op}
+        if parent is not None:
+            data["parent"] = parent
+        message = _encode(f"{self.prefix}-{self.sequence}", "change", data)
+        self._history.append((self.sequence, message))
+        self.published += 1
+        for queue in self._subscribers:
+            self._put(queue, message)
+
+    def _put(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind for the events to be worth sending one by one
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self._resync())
+            self.overflows += 1
+
+    def subscribe(self, last_event_id=None):
+        """A new queue, primed with what was missed since `last_event_id`."""
+        queue = asyncio.Queue(self.queue_size)
+        if last_event_id:
+            prefix, _, sequence = last_event_id.partition("-")
+            oldest = self._history[0][0] if self._history else self.sequence + 1
+            if prefix != self.prefix or not sequence.isdigit() or int(sequence) < oldest - 1:
+                self._put(queue, self._resync())
+            else:
+                for number, message in self._history:
+                    if number > int(sequence):
+                        self._put(queue, message)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def heartbeat(self):
+        for queue in self._subscribers:
+            # A queue with events waiting is about to write anyway
+            if queue.empty():
+                queue.put_nowait(HEARTBEAT)
+
+    async def run_heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            self.heartbeat()
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+            "last_event_id": f"{self.prefix}-{self.sequence}",
+        }
+
+    async def stream(self, last_event_id=None):
+        """Encoded SSE for a new subscriber until the client goes away."""
+        # Subscribed on first iteration, so a response that is never sent leaves nothing behind
+        queue = self.subscribe(last_event_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+
+event_bus = EventBus(QUEUE_SIZE, HISTORY_SIZE)
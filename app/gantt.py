@@ -0,0 +1,184 @@
+"""Gantt rows for Frappe Gantt, streamed straight from one ordered query.
+
+The goal/milestone/task tree is read as a single LEFT JOIN ordered by goal,
+milestone and task id. Only the columns the chart needs are selected. Items
+are rendered as each batch of rows arrives, so memory stays flat however
+large the roadmap is.
+
+A `start`/`end` window keeps only the items whose dates overlap it, plus the
+milestones and goals above them. The date indexes lead with the end column,
+so the index range covers everything ending on or after `start`.
+
+The columnar format sends the same items as one array per field, in NDJSON
+lines of one batch each. Rows point at their parent by index (counted from
+the first item of the response, so into an earlier line if need be) instead
+of a "goal-12" string, names carry no indentation, and dates are day offsets
+from the line's `base`.
+"""
+import orjson
+from sqlalchemy import and_, or_, select
+
+from app import models
+from app.database import stream_rows
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# `type` values of the columnar format index into this
+COLUMNAR_TYPES = ("goal", "milestone", "task")
+COLUMNAR_FIELDS = ("type", "id", "parent", "name", "start", "end", "progress", "goal_type")
+
+
+def overlaps(start_column, end_column, start=None, end=None):
+    """Rows whose [start_column, end_column] overlaps the window; either bound may be open."""
+    conditions = []
+    if start:
+        conditions.append(end_column >= start)
+    if end:
+        conditions.append(start_column <= end)
+    return and_(*conditions)
+
+
+def rows_query(year=None, start=None, end=None):
+    goal, milestone, task = models.Goal, models.Milestone, models.Task
+    windowed = start is not None or end is not None
+    task_in_window = overlaps(task.start_date, task.due_date, start, end)
+    milestone_in_window = or_(
+        overlaps(milestone.start_date, milestone.due_date, start, end),
+        milestone.id.in_(select(task.milestone_id).where(task_in_window).correlate(None)),
+    )
+    query = select(
+        goal.id.label("goal_id"), goal.title.label("goal_title"), goal.type.label("goal_type"),
+        goal.start_date.label("goal_start"), goal.end_date.label("goal_end"), goal.progress.label("goal_progress"),
+        milestone.id.label("milestone_id"), milestone.title.label("milestone_title"),
+        milestone.start_date.label("milestone_start"), milestone.due_date.label("milestone_end"),
+        milestone.progress.label("milestone_progress"),
+        task.id.label("task_id"), task.title.label("task_title"),
+        task.start_date.label("task_start"), task.due_date.label("task_end"), task.progress.label("task_progress"),
+    ).select_from(goal)
+    if windowed:
+        query = query.outerjoin(milestone, and_(milestone.goal_id == goal.id, milestone_in_window)).outerjoin(
+            task, and_(task.milestone_id == milestone.id, task_in_window)
+        ).where(or_(
+            overlaps(goal.start_date, goal.end_date, start, end),
+            goal.id.in_(select(milestone.goal_id).where(milestone_in_window).correlate(None)),
+        ))
+    else:
+        query = query.outerjoin(milestone, milestone.goal_id == goal.id).outerjoin(
+            task, task.milestone_id == milestone.id
+        )
+    if year:
+        query = query.where(goal.year == year)
+    return query.order_by(goal.id, milestone.id, task.id)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def items(rows, state):
+    """Gantt items for a batch of joined rows; `state` carries the last goal/milestone across batches."""
+    for row in rows:
+        if row.goal_id != state.get("goal"):
+            state["goal"] = row.goal_id
+            state["milestone"] = None
+            yield {
+                "id": f"goal-{row.goal_id}",
+                "name": row.goal_title,
+                "start": _iso(row.goal_start),
+                "end": _iso(row.goal_end),
+                "progress": row.goal_progress,
+                "type": "goal",
+                "goal_type": row.goal_type,
+                "dependencies": ""
+            }
+        if row.milestone_id is not None and row.milestone_id != state["milestone"]:
+            state["milestone"] = row.milestone_id
+            yield {
+                "id": f"milestone-{row.milestone_id}",
+                "name": f"  {row.milestone_title}",
+                "start": _iso(row.milestone_start),
+                "end": _iso(row.milestone_end),
+                "progress": row.milestone_progress,
+                "type": "milestone",
+                "dependencies": f"goal-{row.goal_id}"
+            }
+        if row.task_id is not None:
+            yield {
+                "id": f"task-{row.task_id}",
+                "name": f"    {row.task_title}",
+                "start": _iso(row.task_start),
+                "end": _iso(row.task_end),
+                "progress": row.task_progress,
+                "type": "task",
+                "dependencies": f"milestone-{row.milestone_id}"
+            }
+
+
+async def stream(statement, ndjson=False):
+    """Encoded chunks of the Gantt items for `statement`, one chunk per batch of rows.
+
+    Plain JSON is a single array; NDJSON is one item per line.
+    """
+    state = {}
+    first = True
+    if not ndjson:
+        yield b"["
+    async for rows in stream_rows(statement):
+        # Compact UTF-8 like the app's other JSON responses, so the streamed array matches a rendered one
+        encoded = [orjson.dumps(item) for item in items(rows, state)]
+        if not encoded:
+            continue
+        if ndjson:
+            yield b"\n".join(encoded) + b"\n"
+        else:
+            yield (b"" if first else b",") + b",".join(encoded)
+        first = False
+    if not ndjson:
+        yield b"]"
+
+
+def _add_columns(rows, state, columns):
+    """Append the items of a batch of joined rows to `columns`.
+
+    `state` carries the open goal/milestone and the number of items sent in earlier batches.
+    """
+    def add(kind, id, parent, name, start, end, progress, goal_type=None):
+        for field, value in zip(COLUMNAR_FIELDS, (kind, id, parent, name, start, end, progress, goal_type)):
+            columns[field].append(value)
+        return state["sent"] + len(columns["id"]) - 1
+
+    for row in rows:
+        if row.goal_id != state.get("goal"):
+            state["goal"] = row.goal_id
+            state["milestone"] = None
+            state["goal_index"] = add(
+                0, row.goal_id, None, row.goal_title, row.goal_start, row.goal_end, row.goal_progress, row.goal_type
+            )
+        if row.milestone_id is not None and row.milestone_id != state["milestone"]:
+            state["milestone"] = row.milestone_id
+            state["milestone_index"] = add(
+                1, row.milestone_id, state["goal_index"], row.milestone_title,
+                row.milestone_start, row.milestone_end, row.milestone_progress
+            )
+        if row.task_id is not None:
+            add(
+                2, row.task_id, state["milestone_index"], row.task_title,
+                row.task_start, row.task_end, row.task_progress
+            )
+
+
+async def stream_columnar(statement):
+    """The Gantt items for `statement` as NDJSON, one columnar object per batch of rows."""
+    state = {"sent": 0}
+    async for rows in stream_rows(statement):
+        columns = {field: [] for field in COLUMNAR_FIELDS}
+        _add_columns(rows, state, columns)
+        if not columns["id"]:
+            continue
+        state["sent"] += len(columns["id"])
+        dates = [value for value in columns["start"] + columns["end"] if value]
+        base = min(dates) if dates else None
+        for field in ("start", "end"):
+            columns[field] = [(value - base).days if value else None for value in columns[field]]
+        yield orjson.dumps({"base": _iso(base), "types": COLUMNAR_TYPES, **columns}) + b"\n"
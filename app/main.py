@@ -1,21 +1,48 @@
-from fastapi import FastAPI, Depends, Request, UploadFile, File, HTTPException
+from fastapi import FastAPI, Depends, Request, Response, UploadFile, File, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, FileResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-import shutil
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from sqlalchemy import delete, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import os
-from datetime import datetime
-
-from app.database import engine, get_db, Base
-from app import models, schemas
-from app.routers import goals, milestones, tasks, members, ideas
-
-# Create tables
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from datetime import date, datetime
+
+from app.database import engine, async_engine, get_async_db, close_db_connections, Base, DATABASE_PATH
+from app import models, schemas, rollups, migrations, progress, versions, gantt, backup
+from app.cache import response_cache
+from app.changes import PRUNE_INTERVAL, prune_deletions, run_pruner
+from app.events import event_bus
+from app.routers import goals, milestones, tasks, members, ideas, batch, transfer, backups, search, events, changes
+
+# Create tables, then bring older databases up to the current schema
 Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Roadmap Dashboard", version="1.0.0")
+migrations.upgrade(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(backup.remove_stale)
+    await run_in_threadpool(prune_deletions)
+    scheduler = asyncio.create_task(backup.run_scheduler()) if backup.BACKUP_INTERVAL > 0 else None
+    pruner = asyncio.create_task(run_pruner()) if PRUNE_INTERVAL > 0 else None
+    heartbeat = asyncio.create_task(event_bus.run_heartbeat())
+    yield
+    heartbeat.cancel()
+    for task in (scheduler, pruner):
+        if task is not None:
+            task.cancel()
+    await run_in_threadpool(backup.snapshots.clear)
+    # Pooled aiosqlite connections each own a thread that would keep the process alive
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+# orjson for every JSON response; see app.responses for the list endpoints
+app = FastAPI(title="Roadmap Dashboard", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -29,6 +56,12 @@ app.include_router(milestones.router)
 app.include_router(tasks.router)
 app.include_router(members.router)
 app.include_router(ideas.router)
+app.include_router(batch.router)
+app.include_router(transfer.router)
+app.include_router(backups.router)
+app.include_router(search.router)
+app.include_router(events.router)
+app.include_router(changes.router)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -36,64 +69,48 @@ async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
-@app.get("/api/dashboard/summary", response_model=schemas.ProgressSummary)
-def get_dashboard_summary(year: int = None, db: Session = Depends(get_db)):
-    # Base query
-    goals_query = db.query(models.Goal)
-    if year:
-        goals_query = goals_query.filter(models.Goal.year == year)
+# Tables each cached aggregate reads, for its ETag and for cache invalidation
+DASHBOARD_TABLES = ("goal_rollups",)
+YEARS_TABLES = ("goals", "members", "ideas")
+GANTT_TABLES = ("goals", "milestones", "tasks")
+
+
+@app.get("/api/dashboard/summary", response_model=schemas.ProgressSummary,
+         dependencies=[versions.conditional(*DASHBOARD_TABLES)])
+async def get_dashboard_summary(response: Response, year: int = None, db: AsyncSession = Depends(get_async_db)):
+    return await response_cache.serve(
+        response, ("dashboard", year), DASHBOARD_TABLES, year, lambda: dashboard_summary(db, year)
+    )
 
-    all_goals = goals_query.all()
 
-    total_goals = len(all_goals)
-    total_milestones = 0
-    total_tasks = 0
-    progress_sum = 0
+async def dashboard_summary(db: AsyncSession, year):
+    total_goals = total_milestones = total_tasks = progress_sum = 0
 
     by_type = {"issue": {"count": 0, "progress": 0}, "feature": {"count": 0, "progress": 0}, "feedback": {"count": 0, "progress": 0}}
     by_team = {}
     by_product = {}
 
-    for goal in all_goals:
-        total_milestones += len(goal.milestones)
-        progress_sum += goal.progress
-
-        # By type
-        if goal.type in by_type:
-            by_type[goal.type]["count"] += 1
-            by_type[goal.type]["progress"] += goal.progress
-
-        # By team
-        team = goal.team or "Unassigned"
-        if team not in by_team:
-            by_team[team] = {"count": 0, "progress": 0}
-        by_team[team]["count"] += 1
-        by_team[team]["progress"] += goal.progress
-
-        # By product
-        product = goal.product or "Unassigned"
-        if product not in by_product:
-            by_product[product] = {"count": 0, "progress": 0}
-        by_product[product]["count"] += 1
-        by_product[product]["progress"] += goal.progress
-
-        for milestone in goal.milestones:
-            total_tasks += len(milestone.tasks)
+    # A handful of precomputed (year, type, team, product) rows
+    for row in await db.run_sync(rollups.goal_rows, year):
+        total_goals += row.goal_count
+        total_milestones += row.milestone_count
+        total_tasks += row.task_count
+        progress_sum += row.progress_sum
+
+        groups = [by_team.setdefault(row.team, {"count": 0, "progress": 0}),
+                  by_product.setdefault(row.product, {"count": 0, "progress": 0})]
+        if row.type in by_type:
+            groups.append(by_type[row.type])
+        for group in groups:
+            group["count"] += row.goal_count
+            group["progress"] += row.progress_sum
 
     # Calculate averages
     overall_progress = progress_sum / total_goals if total_goals > 0 else 0
 
-    for key in by_type:
-        if by_type[key]["count"] > 0:
-            by_type[key]["progress"] = by_type[key]["progress"] / by_type[key]["count"]
-
-    for key in by_team:
-        if by_team[key]["count"] > 0:
-            by_team[key]["progress"] = by_team[key]["progress"] / by_team[key]["count"]
-
-    for key in by_product:
-        if by_product[key]["count"] > 0:
-            by_product[key]["progress"] = by_product[key]["progress"] / by_product[key]["count"]
+    for group in [*by_type.values(), *by_team.values(), *by_product.values()]:
+        if group["count"] > 0:
+            group["progress"] = group["progress"] / group["count"]
 
     return schemas.ProgressSummary(
         total_goals=total_goals,
@@ -106,22 +123,16 @@ def get_dashboard_summary(year: int = None, db: Session = Depends(get_db)):
     )
 
 
-@app.get("/api/years")
-def get_available_years(db: Session = Depends(get_db)):
+@app.get("/api/years", dependencies=[versions.conditional(*YEARS_TABLES)])
+async def get_available_years(response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get all unique years from goals, members, and ideas"""
-    years = set()
-
-    # From goals
-    goal_years = db.query(models.Goal.year).distinct().all()
-    years.update([y[0] for y in goal_years])
+    return await response_cache.serve(response, ("years",), YEARS_TABLES, None, lambda: available_years(db))
 
-    # From members
-    member_years = db.query(models.Member.year).distinct().all()
-    years.update([y[0] for y in member_years])
 
-    # From ideas
-    idea_years = db.query(models.Idea.year).distinct().all()
-    years.update([y[0] for y in idea_years])
+async def available_years(db: AsyncSession):
+    years = set((await db.scalars(union(
+        select(models.Goal.year), select(models.Member.year), select(models.Idea.year)
+    ))).all())
 
     # Default to 2026 if no data
     if not years:
@@ -130,82 +141,76 @@ def get_available_years(db: Session = Depends(get_db)):
     return sorted(years, reverse=True)
 
 
-@app.get("/api/gantt/data")
-def get_gantt_data(year: int = None, db: Session = Depends(get_db)):
-    """Get data formatted for Frappe Gantt"""
-    goals_query = db.query(models.Goal)
-    if year:
-        goals_query = goals_query.filter(models.Goal.year == year)
-
-    all_goals = goals_query.all()
-    gantt_tasks = []
-
-    for goal in all_goals:
-        # Add goal as a task
-        gantt_tasks.append({
-            "id": f"goal-{goal.id}",
-            "name": goal.title,
-            "start": goal.start_date.isoformat() if goal.start_date else None,
-            "end": goal.end_date.isoformat() if goal.end_date else None,
-            "progress": goal.progress,
-            "type": "goal",
-            "goal_type": goal.type,
-            "dependencies": ""
-        })
-
-        for milestone in goal.milestones:
-            gantt_tasks.append({
-                "id": f"milestone-{milestone.id}",
-                "name": f"  {milestone.title}",
-                "start": milestone.start_date.isoformat() if milestone.start_date else None,
-                "end": milestone.due_date.isoformat() if milestone.due_date else None,
-                "progress": milestone.progress,
-                "type": "milestone",
-                "dependencies": f"goal-{goal.id}"
-            })
-
-            for task in milestone.tasks:
-                gantt_tasks.append({
-                    "id": f"task-{task.id}",
-                    "name": f"    {task.title}",
-                    "start": task.start_date.isoformat() if task.start_date else None,
-                    "end": task.due_date.isoformat() if task.due_date else None,
-                    "progress": task.progress,
-                    "type": "task",
-                    "dependencies": f"milestone-{milestone.id}"
-                })
-
-    return gantt_tasks
+@app.get("/api/gantt/data", dependencies=[versions.conditional(*GANTT_TABLES)])
+async def get_gantt_data(
+    response: Response, year: int = None, start: Optional[date] = None, end: Optional[date] = None,
+    format: Literal["json", "ndjson", "columnar"] = "json"
+):
+    """Get data formatted for Frappe Gantt, streamed as one JSON array or as NDJSON lines.
+
+    `format=columnar` sends NDJSON lines of one array per field instead (see app.gantt), several times smaller.
+    With `start`/`end`, only items overlapping that window are returned, along with their parents.
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    ndjson = format == "ndjson"
+    query = gantt.rows_query(year, start, end)
+    return response_cache.stream(
+        response, ("gantt", year, start, end, format), GANTT_TABLES, year,
+        lambda: gantt.stream_columnar(query) if format == "columnar" else gantt.stream(query, ndjson),
+        gantt.JSON_MEDIA_TYPE if format == "json" else gantt.NDJSON_MEDIA_TYPE
+    )
+
+
+@app.post("/api/progress/recompute")
+async def recompute_progress(derive: Optional[bool] = None, db: AsyncSession = Depends(get_async_db)):
+    """Recount task totals for every milestone and goal; rederive progress in rollup mode or with derive=true"""
+    updated = await db.run_sync(progress.recompute, derive)
+    await db.commit()
+    response_cache.clear()
+    event_bus.publish(None, "reset")
+    return {"updated": updated, "rollup_mode": progress.ENABLED}
 
 
 # [TEST] Delete all data - Remove after testing
 @app.delete("/api/reset-all-data")
-def reset_all_data(db: Session = Depends(get_db)):
+async def reset_all_data(db: AsyncSession = Depends(get_async_db)):
     """Delete all data from all tables - FOR TESTING ONLY"""
-    db.query(models.Comment).delete()
-    db.query(models.Idea).delete()
-    db.query(models.Task).delete()
-    db.query(models.Milestone).delete()
-    db.query(models.Goal).delete()
-    db.query(models.Member).delete()
-    db.commit()
+    for model in [models.Comment, models.Idea, models.Task, models.Milestone, models.Goal, models.Member,
+                  models.GoalRollup, models.MemberRollup]:
+        await db.execute(delete(model))
+    await db.commit()
+    response_cache.clear()
+    event_bus.publish(None, "reset")
     return {"message": "All data has been deleted"}
 
 
 # DB path
-DB_PATH = "./roadmap.db"
+DB_PATH = DATABASE_PATH
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters of the aggregate response cache"""
+    return response_cache.stats()
 
 
 @app.get("/api/export-db")
-def export_db():
-    """Export the database file"""
+async def export_db(compress: Optional[Literal["gzip"]] = None):
+    """Export a point-in-time snapshot of the database, optionally gzip-encoded"""
     if not os.path.exists(DB_PATH):
         raise HTTPException(status_code=404, detail="Database file not found")
 
-    return FileResponse(
-        path=DB_PATH,
-        filename=f"roadmap_{datetime.now().strftime('%Y%m%d')}.db",
-        media_type="application/octet-stream"
+    snapshot = await run_in_threadpool(backup.snapshots.open)
+    filename = f"roadmap_{datetime.now().strftime('%Y%m%d')}.db"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = compress
+    else:
+        headers["Content-Length"] = str(os.fstat(snapshot.fileno()).st_size)
+    return StreamingResponse(
+        iterate_in_threadpool(backup.read_chunks(snapshot, compress)),
+        media_type="application/octet-stream", headers=headers
     )
 
 
@@ -215,28 +220,21 @@ async def import_db(file: UploadFile = File(...)):
     if not file.filename.endswith('.db'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a .db file")
 
-    # Create backup of current DB
-    backup_path = f"./roadmap_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-    if os.path.exists(DB_PATH):
-        shutil.copy2(DB_PATH, backup_path)
-
+    path = await backup.receive(file)
     try:
-        # Save uploaded file
-        with open(DB_PATH, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Remove backup on success
-        if os.path.exists(backup_path):
-            os.remove(backup_path)
-
-        return {"message": "Database imported successfully"}
+        await run_in_threadpool(backup.restore, path)
+    except backup.InvalidDatabase as e:
+        raise HTTPException(status_code=400, detail=f"Invalid database file: {str(e)}")
     except Exception as e:
-        # Restore backup on failure
-        if os.path.exists(backup_path):
-            shutil.copy2(backup_path, DB_PATH)
-            os.remove(backup_path)
         raise HTTPException(status_code=500, detail=f"Failed to import database: {str(e)}")
+    finally:
+        await run_in_threadpool(backup.discard, path)
+        # Pooled connections may hold pages of the old data
+        await close_db_connections()
+        response_cache.clear()
+        event_bus.publish(None, "reset")
+
+    return {"message": "Database imported successfully"}
 
 
 if __name__ == "__main__":
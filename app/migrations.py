@@ -0,0 +1,279 @@
+"""Versioned schema migrations for existing databases.
+
+`Base.metadata.create_all` only creates missing tables; it never touches a
+table that already exists. Each entry in MIGRATIONS upgrades the schema by
+one version, and the applied version is kept in SQLite's `PRAGMA
+user_version`. Steps must be idempotent, because a fresh database already
+has everything `create_all` knows about by the time they run.
+
+    python -m app.migrations   # upgrade roadmap.db and print its version
+"""
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+
+def _create_filter_indexes(conn: Connection):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_goals_year_type ON goals (year, type)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_year_team ON goals (year, team)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_year_product ON goals (year, product)",
+        "CREATE INDEX IF NOT EXISTS ix_goals_year_quarter ON goals (year, quarter)",
+        "CREATE INDEX IF NOT EXISTS ix_members_year_team ON members (year, team)",
+        "CREATE INDEX IF NOT EXISTS ix_members_year_type ON members (year, type)",
+        (
+            "CREATE INDEX IF NOT EXISTS ix_ideas_year_priority_created_at"
+            " ON ideas (year, priority, created_at DESC, id DESC)"
+        ),
+        "CREATE INDEX IF NOT EXISTS ix_ideas_year_status ON ideas (year, status)",
+        "CREATE INDEX IF NOT EXISTS ix_ideas_year_product ON ideas (year, product)",
+        "CREATE INDEX IF NOT EXISTS ix_milestones_goal_id ON milestones (goal_id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_milestone_id ON tasks (milestone_id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_assignee_id ON tasks (assignee_id)",
+        "CREATE INDEX IF NOT EXISTS ix_comments_idea_id ON comments (idea_id)",
+    ]:
+        conn.exec_driver_sql(statement)
+
+
+def _add_task_counters(conn: Connection):
+    for table in ("milestones", "goals"):
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        for column in ("task_count", "task_progress_sum"):
+            if column not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+    conn.exec_driver_sql(
+        "UPDATE milestones SET"
+        " task_count = (SELECT count(*) FROM tasks WHERE tasks.milestone_id = milestones.id),"
+        " task_progress_sum = (SELECT coalesce(sum(progress), 0) FROM tasks WHERE tasks.milestone_id = milestones.id)"
+    )
+    conn.exec_driver_sql(
+        "UPDATE goals SET"
+        " task_count = (SELECT coalesce(sum(task_count), 0) FROM milestones WHERE milestones.goal_id = goals.id),"
+        " task_progress_sum = (SELECT coalesce(sum(task_progress_sum), 0) FROM milestones"
+        " WHERE milestones.goal_id = goals.id)"
+    )
+
+
+def _add_table_versions(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS table_versions (name VARCHAR(50) NOT NULL PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+    # Identifies this copy of the data, so versions restarting from an imported file can't collide
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('epoch', abs(random()) % 2147483647)"
+    )
+    for table in ("goals", "milestones", "tasks", "members", "ideas", "comments", "goal_rollups", "member_rollups"):
+        conn.exec_driver_sql(f"INSERT OR IGNORE INTO table_versions (name, version) VALUES ('{table}', 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}"
+                f" BEGIN UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END"
+            )
+
+
+def _create_date_indexes(conn: Connection):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_goals_end_date_start_date ON goals (end_date, start_date)",
+        "CREATE INDEX IF NOT EXISTS ix_milestones_due_date_start_date ON milestones (due_date, start_date)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_due_date_start_date ON tasks (due_date, start_date)",
+    ]:
+        conn.exec_driver_sql(statement)
+
+
+# Searchable tables: entity name, rowid offset and SQL for each index column over the row `{r}`,
+# plus the columns whose updates reindex a row. A row's index rowid is id * 3 + offset.
+SEARCH_SOURCES = {
+    "goals": (
+        "goal", 0, "{r}.title",
+        "coalesce({r}.description, '') || char(10) || coalesce({r}.expected_effect, '') || char(10)"
+        " || coalesce({r}.tags, '')",
+        "{r}.year", "NULL", "title, description, expected_effect, tags, year",
+    ),
+    "ideas": ("idea", 1, "{r}.title", "coalesce({r}.description, '')", "{r}.year", "NULL", "title, description, year"),
+    "comments": (
+        "comment", 2, "''", "{r}.content", "(SELECT year FROM ideas WHERE ideas.id = {r}.idea_id)", "{r}.idea_id",
+        "content, idea_id",
+    ),
+}
+
+
+def _create_search_index(conn: Connection):
+    # trigram matches any 3+ character substring, so Korean needs no word segmentation
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity UNINDEXED, entity_id UNINDEXED, parent_id UNINDEXED, year UNINDEXED, title, body,"
+        " tokenize = 'trigram')"
+    )
+    for table, (entity, offset, title, body, year, parent_id, watched) in SEARCH_SOURCES.items():
+        def values(r):
+            return (
+                f"{r}.id * 3 + {offset}, '{entity}', {r}.id, {parent_id.format(r=r)}, {year.format(r=r)},"
+                f" {title.format(r=r)}, {body.format(r=r)}"
+            )
+        insert = "INSERT INTO search_index (rowid, entity, entity_id, parent_id, year, title, body)"
+        delete = f"DELETE FROM search_index WHERE rowid = old.id * 3 + {offset};"
+        conn.exec_driver_sql(f"{insert} SELECT {values(table)} FROM {table}")
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}"
+            f" BEGIN {insert} VALUES ({values('new')}); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {watched} ON {table}"
+            f" BEGIN {delete} {insert} VALUES ({values('new')}); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END"
+        )
+    # Comments are filtered by their idea's year
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS ideas_search_year AFTER UPDATE OF year ON ideas"
+        " BEGIN UPDATE search_index SET year = new.year"
+        " WHERE rowid IN (SELECT id * 3 + 2 FROM comments WHERE idea_id = new.id); END"
+    )
+
+
+def _goal_tags(goals):
+    """(goal_id, tag) rows for the trimmed, non-empty entries of `goals`, a SELECT of (id, tags)."""
+    return (
+        f"WITH RECURSIVE split(goal_id, rest, tag) AS (SELECT id, tags || ',', NULL FROM ({goals}) UNION ALL"
+        " SELECT goal_id, substr(rest, instr(rest, ',') + 1), trim(substr(rest, 1, instr(rest, ',') - 1))"
+        " FROM split WHERE rest != '') SELECT goal_id, tag FROM split WHERE tag != ''"
+    )
+
+
+def _link_tags(goals):
+    # Rows already there and repeats are filtered out rather than ignored with OR IGNORE: in a trigger,
+    # the conflict policy of the statement that fired it (an import's upsert) would replace that one
+    return [
+        "INSERT INTO tags (name) SELECT tag FROM ("
+        f"SELECT tag, min(goal_id) AS goal_id FROM ({_goal_tags(goals)}) GROUP BY tag COLLATE NOCASE"
+        ") AS split WHERE NOT EXISTS (SELECT 1 FROM tags WHERE tags.name = split.tag) ORDER BY goal_id",
+        "INSERT INTO goal_tags (goal_id, tag_id) SELECT DISTINCT split.goal_id, tags.id"
+        f" FROM ({_goal_tags(goals)}) AS split JOIN tags ON tags.name = split.tag WHERE NOT EXISTS"
+        " (SELECT 1 FROM goal_tags WHERE goal_tags.goal_id = split.goal_id AND goal_tags.tag_id = tags.id)",
+    ]
+
+
+def _create_tag_triggers(conn: Connection):
+    # Goal.tags stays the source of truth; the tables follow it whichever process writes
+    link = "".join(f"{statement}; " for statement in _link_tags("SELECT new.id AS id, new.tags AS tags"))
+    unlink = (
+        "DELETE FROM goal_tags WHERE goal_id = old.id;"
+        " DELETE FROM tags WHERE NOT EXISTS (SELECT 1 FROM goal_tags WHERE goal_tags.tag_id = tags.id);"
+    )
+    conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS goals_tags_insert AFTER INSERT ON goals BEGIN {link}END")
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS goals_tags_update AFTER UPDATE OF tags ON goals BEGIN {unlink} {link}END"
+    )
+    conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS goals_tags_delete AFTER DELETE ON goals BEGIN {unlink} END")
+
+
+def _normalize_tags(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS tags (id INTEGER NOT NULL PRIMARY KEY,"
+        " name VARCHAR(100) COLLATE NOCASE NOT NULL UNIQUE)"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS goal_tags (goal_id INTEGER NOT NULL REFERENCES goals (id) ON DELETE CASCADE,"
+        " tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE, PRIMARY KEY (goal_id, tag_id))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_goal_tags_tag_id_goal_id ON goal_tags (tag_id, goal_id)")
+    for statement in _link_tags("SELECT id, tags FROM goals WHERE tags IS NOT NULL"):
+        conn.exec_driver_sql(statement)
+    _create_tag_triggers(conn)
+
+
+def _recreate_tag_triggers(conn: Connection):
+    """Replace tag triggers that relied on OR IGNORE, which an upserting import overrode."""
+    for event in ("insert", "update", "delete"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS goals_tags_{event}")
+    _create_tag_triggers(conn)
+
+
+# Tables in the change feed (see app.changes) and the entity name their tombstones carry
+CHANGE_TABLES = {
+    "goals": "goal", "milestones": "milestone", "tasks": "task", "members": "member", "ideas": "idea",
+    "comments": "comment",
+}
+
+
+def _add_change_log(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS deletions (seq INTEGER NOT NULL PRIMARY KEY, entity VARCHAR(20) NOT NULL,"
+        " entity_id INTEGER NOT NULL, deleted_at DATETIME DEFAULT (CURRENT_TIMESTAMP))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_deletions_deleted_at ON deletions (deleted_at)")
+    # One sequence across every table: the last number handed to a written row or a tombstone
+    conn.exec_driver_sql("INSERT OR IGNORE INTO table_versions (name, version) VALUES ('changes', 0)")
+    last = "(SELECT version FROM table_versions WHERE name = 'changes')"
+    bump = "UPDATE table_versions SET version = version + 1 WHERE name = 'changes';"
+    for table, entity in CHANGE_TABLES.items():
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if "change_seq" not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER")
+        # Rows already there count as written once, in id order
+        conn.exec_driver_sql(f"UPDATE {table} SET change_seq = {last} + id WHERE change_seq IS NULL")
+        conn.exec_driver_sql(
+            f"UPDATE table_versions SET version = max(version, (SELECT coalesce(max(change_seq), 0) FROM {table}))"
+            " WHERE name = 'changes'"
+        )
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_change_seq ON {table} (change_seq)")
+        stamp = f"{bump} UPDATE {table} SET change_seq = {last} WHERE id = new.id;"
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_changes_insert AFTER INSERT ON {table} BEGIN {stamp} END"
+        )
+        # The WHEN skips the trigger's own stamping update
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_changes_update AFTER UPDATE ON {table}"
+            f" WHEN new.change_seq IS old.change_seq BEGIN {stamp} END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_changes_delete AFTER DELETE ON {table} BEGIN {bump}"
+            f" INSERT INTO deletions (seq, entity, entity_id) VALUES ({last}, '{entity}', old.id); END"
+        )
+
+
+def _build_rollups(conn: Connection):
+    """Fill the rollup tables, which create_all adds empty, from the rows already there."""
+    from app import rollups
+
+    with Session(bind=conn) as db:
+        rollups.rebuild(db)
+
+
+# Append only: position + 1 is the schema version a step upgrades to
+MIGRATIONS = [
+    _create_filter_indexes,
+    _add_task_counters,
+    _add_table_versions,
+    _create_date_indexes,
+    _create_search_index,
+    _normalize_tags,
+    _add_change_log,
+    _recreate_tag_triggers,
+    _build_rollups,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def current_version(conn: Connection):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def upgrade(engine):
+    """Apply every pending migration, each in its own transaction."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with engine.begin() as conn:
+            migration(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+    return max(version, LATEST_VERSION)
+
+
+if __name__ == "__main__":
+    from app.database import engine, Base
+    from app import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(bind=engine)
+    print(f"schema version {upgrade(engine)}")
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index
+from sqlalchemy.orm import query_expression, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class Member(Base):
     __tablename__ = "members"
+    __table_args__ = (
+        Index("ix_members_year_team", "year", "team"),
+        Index("ix_members_year_type", "year", "type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -17,12 +21,20 @@ class Member(Base):
     year = Column(Integer, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     tasks = relationship("Task", back_populates="assignee")
 
 
 class Goal(Base):
     __tablename__ = "goals"
+    __table_args__ = (
+        Index("ix_goals_year_type", "year", "type"),
+        Index("ix_goals_year_team", "year", "team"),
+        Index("ix_goals_year_product", "year", "product"),
+        Index("ix_goals_year_quarter", "year", "quarter"),
+        Index("ix_goals_end_date_start_date", "end_date", "start_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String(20), nullable=False)  # 'issue' or 'feature'
@@ -37,24 +49,51 @@ class Goal(Base):
     progress = Column(Integer, default=0)  # 0-100
     start_date = Column(Date)
     end_date = Column(Date)
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")  # maintained by app.progress
+    task_progress_sum = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     milestones = relationship("Milestone", back_populates="goal", cascade="all, delete-orphan")
 
 
+class Tag(Base):
+    """A distinct goal tag; Goal.tags stays the source, split into these by triggers (see migrations)"""
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100, collation="NOCASE"), nullable=False, unique=True)
+
+
+class GoalTag(Base):
+    __tablename__ = "goal_tags"
+    __table_args__ = (
+        Index("ix_goal_tags_tag_id_goal_id", "tag_id", "goal_id"),
+    )
+
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+
 class Milestone(Base):
     __tablename__ = "milestones"
+    __table_args__ = (
+        Index("ix_milestones_due_date_start_date", "due_date", "start_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False)
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text)
     due_date = Column(Date)
     start_date = Column(Date)
     progress = Column(Integer, default=0)  # 0-100
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")  # maintained by app.progress
+    task_progress_sum = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     goal = relationship("Goal", back_populates="milestones")
     tasks = relationship("Task", back_populates="milestone", cascade="all, delete-orphan")
@@ -62,17 +101,21 @@ class Milestone(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_due_date_start_date", "due_date", "start_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    milestone_id = Column(Integer, ForeignKey("milestones.id", ondelete="CASCADE"), nullable=False)
+    milestone_id = Column(Integer, ForeignKey("milestones.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text)
-    assignee_id = Column(Integer, ForeignKey("members.id", ondelete="SET NULL"))
+    assignee_id = Column(Integer, ForeignKey("members.id", ondelete="SET NULL"), index=True)
     due_date = Column(Date)
     start_date = Column(Date)
     progress = Column(Integer, default=0)  # 0-100
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     milestone = relationship("Milestone", back_populates="tasks")
     assignee = relationship("Member", back_populates="tasks")
@@ -80,6 +123,10 @@ class Task(Base):
 
 class Idea(Base):
     __tablename__ = "ideas"
+    __table_args__ = (
+        Index("ix_ideas_year_status", "year", "status"),
+        Index("ix_ideas_year_product", "year", "product"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String(20), nullable=False)  # 'issue' or 'feature'
@@ -91,17 +138,66 @@ class Idea(Base):
     status = Column(String(20), default='open')  # 'open', 'approved', 'rejected', 'converted'
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     comments = relationship("Comment", back_populates="idea", cascade="all, delete-orphan")
+    comment_count = query_expression()  # loaded with with_expression(Idea.comment_count, ...)
 
 
 class Comment(Base):
     __tablename__ = "comments"
 
     id = Column(Integer, primary_key=True, index=True)
-    idea_id = Column(Integer, ForeignKey("ideas.id", ondelete="CASCADE"), nullable=False)
+    idea_id = Column(Integer, ForeignKey("ideas.id", ondelete="CASCADE"), nullable=False, index=True)
     author = Column(String(100), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    change_seq = Column(Integer, index=True)  # set by triggers (see app.changes)
 
     idea = relationship("Idea", back_populates="comments")
+
+
+# Matches the idea board order: priority, newest first
+Index("ix_ideas_year_priority_created_at", Idea.year, Idea.priority, Idea.created_at.desc(), Idea.id.desc())
+
+
+class GoalRollup(Base):
+    """Per (year, type, team, product) goal counts, maintained by the write handlers"""
+    __tablename__ = "goal_rollups"
+
+    year = Column(Integer, primary_key=True)
+    type = Column(String(20), primary_key=True)
+    team = Column(String(100), primary_key=True)  # 'Unassigned' when the goal has none
+    product = Column(String(100), primary_key=True)  # 'Unassigned' when the goal has none
+    goal_count = Column(Integer, nullable=False, default=0)
+    progress_sum = Column(Integer, nullable=False, default=0)
+    milestone_count = Column(Integer, nullable=False, default=0)
+    task_count = Column(Integer, nullable=False, default=0)
+
+
+class MemberRollup(Base):
+    """Per (year, role, type) member counts, maintained by the write handlers"""
+    __tablename__ = "member_rollups"
+
+    year = Column(Integer, primary_key=True)
+    role = Column(String(50), primary_key=True)  # 'Other' when the member has none
+    type = Column(String(20), primary_key=True)
+    member_count = Column(Integer, nullable=False, default=0)
+
+
+class TableVersion(Base):
+    """Change counter per table, bumped by triggers on every row written (see app.versions)"""
+    __tablename__ = "table_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class Deletion(Base):
+    """Tombstone of a deleted row, written by triggers for the change feed (see app.changes)"""
+    __tablename__ = "deletions"
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String(20), nullable=False)  # 'goal', 'milestone', 'task', 'member', 'idea' or 'comment'
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, server_default=func.now(), index=True)
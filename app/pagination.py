@@ -0,0 +1,73 @@
+"""Opt-in keyset pagination for the list endpoints.
+
+Lists stay unbounded unless the client passes `limit`. When more rows
+remain, the opaque cursor for the next page is returned in the
+`X-Next-Cursor` response header, so list bodies keep their shape.
+"""
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import String, and_, or_, type_coerce
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+LimitQuery = Query(None, ge=1, le=MAX_PAGE_SIZE)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        values = None
+    # Only what encode_cursor writes for an order column; anything else can't be compared with one
+    if (
+        not isinstance(values, list) or len(values) != size
+        or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _after(order, values):
+    """Rows strictly after `values` in the given (column, descending) order."""
+    # Cursor strings are compared as stored text, bypassing the column's bind processing
+    values = [type_coerce(v, String) if isinstance(v, str) else v for v in values]
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        step = column < values[i] if descending else column > values[i]
+        ties = [c == v for (c, _), v in zip(order[:i], values[:i])]
+        clauses.append(and_(*ties, step))
+    return or_(*clauses)
+
+
+async def paginate(db, statement, response: Response, limit=None, cursor=None, order=None):
+    """Apply keyset ordering/paging to a select() of one entity and run it.
+
+    `order` is a list of (column, descending) pairs ending in a unique
+    column; it defaults to the primary key of the selected entity.
+    """
+    if order is None:
+        order = [(statement.column_descriptions[0]["entity"].id, False)]
+    if cursor:
+        statement = statement.where(_after(order, decode_cursor(cursor, len(order))))
+    statement = statement.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+    if limit is None:
+        return (await db.scalars(statement)).all()
+
+    # The cursor keeps the order columns as stored. Timestamps are text in more than one format
+    # (CURRENT_TIMESTAMP defaults have no fraction, SQLAlchemy writes microseconds), and a value
+    # re-rendered from the parsed datetime wouldn't equal its own row's, dropping the rows tied with it
+    stored = [type_coerce(column, String).label(f"cursor_{i}") for i, (column, _) in enumerate(order)]
+    rows = (await db.execute(statement.add_columns(*stored).limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][1:])
+    return [row[0] for row in rows]
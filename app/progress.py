@@ -0,0 +1,157 @@
+"""Task-driven progress for milestones and goals.
+
+Every milestone and goal keeps `task_count` and `task_progress_sum` for the
+tasks under it, adjusted in the same transaction as each task write. With
+ROADMAP_PROGRESS_ROLLUP=1 those writes also set the parent's `progress` to
+the rounded task average (a goal weighs all of its tasks equally), so the
+numbers stay consistent without walking the tree. Parents with no tasks
+keep their hand-set progress.
+
+`recompute` repairs every row with one UPDATE per table:
+
+    python -m app.progress           # recompute counters (and progress in rollup mode)
+    python -m app.progress --derive  # also rederive progress outside rollup mode
+"""
+import os
+import sys
+
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import models, rollups
+from app.database import SessionLocal
+
+ENABLED = os.getenv("ROADMAP_PROGRESS_ROLLUP", "").lower() in ("1", "true", "yes")
+
+
+def average(total, count):
+    """Integer average rounded half up, as a SQL expression."""
+    return (total * 2 + count) // (count * 2)
+
+
+def _counter_values(model, count, total, derive):
+    # Counter upkeep is not an edit, so updated_at is left alone
+    values = {"task_count": count, "task_progress_sum": total, "updated_at": model.updated_at}
+    if derive:
+        values["progress"] = case((count > 0, average(total, count)), else_=model.progress)
+    return values
+
+
+def _update(model, *where):
+    return update(model).where(*where).execution_options(synchronize_session=False)
+
+
+def _adjust_goal(db: Session, goal_id, tasks, progress):
+    goal = db.execute(
+        select(models.Goal.year, models.Goal.type, models.Goal.team, models.Goal.product, models.Goal.progress)
+        .where(models.Goal.id == goal_id)
+    ).one()
+    new_progress = db.execute(
+        _update(models.Goal, models.Goal.id == goal_id).values(**_counter_values(
+            models.Goal, models.Goal.task_count + tasks, models.Goal.task_progress_sum + progress, ENABLED
+        )).returning(models.Goal.progress)
+    ).scalar()
+    if (new_progress or 0) != (goal.progress or 0):
+        rollups.adjust_goal_key(db, rollups.goal_key(goal), progress=(new_progress or 0) - (goal.progress or 0))
+
+
+def adjust(db: Session, milestone_id, tasks=0, progress=0):
+    """Move the task counters of a milestone and its goal by the given deltas."""
+    goal_id = db.execute(
+        _update(models.Milestone, models.Milestone.id == milestone_id).values(**_counter_values(
+            models.Milestone, models.Milestone.task_count + tasks, models.Milestone.task_progress_sum + progress,
+            ENABLED
+        )).returning(models.Milestone.goal_id)
+    ).scalar()
+    _adjust_goal(db, goal_id, tasks, progress)
+
+
+def count_task(db: Session, task, sign=1):
+    """Add (sign=1) or remove (sign=-1) a task under its milestone and goal."""
+    adjust(db, task.milestone_id, tasks=sign, progress=sign * (task.progress or 0))
+
+
+def change_task(db: Session, task, old_progress):
+    """Apply a task's progress edit to its milestone and goal."""
+    delta = (task.progress or 0) - (old_progress or 0)
+    if delta:
+        adjust(db, task.milestone_id, progress=delta)
+
+
+def remove_milestone(db: Session, milestone):
+    """Take a milestone's tasks out of its goal before the milestone is deleted."""
+    stored = db.execute(
+        select(models.Milestone.task_count, models.Milestone.task_progress_sum)
+        .where(models.Milestone.id == milestone.id)
+    ).one()
+    if stored.task_count:
+        _adjust_goal(db, milestone.goal_id, -stored.task_count, -stored.task_progress_sum)
+
+
+def adjust_many(db: Session, milestones, goals):
+    """Apply `{id: [tasks, progress]}` counter deltas with one executemany per table.
+
+    Goal deltas are not derived from the milestone ones, and goal rollups are left to the caller.
+    """
+    for model, deltas in ((models.Milestone, milestones), (models.Goal, goals)):
+        params = [
+            {"_id": id, "_tasks": tasks, "_progress": total}
+            for id, (tasks, total) in deltas.items() if tasks or total
+        ]
+        if params:
+            db.connection().execute(_update(model, model.id == bindparam("_id")).values(**_counter_values(
+                model, model.task_count + bindparam("_tasks"), model.task_progress_sum + bindparam("_progress"),
+                ENABLED
+            )), params)
+
+
+def recompute(db: Session, derive=None):
+    """Recount every milestone and goal from the tasks table. Returns the rows changed per table.
+
+    Progress is rederived too when `derive` (default: rollup mode) is set.
+    """
+    if derive is None:
+        derive = ENABLED
+    milestone, task, goal = models.Milestone, models.Task, models.Goal
+    totals = [
+        (milestone, select(
+            milestone.id,
+            func.count(task.id).label("count"),
+            func.coalesce(func.sum(task.progress), 0).label("total"),
+        ).outerjoin(task, task.milestone_id == milestone.id).group_by(milestone.id).subquery()),
+        # Goals add up the milestone counters repaired just before
+        (goal, select(
+            goal.id,
+            func.coalesce(func.sum(milestone.task_count), 0).label("count"),
+            func.coalesce(func.sum(milestone.task_progress_sum), 0).label("total"),
+        ).outerjoin(milestone, milestone.goal_id == goal.id).group_by(goal.id).subquery()),
+    ]
+    changed = {}
+    for model, sub in totals:
+        stale = [model.task_count != sub.c.count, model.task_progress_sum != sub.c.total]
+        if derive:
+            stale.append((sub.c.count > 0) & model.progress.is_not(average(sub.c.total, sub.c.count)))
+        result = db.execute(
+            _update(model, model.id == sub.c.id, or_(*stale))
+            .values(**_counter_values(model, sub.c.count, sub.c.total, derive))
+        )
+        changed[model.__tablename__] = result.rowcount
+    if derive and changed["goals"]:
+        rollups.rebuild(db)
+    return changed
+
+
+def main(argv):
+    db = SessionLocal()
+    try:
+        changed = recompute(db, derive=True if "--derive" in argv else None)
+        db.commit()
+        for table, count in changed.items():
+            print(f"{table}: {count} row(s) updated")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,36 @@
+"""Fast JSON rendering for large responses.
+
+Responses are encoded with orjson (`default_response_class` in app.main).
+A handler that returns ORM rows for its `response_model` still costs
+FastAPI three passes over the data: validate the rows into models, dump the
+models back to dicts, then encode the dicts. `model_response` validates
+once, straight from the ORM attributes, and lets pydantic's serializer
+write the JSON bytes. Values that are already instances of the schema are
+passed with `trusted=True` and dumped without being validated again.
+"""
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache
+def adapter(schema):
+    """A TypeAdapter per response type, such as List[schemas.Goal]; building one compiles its validator."""
+    return TypeAdapter(schema)
+
+
+def dump_json(schema, value, trusted=False):
+    """`value` rendered as `schema`, as JSON bytes; ORM objects are read through their attributes."""
+    type_adapter = adapter(schema)
+    if not trusted:
+        value = type_adapter.validate_python(value, from_attributes=True)
+    return type_adapter.dump_json(value)
+
+
+def model_response(schema, value, response: Response = None, trusted=False):
+    """A JSON response of `value` as `schema`, carrying the headers already set on `response`."""
+    headers = dict(response.headers) if response is not None else None
+    return Response(dump_json(schema, value, trusted), media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,246 @@
+"""Precomputed dashboard aggregates.
+
+`goal_rollups` and `member_rollups` hold counts per dimension key so the
+summary endpoints read a handful of rows instead of scanning the goal tree.
+The write handlers keep them current inside their own transaction; `rebuild`
+recomputes both tables from scratch and reports any drift it repaired.
+
+    python -m app.rollups          # rebuild and print drift
+    python -m app.rollups --check  # only print drift
+"""
+import sys
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal
+
+UNASSIGNED = "Unassigned"
+OTHER_ROLE = "Other"
+
+GOAL_COUNTERS = ("goal_count", "progress_sum", "milestone_count", "task_count")
+
+
+def goal_key(goal):
+    return {
+        "year": goal.year,
+        "type": goal.type,
+        "team": goal.team or UNASSIGNED,
+        "product": goal.product or UNASSIGNED,
+    }
+
+
+def member_key(member):
+    return {"year": member.year, "role": member.role or OTHER_ROLE, "type": member.type}
+
+
+def _upsert(db: Session, model, key, counters):
+    stmt = insert(model).values(**key, **counters)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters},
+    )
+    db.execute(stmt)
+
+
+def adjust_goal_key(db: Session, key, goals=0, progress=0, milestones=0, tasks=0):
+    _upsert(db, models.GoalRollup, key, {
+        "goal_count": goals,
+        "progress_sum": progress,
+        "milestone_count": milestones,
+        "task_count": tasks,
+    })
+
+
+def count_goal(db: Session, goal, sign=1):
+    """Add (sign=1) or remove (sign=-1) a goal and everything under it."""
+    # Write before counting: the first write opens the transaction and takes SQLite's
+    # write lock, so no concurrent child insert can commit between count and upsert
+    adjust_goal_key(db, goal_key(goal), goals=sign, progress=sign * (goal.progress or 0))
+    if goal.id is not None:
+        milestones = db.query(func.count(models.Milestone.id)).filter(
+            models.Milestone.goal_id == goal.id
+        ).scalar()
+        tasks = db.query(func.count(models.Task.id)).join(
+            models.Milestone, models.Task.milestone_id == models.Milestone.id
+        ).filter(models.Milestone.goal_id == goal.id).scalar()
+        adjust_goal_key(db, goal_key(goal), milestones=sign * milestones, tasks=sign * tasks)
+
+
+def count_children(db: Session, goal, milestones=0, tasks=0):
+    """Adjust milestone/task counts under the rollup row of the given goal."""
+    adjust_goal_key(db, goal_key(goal), milestones=milestones, tasks=tasks)
+
+
+def count_milestone(db: Session, milestone, sign=1):
+    """Add or remove a milestone (and, when removing, its tasks) under its goal's row."""
+    goal = db.get(models.Goal, milestone.goal_id)
+    # As in count_goal, take the write lock before counting tasks
+    count_children(db, goal, milestones=sign)
+    if milestone.id is not None:
+        tasks = db.query(func.count(models.Task.id)).filter(models.Task.milestone_id == milestone.id).scalar()
+        count_children(db, goal, tasks=sign * tasks)
+
+
+def count_task(db: Session, task, sign=1):
+    milestone = db.get(models.Milestone, task.milestone_id)
+    count_children(db, db.get(models.Goal, milestone.goal_id), tasks=sign)
+
+
+def goal_totals(db: Session, goal_ids):
+    """Rollup counters contributed by the given goals, summed per key.
+
+    Taken before and after a bulk change, the difference is what `adjust_goal_totals` applies.
+    """
+    if not goal_ids:
+        return {}
+    milestones = db.query(
+        models.Milestone.goal_id.label("goal_id"),
+        func.count(models.Milestone.id).label("milestones"),
+    ).filter(models.Milestone.goal_id.in_(goal_ids)).group_by(models.Milestone.goal_id).subquery()
+    tasks = db.query(
+        models.Milestone.goal_id.label("goal_id"),
+        func.count(models.Task.id).label("tasks"),
+    ).join(models.Task, models.Task.milestone_id == models.Milestone.id).filter(
+        models.Milestone.goal_id.in_(goal_ids)
+    ).group_by(models.Milestone.goal_id).subquery()
+    rows = db.query(
+        models.Goal.year, models.Goal.type, models.Goal.team, models.Goal.product, models.Goal.progress,
+        func.coalesce(milestones.c.milestones, 0).label("milestones"),
+        func.coalesce(tasks.c.tasks, 0).label("tasks"),
+    ).outerjoin(milestones, milestones.c.goal_id == models.Goal.id).outerjoin(
+        tasks, tasks.c.goal_id == models.Goal.id
+    ).filter(models.Goal.id.in_(goal_ids)).order_by(models.Goal.id).all()
+    totals = {}
+    for row in rows:
+        key = tuple(goal_key(row).items())
+        counters = totals.setdefault(key, [0, 0, 0, 0])
+        for i, value in enumerate((1, row.progress or 0, row.milestones, row.tasks)):
+            counters[i] += value
+    return totals
+
+
+def adjust_goal_totals(db: Session, before, after):
+    """Move the goal rollups from one `goal_totals` snapshot to another.
+
+    Keys new to the table are added in goal id order, as `rebuild` would.
+    """
+    for key in list(after) + [key for key in before if key not in after]:
+        old, new = before.get(key, [0, 0, 0, 0]), after.get(key, [0, 0, 0, 0])
+        delta = [b - a for a, b in zip(old, new)]
+        if any(delta):
+            adjust_goal_key(db, dict(key), *delta)
+
+
+def count_member(db: Session, member, sign=1):
+    _upsert(db, models.MemberRollup, member_key(member), {"member_count": sign})
+
+
+def goal_rows(db: Session, year=None):
+    """Non-empty rollup rows in creation order (first goal of each key first)."""
+    query = db.query(models.GoalRollup).filter(models.GoalRollup.goal_count > 0)
+    if year:
+        query = query.filter(models.GoalRollup.year == year)
+    return query.order_by(literal_column("rowid")).all()
+
+
+def member_rows(db: Session, year=None):
+    query = db.query(models.MemberRollup).filter(models.MemberRollup.member_count > 0)
+    if year:
+        query = query.filter(models.MemberRollup.year == year)
+    return query.order_by(literal_column("rowid")).all()
+
+
+def _computed_goal_rollups(db: Session):
+    milestones = db.query(
+        models.Milestone.goal_id.label("goal_id"),
+        func.count(models.Milestone.id).label("milestones"),
+    ).group_by(models.Milestone.goal_id).subquery()
+    tasks = db.query(
+        models.Milestone.goal_id.label("goal_id"),
+        func.count(models.Task.id).label("tasks"),
+    ).join(models.Task, models.Task.milestone_id == models.Milestone.id).group_by(models.Milestone.goal_id).subquery()
+
+    team = func.coalesce(func.nullif(models.Goal.team, ""), UNASSIGNED)
+    product = func.coalesce(func.nullif(models.Goal.product, ""), UNASSIGNED)
+    rows = db.query(
+        models.Goal.year, models.Goal.type, team, product,
+        func.count(models.Goal.id),
+        func.coalesce(func.sum(models.Goal.progress), 0),
+        func.coalesce(func.sum(milestones.c.milestones), 0),
+        func.coalesce(func.sum(tasks.c.tasks), 0),
+    ).outerjoin(milestones, milestones.c.goal_id == models.Goal.id).outerjoin(
+        tasks, tasks.c.goal_id == models.Goal.id
+    ).group_by(models.Goal.year, models.Goal.type, team, product).order_by(func.min(models.Goal.id)).all()
+    return {tuple(row[:4]): tuple(row[4:]) for row in rows}
+
+
+def _computed_member_rollups(db: Session):
+    role = func.coalesce(func.nullif(models.Member.role, ""), OTHER_ROLE)
+    rows = db.query(
+        models.Member.year, role, models.Member.type, func.count(models.Member.id)
+    ).group_by(models.Member.year, role, models.Member.type).order_by(func.min(models.Member.id)).all()
+    return {tuple(row[:3]): (row[3],) for row in rows}
+
+
+def _drift(expected, stored):
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in list(expected) + [key for key in stored if key not in expected]
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def check(db: Session):
+    """Return (table, key, stored, expected) for every rollup row that has drifted."""
+    stored_goals = {
+        (r.year, r.type, r.team, r.product): tuple(getattr(r, name) for name in GOAL_COUNTERS)
+        for r in goal_rows(db)
+    }
+    stored_members = {(r.year, r.role, r.type): (r.member_count,) for r in member_rows(db)}
+    return (
+        [("goal_rollups", *d) for d in _drift(_computed_goal_rollups(db), stored_goals)]
+        + [("member_rollups", *d) for d in _drift(_computed_member_rollups(db), stored_members)]
+    )
+
+
+def rebuild(db: Session):
+    """Recompute both rollup tables from the source tables. Returns the drift found."""
+    drift = check(db)
+    db.query(models.GoalRollup).delete()
+    db.query(models.MemberRollup).delete()
+    goal_values = [
+        dict(zip(("year", "type", "team", "product") + GOAL_COUNTERS, key + counters))
+        for key, counters in _computed_goal_rollups(db).items()
+    ]
+    member_values = [
+        {"year": year, "role": role, "type": type, "member_count": count}
+        for (year, role, type), (count,) in _computed_member_rollups(db).items()
+    ]
+    if goal_values:
+        db.execute(insert(models.GoalRollup), goal_values)
+    if member_values:
+        db.execute(insert(models.MemberRollup), member_values)
+    return drift
+
+
+def main(argv):
+    db = SessionLocal()
+    try:
+        if "--check" in argv:
+            drift = check(db)
+        else:
+            drift = rebuild(db)
+            db.commit()
+        for table, key, stored, expected in drift:
+            print(f"{table} {key}: stored={stored} expected={expected}")
+        print(f"{len(drift)} drifted row(s)")
+    finally:
+        db.close()
+    return 1 if drift and "--check" in argv else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
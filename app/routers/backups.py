@@ -0,0 +1,42 @@
+"""Listing, taking and restoring the backups kept by app.backup."""
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app import backup, schemas
+from app.cache import response_cache
+from app.events import event_bus
+from app.database import close_db_connections
+
+router = APIRouter(prefix="/api/backups", tags=["backups"])
+
+
+@router.get("", response_model=List[schemas.BackupInfo])
+async def list_backups():
+    """Scheduled and manual backups, newest first"""
+    return [backup_info._asdict() for backup_info in await run_in_threadpool(backup.list_backups)]
+
+
+@router.post("", response_model=schemas.BackupInfo)
+async def create_backup():
+    """Back up the database now (returns the newest backup when nothing changed since it)"""
+    return (await run_in_threadpool(backup.take_backup))._asdict()
+
+
+@router.post("/{name}/restore")
+async def restore_backup(name: str):
+    """Replace the database with a backup"""
+    if await run_in_threadpool(backup.backup_path, name) is None:
+        raise HTTPException(status_code=404, detail="Backup not found")
+    try:
+        await run_in_threadpool(backup.restore_backup, name)
+    except backup.InvalidDatabase as e:
+        raise HTTPException(status_code=400, detail=f"Invalid backup: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to restore backup: {str(e)}")
+    finally:
+        await close_db_connections()
+        response_cache.clear()
+        event_bus.publish(None, "reset")
+    return {"message": f"Restored {name}"}
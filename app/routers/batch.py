@@ -0,0 +1,266 @@
+"""Many goal/milestone/task writes in one request and one transaction.
+
+Operations run in order. Consecutive operations of the same kind on the
+same entity are sent as one executemany (INSERT ... RETURNING for creates),
+so an import or a drag of many Gantt bars costs one round trip and one
+commit. A create may carry a `ref`, which later operations can use in place
+of the new row's id, as their target or as `goal_id`/`milestone_id`.
+
+Task counters are moved once per group of operations, and goal rollups are
+moved once for the whole batch, from the totals of the goals it touches
+taken before and after. The first failing operation rolls everything back.
+"""
+from collections import defaultdict
+from itertools import groupby
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import get_async_db
+from app import models, schemas, rollups, progress
+from app.cache import response_cache
+from app.events import event_bus
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+BATCH_WRITE_TABLES = ("goals", "milestones", "tasks", "goal_rollups")
+
+# entity: (model, create schema, update schema, parent entity, parent field)
+ENTITIES = {
+    "goal": (models.Goal, schemas.GoalCreate, schemas.GoalUpdate, None, None),
+    "milestone": (models.Milestone, schemas.MilestoneCreate, schemas.MilestoneUpdate, "goal", "goal_id"),
+    "task": (models.Task, schemas.TaskCreate, schemas.TaskUpdate, "milestone", "milestone_id"),
+}
+
+
+def _not_found(index, entity):
+    return HTTPException(status_code=404, detail=f"Operation {index}: {entity.capitalize()} not found")
+
+
+class Batch:
+    def __init__(self, db: Session):
+        self.db = db
+        self.conn = db.connection()
+        self.refs = {}
+        self.created_goals = set()
+        self.results = []
+
+    def resolve(self, index, entity, value):
+        """A row id given directly or as the ref of an earlier create."""
+        if not isinstance(value, str):
+            return value
+        if self.refs.get(value, (None,))[0] != entity:
+            raise HTTPException(status_code=400, detail=f"Operation {index}: unknown {entity} ref '{value}'")
+        return self.refs[value][1]
+
+    def validate(self, index, model, schema, data, **options):
+        try:
+            data = schema.model_validate(data).model_dump(**options)
+        except ValidationError as error:
+            errors = error.errors(include_url=False)
+        else:
+            # The update schemas take null for any field; the table doesn't for its required columns
+            errors = [
+                {"type": "value_error", "loc": (name,), "msg": "Field can't be null", "input": None}
+                for name, value in data.items() if value is None and not model.__table__.c[name].nullable
+            ]
+        if errors:
+            raise RequestValidationError([
+                {**detail, "loc": ("body", "operations", index, "data") + tuple(detail["loc"])} for detail in errors
+            ])
+        return data
+
+    def existing(self, model, ids, *columns):
+        """Rows of `model` by id, with the requested columns."""
+        return {row.id: row for row in self.conn.execute(select(model.id, *columns).where(model.id.in_(set(ids))))}
+
+    def require(self, rows, index, entity, id):
+        if id not in rows:
+            raise _not_found(index, entity)
+        return rows[id]
+
+    def check_assignees(self, items):
+        ids = {data["assignee_id"] for _, data in items if data.get("assignee_id")}
+        found = self.existing(models.Member, ids) if ids else {}
+        for index, data in items:
+            if data.get("assignee_id") and data["assignee_id"] not in found:
+                raise HTTPException(status_code=404, detail=f"Operation {index}: Assignee not found")
+
+    def record(self, index, operation, id):
+        self.results.append({
+            "index": index, "op": operation.op, "entity": operation.entity, "id": id, "ref": operation.ref,
+        })
+
+    # Task counters on milestones and goals, as the single-row handlers keep them
+    def move_counters(self, changes):
+        """Apply (milestone_id, goal_id, tasks, progress) changes to the task counters."""
+        milestones, goals = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+        for milestone_id, goal_id, tasks, total in changes:
+            for deltas, id in ((milestones, milestone_id), (goals, goal_id)):
+                if id is not None:
+                    deltas[id][0] += tasks
+                    deltas[id][1] += total
+        progress.adjust_many(self.db, milestones, goals)
+
+    def create(self, entity, operations):
+        model, create_schema, _, parent, parent_field = ENTITIES[entity]
+        items = []
+        for index, operation in operations:
+            data = dict(operation.data)
+            if parent_field:
+                data[parent_field] = self.resolve(index, parent, data.get(parent_field))
+            items.append((index, self.validate(index, model, create_schema, data)))
+        if parent:
+            parents = self.existing(
+                ENTITIES[parent][0], [data[parent_field] for _, data in items],
+                *([models.Milestone.goal_id] if parent == "milestone" else [])
+            )
+            for index, data in items:
+                self.require(parents, index, parent, data[parent_field])
+        if entity == "task":
+            self.check_assignees(items)
+
+        ids = self.conn.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), [data for _, data in items]
+        ).scalars().all()
+        for (index, operation), id in zip(operations, ids):
+            if operation.ref in self.refs:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: ref '{operation.ref}' already used")
+            if operation.ref is not None:
+                self.refs[operation.ref] = (entity, id)
+            self.record(index, operation, id)
+        if entity == "goal":
+            self.created_goals.update(ids)
+        elif entity == "task":
+            self.move_counters(
+                (data["milestone_id"], parents[data["milestone_id"]].goal_id, 1, data["progress"] or 0)
+                for _, data in items
+            )
+
+    def task_rows(self, ids):
+        """Tasks by id with what their counters need: milestone, goal and progress."""
+        return {row.id: row for row in self.conn.execute(
+            select(models.Task.id, models.Task.milestone_id, models.Task.progress, models.Milestone.goal_id)
+            .join(models.Milestone, models.Milestone.id == models.Task.milestone_id)
+            .where(models.Task.id.in_(set(ids)))
+        )}
+
+    def update(self, entity, operations):
+        model, _, update_schema, _, _ = ENTITIES[entity]
+        items = []
+        for index, operation in operations:
+            id = self.resolve(index, entity, operation.id)
+            items.append((index, id, self.validate(index, model, update_schema, operation.data, exclude_unset=True)))
+        ids = [id for _, id, _ in items]
+        rows = self.task_rows(ids) if entity == "task" else self.existing(model, ids)
+        for (index, operation), (_, id, _) in zip(operations, items):
+            self.require(rows, index, entity, id)
+            self.record(index, operation, id)
+        if entity == "task":
+            self.check_assignees([(index, data) for index, _, data in items])
+
+        # Same-shaped updates share a statement; order is kept, so later edits of a row win
+        for keys, group in groupby(items, key=lambda item: tuple(sorted(item[2]))):
+            if keys:
+                self.conn.execute(
+                    update(model).where(model.id == bindparam("_id")), [{"_id": id, **data} for _, id, data in group]
+                )
+
+        if entity == "task":
+            current = {id: row.progress or 0 for id, row in rows.items()}
+            changes = []
+            for _, id, data in items:
+                if "progress" in data:
+                    new = data["progress"] or 0
+                    changes.append((rows[id].milestone_id, rows[id].goal_id, 0, new - current[id]))
+                    current[id] = new
+            self.move_counters(changes)
+
+    def delete(self, entity, operations):
+        model = ENTITIES[entity][0]
+        ids = [self.resolve(index, entity, operation.id) for index, operation in operations]
+        if entity == "task":
+            rows = self.task_rows(ids)
+        elif entity == "milestone":
+            rows = self.existing(
+                model, ids, models.Milestone.goal_id, models.Milestone.task_count, models.Milestone.task_progress_sum
+            )
+        else:
+            rows = self.existing(model, ids)
+        for (index, operation), id in zip(operations, ids):
+            self.require(rows, index, entity, id)
+            self.record(index, operation, id)
+
+        doomed = list(rows)
+        if entity == "task":
+            self.move_counters((row.milestone_id, row.goal_id, -1, -(row.progress or 0)) for row in rows.values())
+        elif entity == "milestone":
+            # Its tasks leave the goal's counters along with it
+            self.move_counters((None, row.goal_id, -row.task_count, -row.task_progress_sum) for row in rows.values())
+        # No ON DELETE CASCADE without foreign_keys=ON, so children go first
+        if entity == "goal":
+            milestone_ids = select(models.Milestone.id).where(models.Milestone.goal_id.in_(doomed))
+            self.conn.execute(delete(models.Task).where(models.Task.milestone_id.in_(milestone_ids)))
+            self.conn.execute(delete(models.Milestone).where(models.Milestone.goal_id.in_(doomed)))
+        elif entity == "milestone":
+            self.conn.execute(delete(models.Task).where(models.Task.milestone_id.in_(doomed)))
+        self.conn.execute(delete(model).where(model.id.in_(doomed)))
+
+    def touched_goals(self, operations):
+        """Existing goals the operations can change, found before any of them run."""
+        ids = defaultdict(set)
+        for operation in operations:
+            entity, data = operation.entity, operation.data
+            if operation.op != "create" and isinstance(operation.id, int):
+                ids[entity].add(operation.id)
+            elif operation.op == "create" and entity != "goal":
+                parent, field = ENTITIES[entity][3:]
+                if isinstance(data.get(field), int):
+                    ids[parent].add(data[field])
+        goals = set(ids["goal"])
+        if ids["milestone"]:
+            goals.update(self.conn.execute(
+                select(models.Milestone.goal_id).where(models.Milestone.id.in_(ids["milestone"]))
+            ).scalars())
+        if ids["task"]:
+            goals.update(self.conn.execute(
+                select(models.Milestone.goal_id).join(models.Task, models.Task.milestone_id == models.Milestone.id)
+                .where(models.Task.id.in_(ids["task"]))
+            ).scalars())
+        return goals
+
+    def run(self, operations):
+        goals = self.touched_goals(operations)
+        before = rollups.goal_totals(self.db, goals)
+        for (op, entity), group in groupby(enumerate(operations), key=lambda item: (item[1].op, item[1].entity)):
+            getattr(self, op)(entity, list(group))
+        after = rollups.goal_totals(self.db, goals | self.created_goals)
+        rollups.adjust_goal_totals(self.db, before, after)
+        # Years whose cached aggregates are now stale
+        return {dict(key)["year"] for key in list(before) + list(after)}
+
+
+def apply(db: Session, operations):
+    """Run the operations; returns the per-operation results and the years they touched."""
+    batch = Batch(db)
+    years = batch.run(operations)
+    return batch.results, years
+
+
+@router.post("", response_model=List[schemas.BatchResult])
+async def run_batch(batch: schemas.BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Apply an ordered list of goal/milestone/task creates, updates and deletes in one transaction"""
+    results, years = await db.run_sync(apply, batch.operations)
+    await db.commit()
+    if years:
+        response_cache.invalidate(BATCH_WRITE_TABLES, *years)
+    # Results don't say which year each row is in
+    year = next(iter(years)) if len(years) == 1 else None
+    for result in results:
+        event_bus.publish(result["entity"], result["op"], result["id"], year)
+    return results
@@ -0,0 +1,29 @@
+"""Incremental sync: rows written and deleted since a change token (see app.changes)."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import changes, schemas, versions
+from app.database import get_async_db
+from app.migrations import CHANGE_TABLES
+
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+CHANGE_VERSIONS = versions.conditional(*CHANGE_TABLES)
+
+
+@router.get("", response_model=schemas.ChangeSet, dependencies=[CHANGE_VERSIONS])
+async def get_changes(
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Rows created or updated and ids deleted after `since`; call again with `token` while `more` is true.
+
+    Without `since`, or when it can't be continued from, `reset` is true and everything comes back.
+    """
+    result = await db.run_sync(changes.changes_since, since, limit)
+    return ORJSONResponse(result, headers=dict(response.headers))
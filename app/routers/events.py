@@ -0,0 +1,25 @@
+"""Server-Sent Events feed of the changes published through app.events."""
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app.events import event_bus
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+@router.get("")
+async def stream_events(last_event_id: Optional[str] = Header(None)):
+    """`change` events ({entity, id, year, op}) as writes commit; `resync` when the client should reload"""
+    return StreamingResponse(
+        event_bus.stream(last_event_id), media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats")
+async def get_event_stats():
+    """Open subscriptions and counts of published and overflowed events"""
+    return event_bus.stats()
@@ -1,78 +1,211 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from functools import lru_cache
 
-from app.database import get_db
-from app import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, load_only
+from typing import List, Literal, Optional
+from pydantic import TypeAdapter
+
+from app.database import get_async_db
+from app import models, schemas, rollups, versions
+from app.pagination import paginate, LimitQuery
+from app.cache import response_cache
+from app.responses import model_response
+from app.events import event_bus
 
 router = APIRouter(prefix="/api/goals", tags=["goals"])
 
+# ETag / If-None-Match for the reads below, keyed on the tables they read
+TREE_VERSIONS = versions.conditional("goals", "milestones", "tasks", "members")
+
+# Cached aggregates a goal write can change; deletes take their milestones and tasks along
+GOAL_WRITE_TABLES = ("goals", "milestones", "tasks", "goal_rollups")
+
+# Tag counts only change with goals.tags
+TAG_VERSIONS = versions.conditional("goals")
+
+# How much of the goal tree a listing serializes
+DEPTH_SCHEMAS = {
+    "goal": schemas.GoalShallow,
+    "milestone": schemas.GoalWithMilestones,
+    "task": schemas.Goal,
+}
+
+
+def goal_tree_options(depth="task"):
+    """Batched IN-based loading instead of one wide joined row per task."""
+    if depth == "goal":
+        return []
+    if depth == "milestone":
+        return [selectinload(models.Goal.milestones)]
+    return [selectinload(models.Goal.milestones).selectinload(models.Milestone.tasks).selectinload(models.Task.assignee)]
+
+
+async def load_goal(db: AsyncSession, goal_id: int, depth="task"):
+    """Fetch one goal with its tree loaded up front."""
+    result = await db.scalars(
+        select(models.Goal).options(*goal_tree_options(depth)).where(models.Goal.id == goal_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.first()
+
+
+def _parse_fields(fields: str, schema):
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in schema.model_fields if name in requested]
+
+
+@lru_cache
+def _field_adapter(schema, name):
+    return TypeAdapter(schema.model_fields[name].annotation)
+
+
+def _dump_fields(goal, schema, selected):
+    item = {}
+    for name in selected:
+        adapter = _field_adapter(schema, name)
+        item[name] = adapter.dump_python(adapter.validate_python(getattr(goal, name), from_attributes=True), mode="json")
+    return item
 
-@router.get("/", response_model=List[schemas.Goal])
-def get_goals(
+
+def parse_tags(tags: str):
+    """Distinct tag names from a comma-separated list; names compare case-insensitively, like the tags table."""
+    names = {}
+    for name in tags.split(","):
+        if name.strip():
+            names.setdefault(name.strip().lower(), name.strip())
+    return list(names.values())
+
+
+def tagged(names, match="any"):
+    """Condition on Goal for carrying any (or all) of the tag names, looked up through goal_tags."""
+    goal_ids = select(models.GoalTag.goal_id).join(models.Tag, models.Tag.id == models.GoalTag.tag_id).where(
+        models.Tag.name.in_(names)
+    )
+    if match == "all":
+        goal_ids = goal_ids.group_by(models.GoalTag.goal_id).having(func.count() == len(names))
+    return models.Goal.id.in_(goal_ids)
+
+
+@router.get("/", response_model=List[schemas.Goal], dependencies=[TREE_VERSIONS])
+async def get_goals(
+    response: Response,
     year: int = None,
     quarter: str = None,
     team: str = None,
     product: str = None,
     type: str = None,
-    db: Session = Depends(get_db)
+    tags: Optional[str] = None,
+    tag_match: Literal["any", "all"] = "any",
+    limit: Optional[int] = LimitQuery,
+    cursor: Optional[str] = None,
+    depth: Literal["goal", "milestone", "task"] = "task",
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.Goal).options(
-        joinedload(models.Goal.milestones).joinedload(models.Milestone.tasks).joinedload(models.Task.assignee)
-    )
+    """List goals. `depth` trims the nested tree and `fields` (comma-separated) picks goal fields.
+
+    `tags` (comma-separated) keeps goals with any of the tags, or all of them with `tag_match=all`.
+    """
+    schema = DEPTH_SCHEMAS[depth]
+    selected = _parse_fields(fields, schema) if fields else None
+    if selected is not None and "milestones" not in selected:
+        depth = "goal"
+
+    query = select(models.Goal).options(*goal_tree_options(depth))
+    if selected is not None:
+        columns = [getattr(models.Goal, name) for name in selected if name != "milestones"]
+        query = query.options(load_only(models.Goal.id, *columns))
     if year:
-        query = query.filter(models.Goal.year == year)
+        query = query.where(models.Goal.year == year)
     if quarter:
-        query = query.filter(models.Goal.quarter == quarter)
+        query = query.where(models.Goal.quarter == quarter)
     if team:
-        query = query.filter(models.Goal.team == team)
+        query = query.where(models.Goal.team == team)
     if product:
-        query = query.filter(models.Goal.product == product)
+        query = query.where(models.Goal.product == product)
     if type:
-        query = query.filter(models.Goal.type == type)
-    return query.all()
+        query = query.where(models.Goal.type == type)
+    if tags and parse_tags(tags):
+        query = query.where(tagged(parse_tags(tags), tag_match))
+    goals = await paginate(db, query, response, limit, cursor)
+
+    if selected is None:
+        # Shallower depths skip the full response model, so the nested tree is never built
+        return model_response(List[schema], goals, response)
+    content = [_dump_fields(goal, schema, selected) for goal in goals]
+    return ORJSONResponse(content, headers=dict(response.headers))
+
+
+@router.get("/tags", response_model=List[schemas.TagCount], dependencies=[TAG_VERSIONS])
+async def get_tag_counts(response: Response, year: int = None, db: AsyncSession = Depends(get_async_db)):
+    """Every tag with the number of goals carrying it, most used first"""
+    return await response_cache.serve(response, ("goal_tags", year), ("goals",), year, lambda: tag_counts(db, year))
+
+
+async def tag_counts(db: AsyncSession, year):
+    count = func.count(models.GoalTag.goal_id)
+    query = select(models.Tag.name, count).join(models.GoalTag, models.GoalTag.tag_id == models.Tag.id)
+    if year:
+        query = query.join(models.Goal, models.Goal.id == models.GoalTag.goal_id).where(models.Goal.year == year)
+    rows = await db.execute(query.group_by(models.Tag.id).order_by(count.desc(), models.Tag.name))
+    return [{"name": name, "count": goals} for name, goals in rows.all()]
 
 
-@router.get("/{goal_id}", response_model=schemas.Goal)
-def get_goal(goal_id: int, db: Session = Depends(get_db)):
-    goal = db.query(models.Goal).options(
-        joinedload(models.Goal.milestones).joinedload(models.Milestone.tasks).joinedload(models.Task.assignee)
-    ).filter(models.Goal.id == goal_id).first()
+@router.get("/{goal_id}", response_model=schemas.Goal, dependencies=[TREE_VERSIONS])
+async def get_goal(goal_id: int, db: AsyncSession = Depends(get_async_db)):
+    goal = await load_goal(db, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     return goal
 
 
 @router.post("/", response_model=schemas.Goal)
-def create_goal(goal: schemas.GoalCreate, db: Session = Depends(get_db)):
+async def create_goal(goal: schemas.GoalCreate, db: AsyncSession = Depends(get_async_db)):
     db_goal = models.Goal(**goal.model_dump())
     db.add(db_goal)
-    db.commit()
-    db.refresh(db_goal)
-    return db_goal
+    await db.run_sync(rollups.count_goal, db_goal)
+    await db.commit()
+    response_cache.invalidate(GOAL_WRITE_TABLES, db_goal.year)
+    event_bus.publish("goal", "create", db_goal.id, db_goal.year)
+    return await load_goal(db, db_goal.id)
 
 
 @router.put("/{goal_id}", response_model=schemas.Goal)
-def update_goal(goal_id: int, goal: schemas.GoalUpdate, db: Session = Depends(get_db)):
-    db_goal = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
+async def update_goal(goal_id: int, goal: schemas.GoalUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_goal = await db.get(models.Goal, goal_id)
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
+    old_year = db_goal.year
     update_data = goal.model_dump(exclude_unset=True)
+    await db.run_sync(rollups.count_goal, db_goal, -1)
     for key, value in update_data.items():
         setattr(db_goal, key, value)
+    await db.run_sync(rollups.count_goal, db_goal)
 
-    db.commit()
-    db.refresh(db_goal)
-    return db_goal
+    await db.commit()
+    response_cache.invalidate(GOAL_WRITE_TABLES, old_year, db_goal.year)
+    if old_year != db_goal.year:
+        event_bus.publish("goal", "delete", goal_id, old_year)
+    event_bus.publish("goal", "update", goal_id, db_goal.year)
+    return await load_goal(db, goal_id)
 
 
 @router.delete("/{goal_id}")
-def delete_goal(goal_id: int, db: Session = Depends(get_db)):
-    db_goal = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
+async def delete_goal(goal_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_goal = await db.get(models.Goal, goal_id)
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
-    db.delete(db_goal)
-    db.commit()
+    await db.run_sync(rollups.count_goal, db_goal, -1)
+    await db.delete(db_goal)
+    await db.commit()
+    response_cache.invalidate(GOAL_WRITE_TABLES, db_goal.year)
+    event_bus.publish("goal", "delete", goal_id, db_goal.year)
     return {"message": "Goal deleted successfully"}
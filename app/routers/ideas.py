@@ -1,76 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, with_expression
+from typing import List, Literal, Optional
+from app.database import get_async_db
+from app import models, schemas, rollups, versions
+from app.cache import response_cache
+from app.responses import model_response
+from app.events import event_bus
+from app.pagination import paginate, LimitQuery
+from app.routers.goals import load_goal
 
 router = APIRouter(prefix="/api/ideas", tags=["ideas"])
 
+IDEA_VERSIONS = versions.conditional("ideas", "comments")
 
-@router.get("/", response_model=List[schemas.Idea])
-def get_ideas(
+# Idea board order: priority, then newest first
+IDEA_ORDER = [(models.Idea.priority, False), (models.Idea.created_at, True), (models.Idea.id, True)]
+
+
+# Counted per listed idea through ix_comments_idea_id, so a page only counts its own comments
+COMMENT_COUNT = with_expression(
+    models.Idea.comment_count,
+    select(func.count()).where(models.Comment.idea_id == models.Idea.id).correlate_except(models.Comment)
+    .scalar_subquery()
+)
+
+
+async def load_idea(db: AsyncSession, idea_id: int):
+    """Fetch one idea with its comments loaded up front."""
+    result = await db.scalars(
+        select(models.Idea).options(selectinload(models.Idea.comments), COMMENT_COUNT)
+        .where(models.Idea.id == idea_id).execution_options(populate_existing=True)
+    )
+    return result.first()
+
+
+@router.get("/", response_model=List[schemas.Idea], dependencies=[IDEA_VERSIONS])
+async def get_ideas(
+    response: Response,
     year: Optional[int] = None,
     status: Optional[str] = None,
     product: Optional[str] = None,
-    db: Session = Depends(get_db)
+    include: Optional[Literal["comments"]] = None,
+    limit: Optional[int] = LimitQuery,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(models.Idea)
+    """List ideas with their comment counts; `include=comments` adds the comments themselves."""
+    query = select(models.Idea).options(COMMENT_COUNT)
+    if include == "comments":
+        query = query.options(selectinload(models.Idea.comments))
     if year:
-        query = query.filter(models.Idea.year == year)
+        query = query.where(models.Idea.year == year)
     if status:
-        query = query.filter(models.Idea.status == status)
+        query = query.where(models.Idea.status == status)
     if product:
-        query = query.filter(models.Idea.product == product)
-    return query.order_by(models.Idea.priority.asc(), models.Idea.created_at.desc()).all()
+        query = query.where(models.Idea.product == product)
+    ideas = await paginate(db, query, response, limit, cursor, IDEA_ORDER)
+    schema = schemas.Idea if include == "comments" else schemas.IdeaShallow
+    return model_response(List[schema], ideas, response)
 
 
-@router.get("/{idea_id}", response_model=schemas.Idea)
-def get_idea(idea_id: int, db: Session = Depends(get_db)):
-    idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+@router.get("/{idea_id}", response_model=schemas.Idea, dependencies=[IDEA_VERSIONS])
+async def get_idea(idea_id: int, db: AsyncSession = Depends(get_async_db)):
+    idea = await load_idea(db, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     return idea
 
 
 @router.post("/", response_model=schemas.Idea)
-def create_idea(idea: schemas.IdeaCreate, db: Session = Depends(get_db)):
+async def create_idea(idea: schemas.IdeaCreate, db: AsyncSession = Depends(get_async_db)):
     db_idea = models.Idea(**idea.model_dump())
     db.add(db_idea)
-    db.commit()
-    db.refresh(db_idea)
-    return db_idea
+    await db.commit()
+    response_cache.invalidate(("ideas",), db_idea.year)
+    event_bus.publish("idea", "create", db_idea.id, db_idea.year)
+    return await load_idea(db, db_idea.id)
 
 
 @router.put("/{idea_id}", response_model=schemas.Idea)
-def update_idea(idea_id: int, idea: schemas.IdeaUpdate, db: Session = Depends(get_db)):
-    db_idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+async def update_idea(idea_id: int, idea: schemas.IdeaUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_idea = await db.get(models.Idea, idea_id)
     if not db_idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
+    old_year = db_idea.year
     update_data = idea.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_idea, key, value)
 
-    db.commit()
-    db.refresh(db_idea)
-    return db_idea
+    await db.commit()
+    response_cache.invalidate(("ideas",), old_year, db_idea.year)
+    if old_year != db_idea.year:
+        event_bus.publish("idea", "delete", idea_id, old_year)
+    event_bus.publish("idea", "update", idea_id, db_idea.year)
+    return await load_idea(db, idea_id)
 
 
 @router.delete("/{idea_id}")
-def delete_idea(idea_id: int, db: Session = Depends(get_db)):
-    db_idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+async def delete_idea(idea_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_idea = await db.get(models.Idea, idea_id)
     if not db_idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
-    db.delete(db_idea)
-    db.commit()
+    await db.delete(db_idea)
+    await db.commit()
+    response_cache.invalidate(("ideas",), db_idea.year)
+    event_bus.publish("idea", "delete", idea_id, db_idea.year)
     return {"message": "Idea deleted successfully"}
 
 
 # Convert idea to goal
 @router.post("/{idea_id}/convert", response_model=schemas.Goal)
-def convert_idea_to_goal(idea_id: int, db: Session = Depends(get_db)):
-    idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+async def convert_idea_to_goal(idea_id: int, db: AsyncSession = Depends(get_async_db)):
+    idea = await db.get(models.Idea, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -87,27 +132,38 @@ def convert_idea_to_goal(idea_id: int, db: Session = Depends(get_db)):
         progress=0
     )
     db.add(goal)
+    await db.run_sync(rollups.count_goal, goal)
 
     # Update idea status
     idea.status = 'converted'
 
-    db.commit()
-    db.refresh(goal)
-    return goal
+    await db.commit()
+    response_cache.invalidate(("ideas", "goals", "goal_rollups"), goal.year)
+    event_bus.publish("idea", "update", idea_id, idea.year)
+    event_bus.publish("goal", "create", goal.id, goal.year)
+    return await load_goal(db, goal.id)
 
 
 # Comment endpoints
-@router.get("/{idea_id}/comments", response_model=List[schemas.Comment])
-def get_comments(idea_id: int, db: Session = Depends(get_db)):
-    idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+@router.get("/{idea_id}/comments", response_model=List[schemas.Comment], dependencies=[IDEA_VERSIONS])
+async def get_comments(
+    idea_id: int,
+    response: Response,
+    limit: Optional[int] = LimitQuery,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Comments oldest first; pass `limit` to page through long threads"""
+    idea = await db.get(models.Idea, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
-    return idea.comments
+    query = select(models.Comment).where(models.Comment.idea_id == idea_id)
+    return model_response(List[schemas.Comment], await paginate(db, query, response, limit, cursor), response)
 
 
 @router.post("/{idea_id}/comments", response_model=schemas.Comment)
-def create_comment(idea_id: int, comment: schemas.CommentBase, db: Session = Depends(get_db)):
-    idea = db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+async def create_comment(idea_id: int, comment: schemas.CommentBase, db: AsyncSession = Depends(get_async_db)):
+    idea = await db.get(models.Idea, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
 
@@ -117,17 +173,20 @@ def create_comment(idea_id: int, comment: schemas.CommentBase, db: Session = Dep
         content=comment.content
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    event_bus.publish("comment", "create", db_comment.id, idea.year, idea_id)
     return db_comment
 
 
 @router.delete("/comments/{comment_id}")
-def delete_comment(comment_id: int, db: Session = Depends(get_db)):
-    comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
+    comment = await db.get(models.Comment, comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
-    db.delete(comment)
-    db.commit()
+    idea = await db.get(models.Idea, comment.idea_id)
+    await db.delete(comment)
+    await db.commit()
+    event_bus.publish("comment", "delete", comment_id, idea.year if idea else None, comment.idea_id)
     return {"message": "Comment deleted successfully"}
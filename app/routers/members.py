@@ -1,56 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-
-from app.database import get_db
-from app import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.database import get_async_db
+from app import models, schemas, rollups, versions
+from app.cache import response_cache
+from app.events import event_bus
+from app.pagination import paginate, LimitQuery
+from app.responses import model_response
 
 router = APIRouter(prefix="/api/members", tags=["members"])
 
+MEMBER_VERSIONS = versions.conditional("members")
+
+SUMMARY_TABLES = ("member_rollups", "members")
+MEMBER_WRITE_TABLES = ("members", "member_rollups")
 
-@router.get("/", response_model=List[schemas.Member])
-def get_members(year: int = None, team: str = None, type: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.Member)
+
+@router.get("/", response_model=List[schemas.Member], dependencies=[MEMBER_VERSIONS])
+async def get_members(
+    response: Response,
+    year: int = None,
+    team: str = None,
+    type: str = None,
+    limit: Optional[int] = LimitQuery,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(models.Member)
     if year:
-        query = query.filter(models.Member.year == year)
+        query = query.where(models.Member.year == year)
     if team:
-        query = query.filter(models.Member.team == team)
+        query = query.where(models.Member.team == team)
     if type:
-        query = query.filter(models.Member.type == type)
-    return query.all()
+        query = query.where(models.Member.type == type)
+    return model_response(List[schemas.Member], await paginate(db, query, response, limit, cursor), response)
 
 
-@router.get("/summary")
-def get_members_summary(year: int = None, db: Session = Depends(get_db)):
+@router.get("/summary", dependencies=[versions.conditional(*SUMMARY_TABLES)])
+async def get_members_summary(response: Response, year: int = None, db: AsyncSession = Depends(get_async_db)):
     """Get member statistics including role distribution and product assignments"""
-    # Get all members for the year
-    members_query = db.query(models.Member)
-    if year:
-        members_query = members_query.filter(models.Member.year == year)
-    all_members = members_query.all()
+    return await response_cache.serve(
+        response, ("members_summary", year), SUMMARY_TABLES, year, lambda: members_summary(db, year)
+    )
 
-    # Basic counts
-    total = len(all_members)
-    existing = len([m for m in all_members if m.type == 'existing'])
-    new = len([m for m in all_members if m.type == 'new'])
 
-    # By role
+async def members_summary(db: AsyncSession, year):
+    # Counts come from the precomputed rollup rows
+    total = existing = new = 0
     by_role = {}
-    for member in all_members:
-        role = member.role or 'Other'
-        if role not in by_role:
-            by_role[role] = {'total': 0, 'existing': 0, 'new': 0}
-        by_role[role]['total'] += 1
-        if member.type == 'existing':
-            by_role[role]['existing'] += 1
+    for row in await db.run_sync(rollups.member_rows, year):
+        total += row.member_count
+        if row.role not in by_role:
+            by_role[row.role] = {'total': 0, 'existing': 0, 'new': 0}
+        by_role[row.role]['total'] += row.member_count
+        if row.type == 'existing':
+            existing += row.member_count
+            by_role[row.role]['existing'] += row.member_count
         else:
-            by_role[role]['new'] += 1
+            if row.type == 'new':
+                new += row.member_count
+            by_role[row.role]['new'] += row.member_count
 
     # Get product assignments from member's product field (배치 예정)
+    members_query = select(
+        models.Member.id, models.Member.name, models.Member.role, models.Member.type, models.Member.product
+    )
+    if year:
+        members_query = members_query.where(models.Member.year == year)
+
     by_product = {}
     unassigned_members = []
 
-    for member in all_members:
+    for member in await db.execute(members_query.order_by(models.Member.id)):
         member_data = {
             'id': member.id,
             'name': member.name,
@@ -80,44 +103,57 @@ def get_members_summary(year: int = None, db: Session = Depends(get_db)):
     }
 
 
-@router.get("/{member_id}", response_model=schemas.Member)
-def get_member(member_id: int, db: Session = Depends(get_db)):
-    member = db.query(models.Member).filter(models.Member.id == member_id).first()
+@router.get("/{member_id}", response_model=schemas.Member, dependencies=[MEMBER_VERSIONS])
+async def get_member(member_id: int, db: AsyncSession = Depends(get_async_db)):
+    member = await db.get(models.Member, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     return member
 
 
 @router.post("/", response_model=schemas.Member)
-def create_member(member: schemas.MemberCreate, db: Session = Depends(get_db)):
+async def create_member(member: schemas.MemberCreate, db: AsyncSession = Depends(get_async_db)):
     db_member = models.Member(**member.model_dump())
     db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
+    await db.run_sync(rollups.count_member, db_member)
+    await db.commit()
+    response_cache.invalidate(MEMBER_WRITE_TABLES, db_member.year)
+    event_bus.publish("member", "create", db_member.id, db_member.year)
+    await db.refresh(db_member)
     return db_member
 
 
 @router.put("/{member_id}", response_model=schemas.Member)
-def update_member(member_id: int, member: schemas.MemberUpdate, db: Session = Depends(get_db)):
-    db_member = db.query(models.Member).filter(models.Member.id == member_id).first()
+async def update_member(member_id: int, member: schemas.MemberUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_member = await db.get(models.Member, member_id)
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
 
+    old_year = db_member.year
     update_data = member.model_dump(exclude_unset=True)
+    await db.run_sync(rollups.count_member, db_member, -1)
     for key, value in update_data.items():
         setattr(db_member, key, value)
-
-    db.commit()
-    db.refresh(db_member)
+    await db.run_sync(rollups.count_member, db_member)
+
+    await db.commit()
+    response_cache.invalidate(MEMBER_WRITE_TABLES, old_year, db_member.year)
+    if old_year != db_member.year:
+        event_bus.publish("member", "delete", member_id, old_year)
+    event_bus.publish("member", "update", member_id, db_member.year)
+    await db.refresh(db_member)
     return db_member
 
 
 @router.delete("/{member_id}")
-def delete_member(member_id: int, db: Session = Depends(get_db)):
-    db_member = db.query(models.Member).filter(models.Member.id == member_id).first()
+async def delete_member(member_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_member = await db.get(models.Member, member_id)
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
 
-    db.delete(db_member)
-    db.commit()
+    await db.run_sync(rollups.count_member, db_member, -1)
+    await db.delete(db_member)
+    await db.commit()
+    response_cache.invalidate(MEMBER_WRITE_TABLES, db_member.year)
+    event_bus.publish("member", "delete", member_id, db_member.year)
     return {"message": "Member deleted successfully"}
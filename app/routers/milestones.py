@@ -1,50 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 
-from app.database import get_db
-from app import models, schemas
+from app.database import get_async_db
+from app import models, schemas, rollups, progress, versions
+from app.cache import response_cache
+from app.events import event_bus
+from app.responses import model_response
 
 router = APIRouter(prefix="/api/milestones", tags=["milestones"])
 
+MILESTONE_VERSIONS = versions.conditional("milestones", "tasks", "members")
 
-@router.get("/", response_model=List[schemas.Milestone])
-def get_milestones(goal_id: int = None, db: Session = Depends(get_db)):
-    query = db.query(models.Milestone).options(
-        joinedload(models.Milestone.tasks).joinedload(models.Task.assignee)
+MILESTONE_WRITE_TABLES = ("milestones", "tasks", "goal_rollups")
+
+
+def milestone_tree_options():
+    return [selectinload(models.Milestone.tasks).selectinload(models.Task.assignee)]
+
+
+async def milestone_year(db: AsyncSession, milestone_id: int):
+    """Year of the goal a milestone belongs to, for scoping cache invalidation."""
+    return await db.scalar(
+        select(models.Goal.year).join(models.Milestone, models.Milestone.goal_id == models.Goal.id)
+        .where(models.Milestone.id == milestone_id)
     )
+
+
+async def load_milestone(db: AsyncSession, milestone_id: int):
+    """Fetch one milestone with its tasks loaded up front."""
+    result = await db.scalars(
+        select(models.Milestone).options(*milestone_tree_options()).where(models.Milestone.id == milestone_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.first()
+
+
+@router.get("/", response_model=List[schemas.Milestone], dependencies=[MILESTONE_VERSIONS])
+async def get_milestones(response: Response, goal_id: int = None, db: AsyncSession = Depends(get_async_db)):
+    query = select(models.Milestone).options(*milestone_tree_options())
     if goal_id:
-        query = query.filter(models.Milestone.goal_id == goal_id)
-    return query.all()
+        query = query.where(models.Milestone.goal_id == goal_id)
+    return model_response(List[schemas.Milestone], (await db.scalars(query)).all(), response)
 
 
-@router.get("/{milestone_id}", response_model=schemas.Milestone)
-def get_milestone(milestone_id: int, db: Session = Depends(get_db)):
-    milestone = db.query(models.Milestone).options(
-        joinedload(models.Milestone.tasks).joinedload(models.Task.assignee)
-    ).filter(models.Milestone.id == milestone_id).first()
+@router.get("/{milestone_id}", response_model=schemas.Milestone, dependencies=[MILESTONE_VERSIONS])
+async def get_milestone(milestone_id: int, db: AsyncSession = Depends(get_async_db)):
+    milestone = await load_milestone(db, milestone_id)
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
     return milestone
 
 
 @router.post("/", response_model=schemas.Milestone)
-def create_milestone(milestone: schemas.MilestoneCreate, db: Session = Depends(get_db)):
+async def create_milestone(milestone: schemas.MilestoneCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if goal exists
-    goal = db.query(models.Goal).filter(models.Goal.id == milestone.goal_id).first()
+    goal = await db.get(models.Goal, milestone.goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
     db_milestone = models.Milestone(**milestone.model_dump())
     db.add(db_milestone)
-    db.commit()
-    db.refresh(db_milestone)
-    return db_milestone
+    await db.run_sync(rollups.count_milestone, db_milestone)
+    await db.commit()
+    response_cache.invalidate(MILESTONE_WRITE_TABLES, goal.year)
+    event_bus.publish("milestone", "create", db_milestone.id, goal.year, goal.id)
+    return await load_milestone(db, db_milestone.id)
 
 
 @router.put("/{milestone_id}", response_model=schemas.Milestone)
-def update_milestone(milestone_id: int, milestone: schemas.MilestoneUpdate, db: Session = Depends(get_db)):
-    db_milestone = db.query(models.Milestone).filter(models.Milestone.id == milestone_id).first()
+async def update_milestone(milestone_id: int, milestone: schemas.MilestoneUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_milestone = await db.get(models.Milestone, milestone_id)
     if not db_milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
 
@@ -52,17 +80,24 @@ def update_milestone(milestone_id: int, milestone: schemas.MilestoneUpdate, db:
     for key, value in update_data.items():
         setattr(db_milestone, key, value)
 
-    db.commit()
-    db.refresh(db_milestone)
-    return db_milestone
+    await db.commit()
+    year = await milestone_year(db, milestone_id)
+    response_cache.invalidate(("milestones",), year)
+    event_bus.publish("milestone", "update", milestone_id, year, db_milestone.goal_id)
+    return await load_milestone(db, milestone_id)
 
 
 @router.delete("/{milestone_id}")
-def delete_milestone(milestone_id: int, db: Session = Depends(get_db)):
-    db_milestone = db.query(models.Milestone).filter(models.Milestone.id == milestone_id).first()
+async def delete_milestone(milestone_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_milestone = await db.get(models.Milestone, milestone_id)
     if not db_milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
 
-    db.delete(db_milestone)
-    db.commit()
+    year = await milestone_year(db, milestone_id)
+    await db.run_sync(rollups.count_milestone, db_milestone, -1)
+    await db.run_sync(progress.remove_milestone, db_milestone)
+    await db.delete(db_milestone)
+    await db.commit()
+    response_cache.invalidate(MILESTONE_WRITE_TABLES, year)
+    event_bus.publish("milestone", "delete", milestone_id, year, db_milestone.goal_id)
     return {"message": "Milestone deleted successfully"}
@@ -0,0 +1,151 @@
+"""Full-text search over goals, ideas and comments.
+
+The `search_index` FTS5 table (see migrations) is kept in sync by
+triggers, whichever process writes. It uses the trigram tokenizer, which
+matches any substring of three or more characters and so handles Korean
+without word segmentation. Terms shorter than that can't use the index
+and are matched with LIKE over the indexed text instead.
+
+Every term must match. Hits are ranked by bm25 with titles weighted above
+bodies. bm25 has to score every match before the top ones are known, so a
+query matching more than MAX_RANKED rows lists them newest first instead.
+The title and a snippet of the body come back HTML-escaped with
+the matched terms wrapped in <mark>.
+"""
+import html
+import re
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas, versions
+from app.database import get_async_db
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.responses import model_response
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+search_index = table(
+    "search_index",
+    column("rowid"), column("entity"), column("entity_id"), column("parent_id"), column("year"),
+    column("title"), column("body"),
+)
+
+MIN_INDEXED_LENGTH = 3  # shortest term the trigram index can look up
+TITLE_WEIGHT = 10.0
+SNIPPET_LENGTH = 160
+MAX_RANKED = 5000
+
+
+def parse_terms(q):
+    """Distinct whitespace-separated terms, in order."""
+    return list(dict.fromkeys(q.split()))
+
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def match_clause(terms):
+    """FTS MATCH for the terms the index can look up, or None when all are too short."""
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_LENGTH]
+    if not indexed:
+        return None
+    return literal_column("search_index").op("MATCH")(" ".join(_phrase(term) for term in indexed))
+
+
+def search_query(terms, entities=None, year=None, ranked=True):
+    """(statement, score column): rows of `search_index` matching every term, to be ordered by the score."""
+    match = match_clause(terms)
+    conditions = [] if match is None else [match]
+    if match is not None and ranked:
+        score = func.bm25(literal_column("search_index"), 0, 0, 0, 0, TITLE_WEIGHT, 1.0)
+    else:
+        score = literal(0.0)
+    for term in (term for term in terms if len(term) < MIN_INDEXED_LENGTH):
+        pattern = _like(term)
+        conditions.append(or_(
+            search_index.c.title.like(pattern, escape="\\"), search_index.c.body.like(pattern, escape="\\")
+        ))
+    if entities:
+        conditions.append(search_index.c.entity.in_(entities))
+    if year:
+        conditions.append(search_index.c.year == year)
+    statement = select(
+        search_index.c.rowid, search_index.c.entity, search_index.c.entity_id, search_index.c.parent_id,
+        search_index.c.year, search_index.c.title, search_index.c.body, score.label("score"),
+    ).select_from(search_index).where(*conditions)
+    return statement, score
+
+
+def mark(text, pattern):
+    """HTML-escape `text`, wrapping every match of `pattern` in <mark>."""
+    parts, last = [], 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return "".join(parts)
+
+
+def snippet(text, pattern, length=SNIPPET_LENGTH):
+    """Up to `length` characters of `text` around its first match, marked up like `mark`."""
+    text = " ".join(text.split())
+    match = pattern.search(text)
+    start = max(0, min(match.start() - length // 4 if match else 0, len(text) - length))
+    end = start + length
+    return ("…" if start > 0 else "") + mark(text[start:end], pattern) + ("…" if end < len(text) else "")
+
+
+SEARCH_VERSIONS = versions.conditional("goals", "ideas", "comments")
+
+
+@router.get("", response_model=List[schemas.SearchHit], dependencies=[SEARCH_VERSIONS])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[List[Literal["goal", "idea", "comment"]]] = Query(None),
+    year: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ranked hits for every term of `q`; the next page's cursor comes back in X-Next-Cursor"""
+    terms = parse_terms(q)
+    if not terms:
+        return []
+    match = match_clause(terms)
+    ranked = match is not None and await db.scalar(
+        select(func.count()).select_from(search_index).where(match)
+    ) <= MAX_RANKED
+    statement, score = search_query(terms, type, year, ranked)
+    if cursor:
+        # Best first, newest first among equal scores
+        after_score, after_rowid = decode_cursor(cursor, 2)
+        if isinstance(after_score, str) or not isinstance(after_rowid, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        statement = statement.where(or_(
+            score > after_score, and_(score == after_score, search_index.c.rowid < after_rowid)
+        ))
+    rows = (await db.execute(statement.order_by(score, search_index.c.rowid.desc()).limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].score, rows[-1].rowid])
+
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    hits = [
+        schemas.SearchHit(
+            type=row.entity, id=row.entity_id, idea_id=row.parent_id, year=row.year,
+            title=mark(row.title, pattern), snippet=snippet(row.body, pattern), score=-row.score,
+        )
+        for row in rows
+    ]
+    return model_response(List[schemas.SearchHit], hits, response, trusted=True)
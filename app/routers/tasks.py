@@ -1,80 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
-
-from app.database import get_db
-from app import models, schemas
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+
+from app.database import get_async_db
+from app import models, schemas, rollups, progress, versions
+from app.cache import response_cache
+from app.events import event_bus
+from app.pagination import paginate, LimitQuery
+from app.responses import model_response
+from app.routers.milestones import milestone_year
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+TASK_VERSIONS = versions.conditional("tasks", "members")
+
+# Task writes also move milestone/goal counters (and progress in rollup mode)
+TASK_WRITE_TABLES = ("tasks", "milestones", "goals", "goal_rollups")
+
+
+async def load_task(db: AsyncSession, task_id: int):
+    """Fetch one task with its assignee loaded up front."""
+    result = await db.scalars(
+        select(models.Task).options(selectinload(models.Task.assignee)).where(models.Task.id == task_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.first()
+
 
-@router.get("/", response_model=List[schemas.Task])
-def get_tasks(milestone_id: int = None, assignee_id: int = None, db: Session = Depends(get_db)):
-    query = db.query(models.Task).options(joinedload(models.Task.assignee))
+@router.get("/", response_model=List[schemas.Task], dependencies=[TASK_VERSIONS])
+async def get_tasks(
+    response: Response,
+    milestone_id: int = None,
+    assignee_id: int = None,
+    limit: Optional[int] = LimitQuery,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(models.Task).options(selectinload(models.Task.assignee))
     if milestone_id:
-        query = query.filter(models.Task.milestone_id == milestone_id)
+        query = query.where(models.Task.milestone_id == milestone_id)
     if assignee_id:
-        query = query.filter(models.Task.assignee_id == assignee_id)
-    return query.all()
+        query = query.where(models.Task.assignee_id == assignee_id)
+    return model_response(List[schemas.Task], await paginate(db, query, response, limit, cursor), response)
 
 
-@router.get("/{task_id}", response_model=schemas.Task)
-def get_task(task_id: int, db: Session = Depends(get_db)):
-    task = db.query(models.Task).options(
-        joinedload(models.Task.assignee)
-    ).filter(models.Task.id == task_id).first()
+@router.get("/{task_id}", response_model=schemas.Task, dependencies=[TASK_VERSIONS])
+async def get_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    task = await load_task(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
 
 @router.post("/", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if milestone exists
-    milestone = db.query(models.Milestone).filter(models.Milestone.id == task.milestone_id).first()
+    milestone = await db.get(models.Milestone, task.milestone_id)
     if not milestone:
         raise HTTPException(status_code=404, detail="Milestone not found")
 
     # Check if assignee exists (if provided)
     if task.assignee_id:
-        assignee = db.query(models.Member).filter(models.Member.id == task.assignee_id).first()
+        assignee = await db.get(models.Member, task.assignee_id)
         if not assignee:
             raise HTTPException(status_code=404, detail="Assignee not found")
 
     db_task = models.Task(**task.model_dump())
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    await db.run_sync(rollups.count_task, db_task)
+    await db.run_sync(progress.count_task, db_task)
+    await db.commit()
+    year = await milestone_year(db, db_task.milestone_id)
+    response_cache.invalidate(TASK_WRITE_TABLES, year)
+    event_bus.publish("task", "create", db_task.id, year, db_task.milestone_id)
+    return await load_task(db, db_task.id)
 
 
 @router.put("/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task: schemas.TaskUpdate, db: Session = Depends(get_db)):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+async def update_task(task_id: int, task: schemas.TaskUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_task = await db.get(models.Task, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     # Check if assignee exists (if provided)
     if task.assignee_id:
-        assignee = db.query(models.Member).filter(models.Member.id == task.assignee_id).first()
+        assignee = await db.get(models.Member, task.assignee_id)
         if not assignee:
             raise HTTPException(status_code=404, detail="Assignee not found")
 
+    old_progress = db_task.progress
     update_data = task.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_task, key, value)
 
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    await db.run_sync(progress.change_task, db_task, old_progress)
+    await db.commit()
+    year = await milestone_year(db, db_task.milestone_id)
+    response_cache.invalidate(TASK_WRITE_TABLES, year)
+    event_bus.publish("task", "update", db_task.id, year, db_task.milestone_id)
+    return await load_task(db, task_id)
 
 
 @router.delete("/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_task = await db.get(models.Task, task_id)
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    db.delete(db_task)
-    db.commit()
+    await db.run_sync(rollups.count_task, db_task, -1)
+    await db.run_sync(progress.count_task, db_task, -1)
+    await db.delete(db_task)
+    await db.commit()
+    year = await milestone_year(db, db_task.milestone_id)
+    response_cache.invalidate(TASK_WRITE_TABLES, year)
+    event_bus.publish("task", "delete", db_task.id, year, db_task.milestone_id)
     return {"message": "Task deleted successfully"}
@@ -0,0 +1,302 @@
+"""Table-at-a-time CSV / NDJSON export and import.
+
+Exports stream rows straight from the database in batches, so memory stays
+flat whatever the table size. Imports read the uploaded file record by
+record and upsert by id (rows without an id are inserted) in batches of
+`batch_size`, each committed on its own. Progress is streamed back as one
+NDJSON line per batch. A bad record stops the import at that record;
+batches already reported stay committed.
+
+Task counters and rollups are not exchanged; they are recomputed once the
+import finishes. Import parents before children: members, goals,
+milestones, tasks, ideas.
+"""
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import count, islice
+from typing import Literal, Optional
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError, create_model
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal, begin_write, stream_rows, write_lock
+from app import models, schemas, rollups, progress
+from app.cache import response_cache
+from app.events import event_bus
+
+router = APIRouter(prefix="/api", tags=["transfer"])
+
+TableName = Literal["goals", "milestones", "tasks", "members", "ideas"]
+
+# table: (model, schema a record must satisfy)
+TABLES = {
+    "goals": (models.Goal, schemas.GoalCreate),
+    "milestones": (models.Milestone, schemas.MilestoneCreate),
+    "tasks": (models.Task, schemas.TaskCreate),
+    "members": (models.Member, schemas.MemberCreate),
+    "ideas": (models.Idea, schemas.IdeaBase),
+}
+
+# Foreign keys checked for each batch before it is written
+REFERENCES = {
+    "milestones": {"goal_id": models.Goal},
+    "tasks": {"milestone_id": models.Milestone, "assignee_id": models.Member},
+}
+
+# Maintained by app.progress and the change-feed triggers, so recomputed or restamped instead of exchanged
+DERIVED_COLUMNS = {"task_count", "task_progress_sum", "change_seq"}
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class RecordError(Exception):
+    def __init__(self, record, detail):
+        super().__init__(detail)
+        self.record = record
+        self.detail = detail
+
+
+def columns(table):
+    model = TABLES[table][0]
+    return [column for column in model.__table__.columns if column.name not in DERIVED_COLUMNS]
+
+
+@lru_cache
+def record_schema(table):
+    """The table's create schema plus the id and timestamps an export carries."""
+    base = TABLES[table][1]
+    return create_model(
+        f"{base.__name__}Record", __base__=base,
+        id=(Optional[int], None), created_at=(Optional[datetime], None), updated_at=(Optional[datetime], None),
+    )
+
+
+def export_query(table, year=None):
+    model = TABLES[table][0]
+    query = select(*columns(table)).order_by(model.id)
+    if year:
+        if table == "milestones":
+            query = query.join(models.Goal, models.Goal.id == models.Milestone.goal_id).where(models.Goal.year == year)
+        elif table == "tasks":
+            query = query.join(models.Milestone, models.Milestone.id == models.Task.milestone_id).join(
+                models.Goal, models.Goal.id == models.Milestone.goal_id
+            ).where(models.Goal.year == year)
+        else:
+            query = query.where(model.year == year)
+    return query
+
+
+def _text(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+async def export_chunks(table, format, year=None):
+    names = [column.name for column in columns(table)]
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+    async for rows in stream_rows(export_query(table, year)):
+        if format == "csv":
+            writer.writerows([_text(value) for value in row] for row in rows)
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            chunk = "".join(
+                json.dumps({name: _text(value) for name, value in zip(names, row)}, ensure_ascii=False) + "\n"
+                for row in rows
+            )
+        yield chunk.encode()
+    if format == "csv" and buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+@router.get("/export/{table}")
+async def export_table(table: TableName, format: Literal["csv", "ndjson"] = "csv", year: int = None):
+    """Stream one table as CSV (with a header row) or NDJSON"""
+    filename = f"{table}_{datetime.now().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        export_chunks(table, format, year), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _unreadable(error):
+    return "Invalid UTF-8" if isinstance(error, UnicodeDecodeError) else f"Invalid CSV: {error}"
+
+
+def _numbered(lines):
+    """Number the items of `lines`, reporting one that can't be decoded or parsed as that record's error."""
+    for number in count(1):
+        try:
+            line = next(lines)
+        except StopIteration:
+            return
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise RecordError(number, _unreadable(error))
+        yield number, line
+
+
+def _decoded(upload):
+    # Line by line rather than through a TextIOWrapper, which decodes ahead in chunks and would
+    # blame bad bytes on whichever record happened to be read first
+    for number, line in enumerate(upload):
+        yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+def read_records(upload, table, format):
+    """(record number, dict) pairs read lazily from the uploaded file; the header is checked up front."""
+    text = _decoded(upload)
+    known = {column.name for column in columns(table)}
+    if format == "csv":
+        reader = csv.reader(text)
+        try:
+            header = next(reader, None)
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise HTTPException(status_code=400, detail=_unreadable(error))
+        if header is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+        unknown = set(header) - known
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(sorted(unknown))}")
+        # CSV has no null; an empty cell means none
+        return (
+            (number, {name: value if value != "" else None for name, value in zip(header, values)})
+            for number, values in _numbered(reader) if values
+        )
+
+    def ndjson():
+        for number, line in _numbered(text):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise RecordError(number, "Invalid JSON")
+            if not isinstance(record, dict):
+                raise RecordError(number, "Expected a JSON object")
+            unknown = set(record) - known
+            if unknown:
+                raise RecordError(number, f"Unknown fields: {', '.join(sorted(unknown))}")
+            yield number, record
+    return ndjson()
+
+
+def _validate(table, number, record):
+    try:
+        row = record_schema(table).model_validate(record).model_dump(exclude_unset=True)
+    except ValidationError as error:
+        first = error.errors(include_url=False)[0]
+        raise RecordError(number, f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}")
+    # Leave missing timestamps to the column defaults
+    return {name: value for name, value in row.items() if value is not None or name not in ("created_at", "updated_at")}
+
+
+def _check_references(db, table, batch):
+    for field, model in REFERENCES.get(table, {}).items():
+        ids = {row[field] for _, row in batch if row.get(field) is not None}
+        found = set(db.scalars(select(model.id).where(model.id.in_(ids)))) if ids else set()
+        for number, row in batch:
+            if row.get(field) is not None and row[field] not in found:
+                raise RecordError(number, f"{field} {row[field]} not found")
+
+
+def _write(db, table, rows):
+    """Upsert rows that carry an id, insert the rest; rows with the same fields share one executemany."""
+    model = TABLES[table][0]
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row), []).append(row)
+    for keys, group in groups.items():
+        stmt = insert(model)
+        if "id" in keys:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.id], set_={name: stmt.excluded[name] for name in keys if name != "id"}
+            )
+        db.connection().execute(stmt, group)
+
+
+def import_records(table, records, batch_size):
+    """Write `records` in committed batches, yielding progress after each one, then recompute derived data."""
+    db = SessionLocal()
+    imported = 0
+    failure = {}
+    try:
+        while True:
+            try:
+                batch = [(number, _validate(table, number, record)) for number, record in islice(records, batch_size)]
+                if not batch:
+                    break
+                begin_write(db)
+                _check_references(db, table, batch)
+                _write(db, table, [row for _, row in batch])
+                db.commit()
+            except RecordError as error:
+                db.rollback()
+                failure = {"error": error.detail, "record": error.record}
+                break
+            imported += len(batch)
+            yield {"table": table, "imported": imported}
+        # Earlier batches are committed even when a later record failed
+        if imported and table != "ideas":
+            begin_write(db)
+            progress.recompute(db)
+            rollups.rebuild(db)
+            db.commit()
+        yield {"table": table, "imported": imported, "done": True, **failure}
+    finally:
+        db.close()
+
+
+def _spool(upload):
+    # The upload is closed as soon as the handler returns, before the import streams
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(upload, spool)
+    spool.seek(0)
+    return spool
+
+
+async def _progress_lines(table, records, batch_size, spool):
+    events = import_records(table, records, batch_size)
+    try:
+        while True:
+            # Each step writes one batch; queue it with the write requests, but not the client's reading
+            async with write_lock():
+                event = await run_in_threadpool(next, events, None)
+            if event is None:
+                break
+            yield (json.dumps(event, ensure_ascii=False) + "\n").encode()
+    finally:
+        await run_in_threadpool(events.close)
+        spool.close()
+        response_cache.clear()
+        event_bus.publish(None, "reset")
+
+
+@router.post("/import/{table}")
+async def import_table(
+    table: TableName,
+    file: UploadFile = File(...),
+    format: Literal["csv", "ndjson"] = "csv",
+    batch_size: int = Query(500, ge=1, le=10000),
+):
+    """Upsert records from a CSV or NDJSON file in batches, streaming progress as NDJSON lines"""
+    spool = await run_in_threadpool(_spool, file.file)
+    try:
+        records = await run_in_threadpool(read_records, spool, table, format)
+    except Exception:
+        spool.close()
+        raise
+    return StreamingResponse(_progress_lines(table, records, batch_size, spool), media_type=MEDIA_TYPES["ndjson"])
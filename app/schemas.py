@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Optional, List, Any, Dict, Literal, Union
 
 
 # Member schemas
@@ -92,17 +92,20 @@ class MilestoneUpdate(BaseModel):
     progress: Optional[int] = None
 
 
-class Milestone(MilestoneBase):
+class MilestoneShallow(MilestoneBase):
     id: int
     goal_id: int
     created_at: datetime
     updated_at: datetime
-    tasks: List[Task] = []
 
     class Config:
         from_attributes = True
 
 
+class Milestone(MilestoneShallow):
+    tasks: List[Task] = []
+
+
 # Goal schemas
 class GoalBase(BaseModel):
     type: str  # 'issue' or 'feature'
@@ -138,16 +141,73 @@ class GoalUpdate(BaseModel):
     end_date: Optional[date] = None
 
 
-class Goal(GoalBase):
+class GoalShallow(GoalBase):
     id: int
     created_at: datetime
     updated_at: datetime
-    milestones: List[Milestone] = []
 
     class Config:
         from_attributes = True
 
 
+class GoalWithMilestones(GoalShallow):
+    milestones: List[MilestoneShallow] = []
+
+
+class Goal(GoalShallow):
+    milestones: List[Milestone] = []
+
+
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+
+# Batch schemas
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    entity: Literal["goal", "milestone", "task"]
+    id: Optional[Union[int, str]] = None  # target of update/delete: a row id or the ref of an earlier create
+    ref: Optional[str] = None  # temporary id for a created row; later operations may use it for ids and parents
+    data: Dict[str, Any] = {}  # create/update fields; goal_id/milestone_id may also be refs
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    entity: str
+    id: int
+    ref: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    type: str  # 'goal', 'idea' or 'comment'
+    id: int
+    idea_id: Optional[int] = None  # the idea a comment belongs to
+    year: Optional[int] = None
+    title: str  # HTML-escaped, matches wrapped in <mark>
+    snippet: str
+    score: float
+
+
+class BackupInfo(BaseModel):
+    name: str
+    created_at: datetime
+    size: int
+
+
+class ChangeSet(BaseModel):
+    token: str
+    reset: bool  # the client should drop its copy before applying this page
+    more: bool
+    upserts: Dict[str, List[Dict[str, Any]]]  # entity: rows as stored
+    deletes: Dict[str, List[int]]  # entity: ids
+
+
 # Dashboard summary
 class ProgressSummary(BaseModel):
     total_goals: int
@@ -207,11 +267,15 @@ class IdeaUpdate(BaseModel):
     status: Optional[str] = None
 
 
-class Idea(IdeaBase):
+class IdeaShallow(IdeaBase):
     id: int
     created_at: datetime
     updated_at: datetime
-    comments: List[Comment] = []
+    comment_count: int = 0
 
     class Config:
         from_attributes = True
+
+
+class Idea(IdeaShallow):
+    comments: List[Comment] = []
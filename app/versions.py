@@ -0,0 +1,52 @@
+"""Per-table change versions for conditional GETs.
+
+Triggers added by a migration bump `table_versions.version` for every row
+written to a tracked table, whichever process or tool does the writing.
+Read endpoints declare the tables they read through `conditional`; the ETag
+is built from those versions, and a matching If-None-Match is answered with
+304 before the handler queries or serializes anything.
+"""
+import random
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.database import get_async_db
+
+EPOCH = "epoch"
+
+
+async def etag_for(db: AsyncSession, tables):
+    names = (EPOCH,) + tables
+    versions = dict((await db.execute(
+        select(models.TableVersion.name, models.TableVersion.version).where(models.TableVersion.name.in_(names))
+    )).all())
+    return 'W/"' + "-".join(str(versions.get(name, 0)) for name in names) + '"'
+
+
+def _matches(etag, if_none_match):
+    if if_none_match is None:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def conditional(*tables):
+    """Dependency for a read endpoint built from `tables`: 304 when the client is current, else ETag."""
+    async def check(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        etag = await etag_for(db, tables)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _matches(etag, request.headers.get("if-none-match")):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return Depends(check)
+
+
+def new_epoch(conn):
+    """Give a replaced database a fresh identity so no ETag issued before still matches."""
+    conn.execute(
+        update(models.TableVersion).where(models.TableVersion.name == EPOCH)
+        .values(version=random.randrange(2 ** 31))
+    )
@@ -0,0 +1,342 @@
+"""The requests the benchmark harness times, one or more per endpoint.
+
+Each case builds its request from a `Fixture` (ids looked up in the loaded
+database) and may create what it needs first; only the request it returns
+is measured. `max_sql` is the most SQL statements the request may run on
+the default generated dataset, counting the BEGIN IMMEDIATE that opens a
+write request's session. It doesn't grow with the number of rows, so a
+relationship loaded per row (an N+1) trips it. Cases run in order:
+reads, then writes, then the ones that replace or wipe the data.
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+# Routes not driven by a case, and why
+SKIPPED = {
+    "GET /api/events": "an open-ended stream; GET /api/events/stats covers the event bus",
+}
+
+
+@dataclass
+class Case:
+    name: str
+    route: str  # "<METHOD> <path>" of the route it drives, as declared
+    request: Callable[["Fixture"], Awaitable[dict]]  # keyword arguments for httpx's client.request
+    max_sql: Optional[int]
+    status: int = 200
+    repeat: Optional[int] = None  # fewer runs for requests that replace the whole database
+
+
+class Fixture:
+    """Ids of existing rows to point requests at, and helpers to create throwaway ones."""
+
+    def __init__(self, client):
+        self.client = client
+        self.token = None
+        self.turn = 0
+
+    def alternate(self, *values):
+        """The next of `values` in turn, so repeated updates keep changing the row."""
+        self.turn += 1
+        return values[self.turn % len(values)]
+
+    async def call(self, method, url, **kwargs):
+        response = await self.client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url}: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def load(self):
+        self.year = (await self.call("GET", "/api/years")).json()[0]
+        goals = (await self.call("GET", "/api/goals/", params={"year": self.year})).json()
+        goal = next(goal for goal in goals if any(milestone["tasks"] for milestone in goal["milestones"]))
+        milestone = next(milestone for milestone in goal["milestones"] if milestone["tasks"])
+        self.goal_id, self.milestone_id = goal["id"], milestone["id"]
+        self.task_id = milestone["tasks"][0]["id"]
+        self.member_id = next(
+            task["assignee_id"] for goal in goals for milestone in goal["milestones"] for task in milestone["tasks"]
+            if task["assignee_id"] is not None
+        )
+        ideas = (await self.call("GET", "/api/ideas/", params={"year": self.year})).json()
+        self.idea_id = max(ideas, key=lambda idea: idea["comment_count"])["id"]
+
+    async def create(self, url, body):
+        return (await self.call("POST", url, json=body)).json()
+
+    async def new_goal(self):
+        return await self.create("/api/goals/", {
+            "type": "feature", "title": "벤치마크 목표", "year": self.year, "team": "플랫폼", "product": "대시보드",
+            "tags": "성능,실험", "start_date": f"{self.year}-03-01", "end_date": f"{self.year}-09-30",
+        })
+
+    async def new_milestone(self):
+        return await self.create("/api/milestones/", {
+            "goal_id": self.goal_id, "title": "벤치마크 마일스톤",
+            "start_date": f"{self.year}-04-01", "due_date": f"{self.year}-05-31",
+        })
+
+    async def new_task(self):
+        return await self.create("/api/tasks/", {
+            "milestone_id": self.milestone_id, "title": "벤치마크 태스크", "assignee_id": self.member_id,
+            "start_date": f"{self.year}-04-01", "due_date": f"{self.year}-04-15", "progress": 40,
+        })
+
+    async def new_member(self):
+        return await self.create("/api/members/", {
+            "name": "벤치마크", "role": "Developer", "team": "플랫폼", "type": "new", "year": self.year,
+        })
+
+    async def new_idea(self):
+        return await self.create("/api/ideas/", {
+            "type": "feature", "title": "벤치마크 아이디어", "description": "캐시 검색 개선", "year": self.year,
+            "product": "검색",
+        })
+
+    async def new_comment(self):
+        return await self.create(f"/api/ideas/{self.idea_id}/comments", {"author": "벤치마크", "content": "좋아요"})
+
+    async def latest_token(self):
+        """A change token that is up to date; follows the pages from the last one taken."""
+        while True:
+            page = (await self.call("GET", "/api/changes", params={"since": self.token} if self.token else {})).json()
+            self.token = page["token"]
+            if not page["more"]:
+                return self.token
+
+
+def call(method, url, **params):
+    """A request without a body; `url` may use the fixture as {f.goal_id}, param values may be functions of it."""
+    async def build(f):
+        return {"method": method, "url": url.format(f=f), "params": {
+            name: value(f) if callable(value) else value for name, value in params.items()
+        }}
+    return build
+
+
+def get(url, **params):
+    return call("GET", url, **params)
+
+
+def year(f):
+    return f.year
+
+
+async def goals_not_modified(f):
+    etag = (await f.call("GET", "/api/goals/", params={"year": f.year})).headers["etag"]
+    return {"method": "GET", "url": "/api/goals/", "params": {"year": f.year}, "headers": {"If-None-Match": etag}}
+
+
+async def update_goal(f):
+    progress, tags = f.alternate((55, "성능,보안"), (65, "보안"))
+    return {"method": "PUT", "url": f"/api/goals/{f.goal_id}", "json": {"progress": progress, "tags": tags}}
+
+
+async def delete_goal(f):
+    return {"method": "DELETE", "url": f"/api/goals/{(await f.new_goal())['id']}"}
+
+
+async def create_goal(f):
+    return {"method": "POST", "url": "/api/goals/", "json": {
+        "type": "issue", "title": "새 목표", "year": f.year, "team": "데이터", "tags": "보안",
+        "start_date": f"{f.year}-01-01", "end_date": f"{f.year}-06-30",
+    }}
+
+
+async def create_milestone(f):
+    return {"method": "POST", "url": "/api/milestones/", "json": {
+        "goal_id": f.goal_id, "title": "새 마일스톤", "start_date": f"{f.year}-02-01", "due_date": f"{f.year}-02-28",
+    }}
+
+
+async def update_milestone(f):
+    return {"method": "PUT", "url": f"/api/milestones/{f.milestone_id}", "json": {"progress": f.alternate(35, 45)}}
+
+
+async def delete_milestone(f):
+    return {"method": "DELETE", "url": f"/api/milestones/{(await f.new_milestone())['id']}"}
+
+
+async def create_task(f):
+    return {"method": "POST", "url": "/api/tasks/", "json": {
+        "milestone_id": f.milestone_id, "title": "새 태스크", "assignee_id": f.member_id, "progress": 20,
+        "start_date": f"{f.year}-02-01", "due_date": f"{f.year}-02-10",
+    }}
+
+
+async def update_task(f):
+    return {"method": "PUT", "url": f"/api/tasks/{f.task_id}", "json": {"progress": f.alternate(70, 80)}}
+
+
+async def delete_task(f):
+    return {"method": "DELETE", "url": f"/api/tasks/{(await f.new_task())['id']}"}
+
+
+async def create_member(f):
+    return {"method": "POST", "url": "/api/members/", "json": {
+        "name": "새 멤버", "role": "QA", "team": "웹", "type": "existing", "year": f.year,
+    }}
+
+
+async def update_member(f):
+    return {"method": "PUT", "url": f"/api/members/{f.member_id}", "json": {"team": f.alternate("인프라", "웹")}}
+
+
+async def delete_member(f):
+    return {"method": "DELETE", "url": f"/api/members/{(await f.new_member())['id']}"}
+
+
+async def create_idea(f):
+    return {"method": "POST", "url": "/api/ideas/", "json": {
+        "type": "issue", "title": "새 아이디어", "description": "알림 자동화", "year": f.year, "product": "메신저",
+    }}
+
+
+async def update_idea(f):
+    return {"method": "PUT", "url": f"/api/ideas/{f.idea_id}", "json": {"priority": f.alternate(1, 2)}}
+
+
+async def delete_idea(f):
+    return {"method": "DELETE", "url": f"/api/ideas/{(await f.new_idea())['id']}"}
+
+
+async def convert_idea(f):
+    return {"method": "POST", "url": f"/api/ideas/{(await f.new_idea())['id']}/convert"}
+
+
+async def create_comment(f):
+    return {"method": "POST", "url": f"/api/ideas/{f.idea_id}/comments", "json": {
+        "author": "새 작성자", "content": "검색 캐시부터 하면 좋겠습니다",
+    }}
+
+
+async def delete_comment(f):
+    return {"method": "DELETE", "url": f"/api/ideas/comments/{(await f.new_comment())['id']}"}
+
+
+async def batch(f):
+    operations = [
+        {"op": "create", "entity": "goal", "ref": "g", "data": {"type": "feature", "title": "일괄 목표", "year": f.year}},
+        {"op": "create", "entity": "milestone", "ref": "m", "data": {"goal_id": "g", "title": "일괄 마일스톤"}},
+    ] + [
+        {"op": "create", "entity": "task", "data": {"milestone_id": "m", "title": f"일괄 태스크 {i}", "progress": 10 * i}}
+        for i in range(10)
+    ] + [
+        {"op": "update", "entity": "task", "id": f.task_id, "data": {"progress": 90}},
+    ]
+    return {"method": "POST", "url": "/api/batch", "json": {"operations": operations}}
+
+
+async def import_members(f):
+    lines = "".join(
+        json.dumps({"name": f"가져온 멤버 {i}", "role": "Developer", "type": "new", "year": f.year}, ensure_ascii=False)
+        + "\n" for i in range(50)
+    )
+    return {
+        "method": "POST", "url": "/api/import/members", "params": {"format": "ndjson"},
+        "files": {"file": ("members.ndjson", lines.encode(), "application/x-ndjson")},
+    }
+
+
+async def changes_delta(f):
+    since = await f.latest_token()
+    await f.call("PUT", f"/api/goals/{f.goal_id}", json={"progress": 60})
+    return {"method": "GET", "url": "/api/changes", "params": {"since": since}}
+
+
+async def restore_backup(f):
+    # The newest backup of this hour, with a write since: restoring it takes another backup in the same hour.
+    # Backups are named by the second, so wait for the next one
+    name = (await f.call("POST", "/api/backups")).json()["name"]
+    await f.call("PUT", f"/api/tasks/{f.task_id}", json={"progress": f.alternate(10, 20)})
+    await asyncio.sleep(1)
+    return {"method": "POST", "url": f"/api/backups/{name}/restore"}
+
+
+async def import_db(f):
+    body = (await f.call("GET", "/api/export-db")).content
+    return {"method": "POST", "url": "/api/import-db", "files": {"file": ("roadmap.db", body)}}
+
+
+async def create_backup(f):
+    # A change since the last backup, or the newest one is returned as is
+    await f.call("PUT", f"/api/tasks/{f.task_id}", json={"progress": 30})
+    return {"method": "POST", "url": "/api/backups"}
+
+
+async def reset_all_data(f):
+    return {"method": "DELETE", "url": "/api/reset-all-data"}
+
+
+CASES = [
+    Case("page", "GET /", get("/"), 0),
+    Case("years", "GET /api/years", get("/api/years"), 2),
+    Case("dashboard summary", "GET /api/dashboard/summary", get("/api/dashboard/summary", year=year), 2),
+    Case("gantt year", "GET /api/gantt/data", get("/api/gantt/data", year=year), 2),
+    Case("gantt year ndjson", "GET /api/gantt/data", get("/api/gantt/data", year=year, format="ndjson"), 2),
+    Case("gantt year columnar", "GET /api/gantt/data", get("/api/gantt/data", year=year, format="columnar"), 2),
+    Case("gantt quarter", "GET /api/gantt/data", get(
+        "/api/gantt/data", year=year, start=lambda f: f"{f.year}-04-01", end=lambda f: f"{f.year}-06-30"
+    ), 2),
+    # Relationships are loaded 500 parents per IN query, so whole-table trees take one more per 500 rows
+    Case("goal tree year", "GET /api/goals/", get("/api/goals/", year=year), 6),
+    Case("goal tree page", "GET /api/goals/", get("/api/goals/", year=year, limit=50), 5),
+    Case("goals shallow", "GET /api/goals/", get("/api/goals/", year=year, depth="goal"), 2),
+    Case("goals by tag", "GET /api/goals/", get("/api/goals/", year=year, tags="성능,보안", tag_match="all"), 5),
+    Case("goal fields", "GET /api/goals/", get("/api/goals/", year=year, fields="id,title,progress"), 2),
+    Case("goal tree not modified", "GET /api/goals/", goals_not_modified, 1, status=304),
+    Case("goal tags", "GET /api/goals/tags", get("/api/goals/tags", year=year), 2),
+    Case("goal", "GET /api/goals/{goal_id}", get("/api/goals/{f.goal_id}"), 5),
+    Case("milestones of goal", "GET /api/milestones/", get("/api/milestones/", goal_id=lambda f: f.goal_id), 4),
+    Case("milestones all", "GET /api/milestones/", get("/api/milestones/"), 7),  # one more per 500 rows too
+    Case("milestone", "GET /api/milestones/{milestone_id}", get("/api/milestones/{f.milestone_id}"), 4),
+    Case("tasks of milestone", "GET /api/tasks/", get("/api/tasks/", milestone_id=lambda f: f.milestone_id), 3),
+    Case("tasks of assignee", "GET /api/tasks/", get("/api/tasks/", assignee_id=lambda f: f.member_id), 3),
+    Case("tasks page", "GET /api/tasks/", get("/api/tasks/", limit=200), 3),
+    Case("task", "GET /api/tasks/{task_id}", get("/api/tasks/{f.task_id}"), 3),
+    Case("members year", "GET /api/members/", get("/api/members/", year=year), 2),
+    Case("members summary", "GET /api/members/summary", get("/api/members/summary", year=year), 3),
+    Case("member", "GET /api/members/{member_id}", get("/api/members/{f.member_id}"), 2),
+    Case("ideas year", "GET /api/ideas/", get("/api/ideas/", year=year), 2),
+    Case("ideas with comments", "GET /api/ideas/", get("/api/ideas/", year=year, include="comments"), 3),
+    Case("idea", "GET /api/ideas/{idea_id}", get("/api/ideas/{f.idea_id}"), 3),
+    Case("idea comments", "GET /api/ideas/{idea_id}/comments", get("/api/ideas/{f.idea_id}/comments"), 3),
+    Case("search", "GET /api/search", get("/api/search", q="캐시 검색"), 2),
+    Case("search goals of year", "GET /api/search", get("/api/search", q="배포", type="goal", year=year), 2),
+    Case("changes first page", "GET /api/changes", get("/api/changes", limit=1000), 10),
+    Case("export goals csv", "GET /api/export/{table}", get("/api/export/goals", year=year), 1),
+    Case("export tasks ndjson", "GET /api/export/{table}", get("/api/export/tasks", format="ndjson"), 1),
+    Case("export db", "GET /api/export-db", get("/api/export-db"), 0),
+    Case("backups", "GET /api/backups", get("/api/backups"), 0),
+    Case("event stats", "GET /api/events/stats", get("/api/events/stats"), 0),
+    Case("cache stats", "GET /api/cache/stats", get("/api/cache/stats"), 0),
+
+    Case("create goal", "POST /api/goals/", create_goal, 5),
+    Case("update goal", "PUT /api/goals/{goal_id}", update_goal, 15),
+    Case("delete goal", "DELETE /api/goals/{goal_id}", delete_goal, 8),
+    Case("create milestone", "POST /api/milestones/", create_milestone, 6),
+    Case("update milestone", "PUT /api/milestones/{milestone_id}", update_milestone, 7),
+    Case("delete milestone", "DELETE /api/milestones/{milestone_id}", delete_milestone, 10),
+    Case("create task", "POST /api/tasks/", create_task, 12),
+    Case("update task", "PUT /api/tasks/{task_id}", update_task, 9),
+    Case("delete task", "DELETE /api/tasks/{task_id}", delete_task, 10),
+    Case("create member", "POST /api/members/", create_member, 4),
+    Case("update member", "PUT /api/members/{member_id}", update_member, 6),
+    Case("delete member", "DELETE /api/members/{member_id}", delete_member, 5),
+    Case("create idea", "POST /api/ideas/", create_idea, 4),
+    Case("update idea", "PUT /api/ideas/{idea_id}", update_idea, 5),
+    Case("delete idea", "DELETE /api/ideas/{idea_id}", delete_idea, 4),
+    Case("convert idea", "POST /api/ideas/{idea_id}/convert", convert_idea, 7),
+    Case("create comment", "POST /api/ideas/{idea_id}/comments", create_comment, 4),
+    Case("delete comment", "DELETE /api/ideas/comments/{comment_id}", delete_comment, 4),
+    Case("batch", "POST /api/batch", batch, 23),
+    Case("import members ndjson", "POST /api/import/{table}", import_members, 15),
+    Case("changes delta", "GET /api/changes", changes_delta, 10),
+    Case("recompute progress", "POST /api/progress/recompute", call("POST", "/api/progress/recompute"), 3),
+    # Backups and imports copy the file through sqlite3 directly, outside the app's engines
+    Case("create backup", "POST /api/backups", create_backup, None, repeat=3),
+    Case("restore backup", "POST /api/backups/{name}/restore", restore_backup, None, repeat=3),
+    Case("import db", "POST /api/import-db", import_db, None, repeat=3),
+    Case("reset all data", "DELETE /api/reset-all-data", reset_all_data, 9, repeat=1),
+]
@@ -0,0 +1,63 @@
+"""Compare two benchmark result files written by benchmarks.run.
+
+Prints the median latency, SQL statements and peak memory of every case in
+both, and exits non-zero when a case got slower by more than `--threshold`
+(and by more than `--min-ms`, to ignore noise on fast requests) or runs
+more SQL statements than before.
+
+    python -m benchmarks.compare benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+"""
+import argparse
+import json
+import sys
+
+
+def regressions(before, after, threshold, min_ms):
+    """(case, reason) for every case in both files that got worse."""
+    found = []
+    for name, new in after["cases"].items():
+        old = before["cases"].get(name)
+        if old is None or "p50_ms" not in old or "p50_ms" not in new:
+            continue
+        slower = new["p50_ms"] - old["p50_ms"]
+        if slower > min_ms and new["p50_ms"] > old["p50_ms"] * (1 + threshold):
+            found.append((name, f"p50 {old['p50_ms']:.2f} -> {new['p50_ms']:.2f} ms"))
+        if new["sql"] > old["sql"]:
+            found.append((name, f"sql {old['sql']} -> {new['sql']}"))
+    return found
+
+
+def _change(old, new, digits=2):
+    if old is None or new is None:
+        return f"{'-':>26}"
+    ratio = f"{new / old:5.2f}x" if old else "     -"
+    return f"{old:9.{digits}f} {new:9.{digits}f} {ratio}"
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of the median (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="slowdowns smaller than this are ignored")
+    args = parser.parse_args(argv)
+    with open(args.before) as file:
+        before = json.load(file)
+    with open(args.after) as file:
+        after = json.load(file)
+
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'case':28} {'p50 ms before/after':>27} {'sql':>9} {'peak KiB before/after':>31}")
+    for name, new in after["cases"].items():
+        old = before["cases"].get(name, {})
+        print(f"{name:28} {_change(old.get('p50_ms'), new.get('p50_ms'))} "
+              f"{old.get('sql', '-'):>4} {new['sql']:>4} {_change(old.get('peak_kib'), new.get('peak_kib'), 0)}")
+
+    found = regressions(before, after, args.threshold, args.min_ms)
+    for name, reason in found:
+        print(f"REGRESSION {name}: {reason}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,188 @@
+"""Synthetic roadmap databases for the benchmarks.
+
+Fills a new SQLite file with goals, milestones, tasks, members, ideas and
+comments spread over the given years. The schema comes from the models and
+migrations, so triggers, search index and change log are all in place. The
+same seed and sizes always give the same rows, timestamps and epoch.
+
+    python -m benchmarks.generate roadmap-bench.db --goals 500 --ideas 300
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+DEFAULTS = {
+    "goals": 500, "milestones": 4, "tasks": 6, "members": 80, "ideas": 300, "comments": 5,
+    "years": "2025,2026", "seed": 1,
+}
+
+TEAMS = ["플랫폼", "데이터", "모바일", "웹", "인프라"]
+PRODUCTS = ["대시보드", "결제", "검색", "메신저", "관리자"]
+ROLES = ["PM", "Developer", "Designer", "QA"]
+TAGS = ["성능", "보안", "접근성", "리팩터링", "고객요청", "실험", "인프라", "모바일"]
+WORDS = [
+    "개선", "도입", "전환", "자동화", "최적화", "통합", "분석", "캐시", "검색", "알림", "결제", "권한", "로그",
+    "배포", "모니터링", "온보딩", "대시보드", "리포트", "동기화", "마이그레이션",
+]
+AUTHORS = ["김민수", "이서연", "박지훈", "최유진", "정하늘", "강도윤"]
+CREATED = datetime(2024, 12, 1, 9, 0)
+
+
+def add_size_arguments(parser):
+    parser.add_argument("--goals", type=int, default=DEFAULTS["goals"], help="goals in all")
+    parser.add_argument("--milestones", type=int, default=DEFAULTS["milestones"], help="milestones per goal")
+    parser.add_argument("--tasks", type=int, default=DEFAULTS["tasks"], help="tasks per milestone")
+    parser.add_argument("--members", type=int, default=DEFAULTS["members"], help="members in all")
+    parser.add_argument("--ideas", type=int, default=DEFAULTS["ideas"], help="ideas in all")
+    parser.add_argument("--comments", type=int, default=DEFAULTS["comments"], help="comments per idea")
+    parser.add_argument("--years", default=DEFAULTS["years"], help="comma-separated years the rows are spread over")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+
+
+def sizes(args):
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+
+def _title(rng, words=3):
+    return " ".join(rng.sample(WORDS, words))
+
+
+def _span(rng, start, end, min_days=7):
+    """A random [start, due] inside [start, end]."""
+    days = (end - start).days
+    length = rng.randint(min(min_days, days), days)
+    offset = rng.randint(0, days - length)
+    begin = start + timedelta(days=offset)
+    return begin, begin + timedelta(days=length)
+
+
+def _stamp(rng):
+    created = CREATED + timedelta(minutes=rng.randrange(60 * 24 * 365))
+    return {"created_at": created, "updated_at": created + timedelta(minutes=rng.randrange(60 * 24 * 30))}
+
+
+def rows(goals, milestones, tasks, members, ideas, comments, years, seed):
+    """Rows per model, in insert order, for the given sizes."""
+    from app import models
+
+    rng = random.Random(seed)
+    years = [int(year) for year in str(years).split(",")]
+    data = {model: [] for model in (
+        models.Member, models.Goal, models.Milestone, models.Task, models.Idea, models.Comment
+    )}
+
+    members_by_year = {year: [] for year in years}
+    for id in range(1, members + 1):
+        year = years[(id - 1) % len(years)]
+        members_by_year[year].append(id)
+        data[models.Member].append({
+            "id": id, "name": f"{rng.choice(AUTHORS)} {id}", "role": rng.choice(ROLES), "team": rng.choice(TEAMS),
+            "product": rng.choice(PRODUCTS), "type": rng.choice(["existing", "new"]), "year": year,
+            "join_date": date(year, rng.randint(1, 12), 1), **_stamp(rng),
+        })
+
+    milestone_id = task_id = 0
+    for goal_id in range(1, goals + 1):
+        year = years[(goal_id - 1) % len(years)]
+        quarter = rng.randint(1, 4)
+        goal_start, goal_end = _span(rng, date(year, 3 * quarter - 2, 1), date(year, 12, 31), 30)
+        data[models.Goal].append({
+            "id": goal_id, "type": rng.choice(["issue", "feature"]), "title": f"{_title(rng)} {goal_id}",
+            "description": " ".join(rng.choices(WORDS, k=30)), "expected_effect": " ".join(rng.choices(WORDS, k=10)),
+            "year": year, "quarter": f"Q{quarter}", "team": rng.choice(TEAMS), "product": rng.choice(PRODUCTS),
+            "tags": ",".join(rng.sample(TAGS, rng.randint(0, 3))) or None, "progress": rng.randint(0, 100),
+            "start_date": goal_start, "end_date": goal_end, **_stamp(rng),
+        })
+        for _ in range(milestones):
+            milestone_id += 1
+            start, due = _span(rng, goal_start, goal_end, 14)
+            data[models.Milestone].append({
+                "id": milestone_id, "goal_id": goal_id, "title": f"{_title(rng, 2)} {milestone_id}",
+                "description": " ".join(rng.choices(WORDS, k=12)), "start_date": start, "due_date": due,
+                "progress": rng.randint(0, 100), **_stamp(rng),
+            })
+            for _ in range(tasks):
+                task_id += 1
+                task_start, task_due = _span(rng, start, due, 3)
+                assignees = members_by_year[year]
+                data[models.Task].append({
+                    "id": task_id, "milestone_id": milestone_id, "title": f"{_title(rng, 2)} {task_id}",
+                    "description": " ".join(rng.choices(WORDS, k=8)),
+                    "assignee_id": rng.choice(assignees) if assignees and rng.random() < 0.9 else None,
+                    "start_date": task_start, "due_date": task_due, "progress": rng.choice(range(0, 101, 10)),
+                    **_stamp(rng),
+                })
+
+    comment_id = 0
+    for idea_id in range(1, ideas + 1):
+        data[models.Idea].append({
+            "id": idea_id, "type": rng.choice(["issue", "feature"]), "title": f"{_title(rng)} 아이디어 {idea_id}",
+            "description": " ".join(rng.choices(WORDS, k=20)), "year": years[(idea_id - 1) % len(years)],
+            "product": rng.choice(PRODUCTS), "priority": rng.randint(0, 3),
+            "status": rng.choice(["open", "open", "approved", "rejected"]), **_stamp(rng),
+        })
+        for _ in range(rng.randint(0, 2 * comments)):
+            comment_id += 1
+            data[models.Comment].append({
+                "id": comment_id, "idea_id": idea_id, "author": rng.choice(AUTHORS),
+                "content": " ".join(rng.choices(WORDS, k=15)), "created_at": _stamp(rng)["created_at"],
+            })
+    return data
+
+
+def generate(path, goals=DEFAULTS["goals"], milestones=DEFAULTS["milestones"], tasks=DEFAULTS["tasks"],
+             members=DEFAULTS["members"], ideas=DEFAULTS["ideas"], comments=DEFAULTS["comments"],
+             years=DEFAULTS["years"], seed=DEFAULTS["seed"]):
+    """Write a new database at `path`; returns the number of rows per table."""
+    # Imported here: app.database binds the app's engine from the environment on first import, and the
+    # benchmark harness points that at the file generated here
+    from app import migrations, models, progress, rollups, versions
+    from app.database import Base, apply_sqlite_pragmas
+
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    try:
+        Base.metadata.create_all(bind=engine)
+        migrations.upgrade(engine)
+        data = rows(goals, milestones, tasks, members, ideas, comments, years, seed)
+        with Session(engine) as db:
+            for model, values in data.items():
+                if values:
+                    db.execute(insert(model), values)
+            # Task counters and rollups as the write handlers would have left them
+            progress.recompute(db, derive=False)
+            rollups.rebuild(db)
+            db.query(models.TableVersion).filter(models.TableVersion.name == versions.EPOCH).update(
+                {"version": seed}
+            )
+            db.commit()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        engine.dispose()
+    return {model.__tablename__: len(values) for model, values in data.items()}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    add_size_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        counts = generate(args.path, **sizes(args))
+    except FileExistsError:
+        print(f"{args.path} already exists", file=sys.stderr)
+        return 1
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
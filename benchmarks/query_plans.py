@@ -0,0 +1,128 @@
+"""EXPLAIN QUERY PLAN of the list filters, before and after the migrations.
+
+Builds an empty database with the schema the app first shipped (the tables
+and their primary key indexes, `user_version` 0), takes the plan of every
+filter the routers send, upgrades it the way the app does on startup
+(`create_all` for the tables added since, then app.migrations.upgrade) and
+takes the plans again. Each filter has to go from a full scan of its table
+to a search through the index added for it, and the idea board from
+sorting in a temporary b-tree to reading the index in order. Exits
+non-zero if not:
+
+    python -m benchmarks.query_plans
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+# As Base.metadata.create_all wrote it before the first migration
+BASELINE_SCHEMA = """
+CREATE TABLE members (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL, role VARCHAR(50) NOT NULL, team VARCHAR(100),
+    product VARCHAR(100), type VARCHAR(20) NOT NULL, join_date DATE, year INTEGER NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_members_id ON members (id);
+CREATE TABLE goals (
+    id INTEGER NOT NULL PRIMARY KEY, type VARCHAR(20) NOT NULL, title VARCHAR(200) NOT NULL, description TEXT,
+    expected_effect TEXT, year INTEGER NOT NULL, quarter VARCHAR(10), team VARCHAR(100), product VARCHAR(100),
+    tags VARCHAR(500), progress INTEGER, start_date DATE, end_date DATE,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_goals_id ON goals (id);
+CREATE TABLE milestones (
+    id INTEGER NOT NULL PRIMARY KEY, goal_id INTEGER NOT NULL REFERENCES goals (id) ON DELETE CASCADE,
+    title VARCHAR(200) NOT NULL, description TEXT, due_date DATE, start_date DATE, progress INTEGER,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_milestones_id ON milestones (id);
+CREATE TABLE tasks (
+    id INTEGER NOT NULL PRIMARY KEY, milestone_id INTEGER NOT NULL REFERENCES milestones (id) ON DELETE CASCADE,
+    title VARCHAR(200) NOT NULL, description TEXT, assignee_id INTEGER REFERENCES members (id) ON DELETE SET NULL,
+    due_date DATE, start_date DATE, progress INTEGER,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_tasks_id ON tasks (id);
+CREATE TABLE ideas (
+    id INTEGER NOT NULL PRIMARY KEY, type VARCHAR(20) NOT NULL, title VARCHAR(200) NOT NULL, description TEXT,
+    year INTEGER NOT NULL, product VARCHAR(100), priority INTEGER, status VARCHAR(20),
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_ideas_id ON ideas (id);
+CREATE TABLE comments (
+    id INTEGER NOT NULL PRIMARY KEY, idea_id INTEGER NOT NULL REFERENCES ideas (id) ON DELETE CASCADE,
+    author VARCHAR(100) NOT NULL, content TEXT NOT NULL, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_comments_id ON comments (id);
+"""
+
+# (table, query, parameters, index the migrated plan must search through)
+FILTERS = [
+    ("goals", "SELECT * FROM goals WHERE year = ? AND type = ?", (2026, "issue"), "ix_goals_year_type"),
+    ("goals", "SELECT * FROM goals WHERE year = ? AND team = ?", (2026, "웹"), "ix_goals_year_team"),
+    ("goals", "SELECT * FROM goals WHERE year = ? AND product = ?", (2026, "검색"), "ix_goals_year_product"),
+    ("goals", "SELECT * FROM goals WHERE year = ? AND quarter = ?", (2026, "Q1"), "ix_goals_year_quarter"),
+    ("members", "SELECT * FROM members WHERE year = ? AND team = ?", (2026, "웹"), "ix_members_year_team"),
+    ("members", "SELECT * FROM members WHERE year = ? AND type = ?", (2026, "new"), "ix_members_year_type"),
+    ("ideas", "SELECT * FROM ideas WHERE year = ? AND status = ?", (2026, "open"), "ix_ideas_year_status"),
+    ("ideas", "SELECT * FROM ideas WHERE year = ? AND product = ?", (2026, "검색"), "ix_ideas_year_product"),
+    (
+        "ideas", "SELECT * FROM ideas WHERE year = ? ORDER BY priority, created_at DESC, id DESC", (2026,),
+        "ix_ideas_year_priority_created_at",
+    ),
+    ("milestones", "SELECT * FROM milestones WHERE goal_id IN (?, ?)", (1, 2), "ix_milestones_goal_id"),
+    ("tasks", "SELECT * FROM tasks WHERE milestone_id IN (?, ?)", (1, 2), "ix_tasks_milestone_id"),
+    ("tasks", "SELECT * FROM tasks WHERE assignee_id = ?", (1,), "ix_tasks_assignee_id"),
+    ("comments", "SELECT * FROM comments WHERE idea_id IN (?, ?)", (1, 2), "ix_comments_idea_id"),
+]
+
+
+def plan(path, query, parameters):
+    """The detail column of each EXPLAIN QUERY PLAN row."""
+    with sqlite3.connect(path) as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", parameters)]
+
+
+def problems(table, before, after, index):
+    found = []
+    if not any(step.startswith(f"SCAN {table}") for step in before):
+        found.append(f"baseline doesn't scan {table}: {before}")
+    searched = (f"SEARCH {table} USING INDEX {index} ", f"SEARCH {table} USING COVERING INDEX {index} ")
+    if not any(step.startswith(searched) for step in after):
+        found.append(f"migrated doesn't search {index}: {after}")
+    if any("TEMP B-TREE" in step for step in after):
+        found.append(f"migrated still sorts: {after}")
+    return found
+
+
+def main(argv):
+    # Imported here, as in benchmarks.generate: app.database binds the app's engine on first import
+    from app import migrations, models  # noqa: F401  (registers the tables)
+    from app.database import Base
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="roadmap-plans-") as workdir:
+        path = os.path.join(workdir, "roadmap.db")
+        with sqlite3.connect(path) as conn:
+            conn.executescript(BASELINE_SCHEMA)
+        before = [plan(path, query, parameters) for _, query, parameters, _ in FILTERS]
+        engine = create_engine(f"sqlite:///{path}")
+        try:
+            Base.metadata.create_all(bind=engine)
+            migrations.upgrade(engine)
+        finally:
+            engine.dispose()
+        for (table, query, parameters, index), old in zip(FILTERS, before):
+            new = plan(path, query, parameters)
+            print(f"{query}\n    before: {'; '.join(old)}\n    after:  {'; '.join(new)}")
+            failures += [f"{query}: {problem}" for problem in problems(table, old, new, index)]
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""Export every table and import it back, through the ASGI app.
+
+A small database is generated (see benchmarks.generate) into a temporary
+directory, and a few goals get tags repeated in the same or another case,
+which the tag tables keep once. Each table is then exported and imported
+again in both formats. The imports update every row in place, so each has
+to finish without an error, leave the export unchanged, and leave the tag
+tables matching Goal.tags. Exits non-zero if not:
+
+    python -m benchmarks.round_trip
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.run import ROOT
+
+TABLES = ["goals", "milestones", "tasks", "members", "ideas"]
+REPEATED_TAGS = ["x,x", "성능,보안,성능", "API,api, Api "]
+
+
+def tag_drift():
+    """Goals whose tag tables don't hold the names in Goal.tags."""
+    from app import models
+    from app.database import SessionLocal
+    from app.routers.goals import parse_tags
+
+    db = SessionLocal()
+    try:
+        linked = {}
+        for goal_id, name in db.query(models.GoalTag.goal_id, models.Tag.name).join(models.Tag):
+            linked.setdefault(goal_id, set()).add(name.lower())
+        return [
+            f"goal {goal_id}: tags {tags!r}, linked {sorted(linked.get(goal_id, ()))}"
+            for goal_id, tags in db.query(models.Goal.id, models.Goal.tags)
+            if {name.lower() for name in parse_tags(tags or "")} != linked.get(goal_id, set())
+        ]
+    finally:
+        db.close()
+
+
+async def round_trip():
+    # Imported here: the app binds its database from the environment set up by main()
+    from app.main import app
+
+    failures = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://round-trip") as client:
+            goals = (await client.get("/api/goals/", params={"depth": "goal"})).json()
+            for goal, tags in zip(goals, REPEATED_TAGS):
+                await client.put(f"/api/goals/{goal['id']}", json={"tags": tags})
+            for table in TABLES:
+                for format in ("csv", "ndjson"):
+                    exported = (await client.get(f"/api/export/{table}", params={"format": format})).content
+                    response = await client.post(
+                        f"/api/import/{table}", params={"format": format},
+                        files={"file": (f"{table}.{format}", exported)},
+                    )
+                    lines = [json.loads(line) for line in response.text.splitlines()]
+                    last = lines[-1] if lines else {}
+                    if response.status_code != 200 or not last.get("done") or "error" in last:
+                        failures.append(f"import {table} {format}: {response.status_code} {response.text[-200:]}")
+                    again = (await client.get(f"/api/export/{table}", params={"format": format})).content
+                    if again != exported:
+                        failures.append(f"export {table} {format} changed by importing it")
+    return failures + tag_drift()
+
+
+def main(argv):
+    workdir = tempfile.mkdtemp(prefix="roadmap-round-trip-")
+    path = os.path.join(workdir, "roadmap.db")
+    try:
+        # Before anything imports app.database, which binds its engines from these
+        os.environ["ROADMAP_DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["ROADMAP_BACKUP_INTERVAL"] = "0"
+        from benchmarks.generate import generate
+
+        generate(path, goals=30, members=10, ideas=10)
+        # The app serves static/ and templates/ relative to the working directory
+        os.chdir(ROOT)
+        failures = asyncio.run(round_trip())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(TABLES)} tables exported and imported back as csv and ndjson, {len(failures)} failed")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,238 @@
+"""Benchmark every endpoint in-process through the ASGI app.
+
+A database is generated (see benchmarks.generate) or copied from `--db`
+into a temporary directory, and the app is imported against it. Each case
+in benchmarks.cases is sent through httpx's ASGI transport `--repeat` times
+with the response cache cleared, so every request does its full work.
+Per case it records latency percentiles, the SQL statements run (the most
+seen in one request), the response size and the peak Python heap during
+one more request. Results go to a JSON file to compare between commits
+with benchmarks.compare.
+
+`--check` sends each case once and exits non-zero when a request fails, a
+case runs more SQL statements than its `max_sql`, or a route has no case.
+That makes the N+1 guards a regular test. The budgets are set for the
+default dataset and only checked against it:
+
+    python -m benchmarks.run                 # writes benchmarks/results/<commit>.json
+    python -m benchmarks.run --check
+    python -m benchmarks.compare benchmarks/results/a1b2c3d.json benchmarks/results/e4f5a6b.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.cases import CASES, SKIPPED, Fixture
+from benchmarks.generate import DEFAULTS, add_size_arguments, sizes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+class StatementCounter:
+    """Counts the SQL statements sent through the given engines (an executemany counts once)."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._executed)
+
+    def _executed(self, *args):
+        self.count += 1
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def commit():
+    try:
+        head = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{head}-dirty" if dirty else head
+
+
+def uncovered_routes(app):
+    from fastapi.routing import APIRoute
+
+    declared = {
+        f"{method} {route.path}" for route in app.routes if isinstance(route, APIRoute) for method in route.methods
+    }
+    return sorted(declared - {case.route for case in CASES} - set(SKIPPED))
+
+
+async def measure(case, client, fixture, counter, response_cache, repeat, memory, budgets):
+    runs = min(case.repeat, repeat) if case.repeat else repeat
+    timings, statements, size, failure = [], 0, 0, None
+    # Requests that replace the whole database aren't worth a warm-up
+    for run in range(runs + (0 if case.repeat else 1)):
+        spec = await case.request(fixture)
+        response_cache.clear()
+        counter.count = 0
+        start = time.perf_counter()
+        response = await client.request(**spec)
+        elapsed = time.perf_counter() - start
+        if response.status_code != case.status:
+            failure = f"status {response.status_code}, expected {case.status}: {response.text[:200]}"
+            break
+        if run or case.repeat:
+            timings.append(elapsed)
+            statements, size = max(statements, counter.count), len(response.content)
+
+    peak = None
+    if memory and failure is None:
+        spec = await case.request(fixture)
+        response_cache.clear()
+        tracemalloc.start()
+        try:
+            await client.request(**spec)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    result = {"route": case.route, "status": case.status, "runs": len(timings), "sql": statements,
+              "max_sql": case.max_sql, "bytes": size, "peak_kib": None if peak is None else round(peak / 1024)}
+    if timings:
+        result.update({
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+            "p90_ms": round(percentile(timings, 0.9) * 1000, 3),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+            "max_ms": round(max(timings) * 1000, 3),
+            "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        })
+    if failure is None and budgets and case.max_sql is not None and statements > case.max_sql:
+        failure = f"{statements} SQL statements, budget {case.max_sql}"
+    return result, failure
+
+
+async def run(cases, repeat, memory, budgets):
+    # Imported here: the app binds its database from the environment set up by main()
+    from app import database
+    from app.cache import response_cache
+    from app.main import app
+
+    engines = [database.engine] + ([database.async_engine.sync_engine] if database.async_engine else [])
+    counter = StatementCounter(engines)
+    results, failures = {}, []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            fixture = Fixture(client)
+            await fixture.load()
+            for case in cases:
+                result, failure = await measure(
+                    case, client, fixture, counter, response_cache, repeat, memory, budgets
+                )
+                results[case.name] = result
+                print(format_row(case.name, result), flush=True)
+                if failure:
+                    failures.append(f"{case.name}: {failure}")
+    failures += [f"{route}: no benchmark case" for route in uncovered_routes(app)]
+    return results, failures, database.USE_ASYNC_DB
+
+
+def format_row(name, result):
+    if "p50_ms" not in result:
+        return f"{name:28} failed"
+    peak = "" if result["peak_kib"] is None else f"{result['peak_kib']:9} KiB"
+    return (f"{name:28} p50 {result['p50_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms  "
+            f"p99 {result['p99_ms']:9.2f} ms  sql {result['sql']:4}  {result['bytes']:9} B {peak}")
+
+
+def copy_database(source, target):
+    """A consistent copy of `source`, WAL included."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="benchmark a copy of this database instead of a generated one")
+    add_size_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=20, help="timed requests per case")
+    parser.add_argument("--only", help="run only the cases whose name contains this")
+    parser.add_argument("--async-db", action="store_true", help="serve through aiosqlite (ROADMAP_ASYNC_DB)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced request for peak memory")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>.json; none with --check)")
+    parser.add_argument("--check", action="store_true", help="one request per case; fail on errors and SQL budgets")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if not args.only or args.only in case.name]
+    repeat = 1 if args.check else args.repeat
+    workdir = tempfile.mkdtemp(prefix="roadmap-benchmark-")
+    path = os.path.join(workdir, "roadmap.db")
+    try:
+        # Before anything imports app.database, which binds its engines from these
+        os.environ["ROADMAP_DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["ROADMAP_BACKUP_INTERVAL"] = "0"
+        if args.async_db:
+            os.environ["ROADMAP_ASYNC_DB"] = "1"
+        if args.db:
+            copy_database(args.db, path)
+        else:
+            from benchmarks.generate import generate
+
+            generate(path, **sizes(args))
+        # The app serves static/ and templates/ relative to the working directory
+        os.chdir(ROOT)
+        budgets = not args.db and sizes(args) == DEFAULTS
+        results, failures, async_db = asyncio.run(
+            run(cases, repeat, memory=not (args.check or args.no_memory), budgets=budgets)
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.only:
+        failures = [failure for failure in failures if not failure.endswith("no benchmark case")]
+    output = args.output or (None if args.check else os.path.join(
+        RESULTS_DIR, f"{commit()}{'-async' if async_db else ''}.json"
+    ))
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as file:
+            json.dump({
+                "commit": commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "async_db": async_db,
+                "database": args.db or sizes(args),
+                "repeat": repeat,
+                "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "cases": results,
+                "failures": failures,
+            }, file, ensure_ascii=False, indent=2)
+        print(f"results written to {output}")
+    if not budgets:
+        print("SQL budgets are set for the default dataset and were not checked", file=sys.stderr)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
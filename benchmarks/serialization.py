@@ -0,0 +1,102 @@
+"""Micro-benchmark of rendering the goal tree (`GET /api/goals/`) to JSON.
+
+Builds an in-memory tree of ORM objects and renders it the way FastAPI does
+for a `response_model` (validate, dump to dicts, encode with the stdlib or
+orjson) and through `app.responses.dump_json`. No database is involved.
+
+    python -m benchmarks.serialization --goals 300 --milestones 5 --tasks 8
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date, datetime
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import models, schemas
+from app.responses import dump_json
+
+
+def goal_tree(goals, milestones, tasks):
+    now = datetime(2026, 1, 1, 9, 30)
+    members = [
+        models.Member(id=i, name=f"멤버 {i}", role="Developer", team="플랫폼", type="existing", year=2026,
+                      created_at=now, updated_at=now)
+        for i in range(1, 21)
+    ]
+    tree = []
+    for g in range(1, goals + 1):
+        goal = models.Goal(
+            id=g, type="feature", title=f"목표 {g}", description="설명 " * 20, expected_effect="기대효과",
+            year=2026, quarter="Q1", team="플랫폼", product="대시보드", tags="성능,보안", progress=g % 100,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), created_at=now, updated_at=now,
+        )
+        for m in range(milestones):
+            milestone = models.Milestone(
+                id=g * 100 + m, goal_id=g, title=f"마일스톤 {m}", description="마일스톤 설명",
+                start_date=date(2026, 2, 1), due_date=date(2026, 3, 1), progress=50, created_at=now, updated_at=now,
+            )
+            milestone.tasks = [
+                models.Task(
+                    id=(g * 100 + m) * 100 + t, milestone_id=milestone.id, title=f"태스크 {t}",
+                    assignee_id=members[t % 20].id, assignee=members[t % 20], start_date=date(2026, 2, 1),
+                    due_date=date(2026, 2, 15), progress=t * 10, created_at=now, updated_at=now,
+                )
+                for t in range(tasks)
+            ]
+            goal.milestones.append(milestone)
+        tree.append(goal)
+    return tree
+
+
+def fastapi_render(field, response_class):
+    async def render(goals):
+        content = await serialize_response(field=field, response_content=goals)
+        return response_class(content).body
+    return lambda goals: asyncio.run(render(goals))
+
+
+def measure(render, goals, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render(goals)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--goals", type=int, default=300)
+    parser.add_argument("--milestones", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    goals = goal_tree(args.goals, args.milestones, args.tasks)
+    field = create_response_field(name="response", type_=List[schemas.Goal])
+    renderers = {
+        "FastAPI response_model + json": fastapi_render(field, JSONResponse),
+        "FastAPI response_model + orjson": fastapi_render(field, ORJSONResponse),
+        "app.responses.dump_json": lambda goals: dump_json(List[schemas.Goal], goals),
+    }
+    print(f"{args.goals} goals, {args.goals * args.milestones} milestones, "
+          f"{args.goals * args.milestones * args.tasks} tasks")
+    baseline = expected = None
+    for name, render in renderers.items():
+        render(goals)  # warm up validators
+        seconds, body = measure(render, goals, args.repeat)
+        if expected is None:
+            baseline, expected = seconds, json.loads(body)
+        elif json.loads(body) != expected:
+            raise SystemExit(f"{name} rendered different JSON")
+        print(f"{name:34} {seconds * 1000:8.1f} ms  {len(body) / 1024:7.0f} KiB  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Concurrent readers and writers against one database, through the ASGI app.
+
+A database is generated (see benchmarks.generate) or copied from `--db`
+into a temporary directory, as in benchmarks.run, with the response cache
+off so every read queries it. `--readers` and `--writers` clients then send
+read and write cases from benchmarks.cases in a closed loop for
+`--seconds`. Sync sessions run in the threadpool, so the requests hold
+their own connections and contend for SQLite's write lock like separate
+clients would. Exits non-zero when any request fails ("database is locked"
+counted apart), or when the rollup tables or task counters no longer match
+the rows they summarize:
+
+    python -m benchmarks.stress
+    python -m benchmarks.stress --readers 16 --writers 8 --seconds 10 --async-db
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.cases import CASES, Fixture
+from benchmarks.generate import add_size_arguments, sizes
+from benchmarks.run import ROOT, copy_database
+
+READS = [
+    "dashboard summary", "gantt year", "goal tree year", "goal", "milestones of goal", "tasks of assignee",
+    "members summary", "ideas year", "search",
+]
+# Each one moves the goal or member rollups, the task counters, or both
+WRITES = [
+    "create goal", "update goal", "delete goal", "create milestone", "update milestone", "delete milestone",
+    "create task", "update task", "delete task", "create member", "update member", "delete member",
+    "convert idea", "batch", "import members ndjson",
+]
+LOCKED = "database is locked"
+
+
+class Tally:
+    def __init__(self):
+        self.requests = Counter()
+        self.locked = 0
+        self.failures = []
+
+    def record(self, kind, name, failure):
+        self.requests[kind] += 1
+        if failure is None:
+            return
+        if LOCKED in failure:
+            self.locked += 1
+        self.failures.append(f"{name}: {failure}")
+
+
+async def client_loop(client, fixture, kind, cases, offset, deadline, tally):
+    """Send `cases` in turn, starting at `offset`, until `deadline`."""
+    turn = offset
+    while time.monotonic() < deadline:
+        case = cases[turn % len(cases)]
+        turn += 1
+        try:
+            response = await client.request(**await case.request(fixture))
+            failure = None if response.status_code == case.status else (
+                f"status {response.status_code}: {response.text[:200]}"
+            )
+        except Exception as error:  # the ASGI transport re-raises the app's exceptions
+            failure = f"{type(error).__name__}: {error}"
+        tally.record(kind, case.name, failure)
+
+
+def drift():
+    """Rollup rows and task counters that no longer match the source tables."""
+    from app import progress, rollups
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        found = [f"{table} {key}: stored {stored}, expected {expected}"
+                 for table, key, stored, expected in rollups.check(db)]
+        # recompute() only touches stale rows; rolled back, it just counts them
+        found += [f"{table}: {count} row(s) with stale task counters"
+                  for table, count in progress.recompute(db, derive=False).items() if count]
+        db.rollback()
+    finally:
+        db.close()
+    return found
+
+
+async def stress(readers, writers, seconds):
+    # Imported here: the app binds its database from the environment set up by main()
+    from app.main import app
+
+    by_name = {case.name: case for case in CASES}
+    reads, writes = [by_name[name] for name in READS], [by_name[name] for name in WRITES]
+    tally = Tally()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=None) as client:
+            fixture = Fixture(client)
+            await fixture.load()
+            deadline = time.monotonic() + seconds
+            await asyncio.gather(
+                *[client_loop(client, fixture, "reads", reads, i, deadline, tally) for i in range(readers)],
+                *[client_loop(client, fixture, "writes", writes, i, deadline, tally) for i in range(writers)],
+            )
+    return tally
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="stress a copy of this database instead of a generated one")
+    add_size_arguments(parser)
+    # A smaller tree than the benchmarks': cheaper requests, so more writes per second to collide
+    parser.set_defaults(goals=100, members=30, ideas=60)
+    parser.add_argument("--readers", type=int, default=8, help="concurrent clients sending reads")
+    parser.add_argument("--writers", type=int, default=8, help="concurrent clients sending writes")
+    parser.add_argument("--seconds", type=float, default=5, help="how long the clients keep sending")
+    parser.add_argument("--async-db", action="store_true", help="serve through aiosqlite (ROADMAP_ASYNC_DB)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="roadmap-stress-")
+    path = os.path.join(workdir, "roadmap.db")
+    try:
+        # Before anything imports app.database, which binds its engines from these
+        os.environ["ROADMAP_DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ["ROADMAP_BACKUP_INTERVAL"] = "0"
+        os.environ["ROADMAP_CACHE_MAX_BYTES"] = "0"
+        if args.async_db:
+            os.environ["ROADMAP_ASYNC_DB"] = "1"
+        if args.db:
+            copy_database(args.db, path)
+        else:
+            from benchmarks.generate import generate
+
+            generate(path, **sizes(args))
+        # The app serves static/ and templates/ relative to the working directory
+        os.chdir(ROOT)
+        tally = asyncio.run(stress(args.readers, args.writers, args.seconds))
+        drifted = drift()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s: "
+          + ", ".join(f"{count} {kind} ({count / args.seconds:.0f}/s)" for kind, count in tally.requests.items())
+          + f", {len(tally.failures)} failed, {tally.locked} locked, {len(drifted)} drifted")
+    for failure in tally.failures[:20] + drifted:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if tally.failures or drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,15 +1,57 @@
 // API Helper Functions
 const API = {
+    // Last ETag and body per GET url; the server answers 304 while the data is unchanged.
+    // Bodies are kept as text so every caller gets its own parsed copy.
+    _etagCache: new Map(),
+
+    async getCached(url) {
+        const cached = this._etagCache.get(url);
+        const response = await fetch(url, {
+            headers: cached ? { 'If-None-Match': cached.etag } : {}
+        });
+        if (response.status === 304 && cached) {
+            return { body: JSON.parse(cached.text), headers: cached.headers };
+        }
+        const entry = {
+            etag: response.headers.get('ETag'),
+            text: await response.text(),
+            headers: response.headers
+        };
+        if (response.ok && entry.etag) {
+            this._etagCache.set(url, entry);
+        }
+        return { body: JSON.parse(entry.text), headers: entry.headers };
+    },
+
+    async getJSON(url) {
+        return (await this.getCached(url)).body;
+    },
+
+    // Paged lists: pass { limit, cursor } to /api/goals/, /api/tasks/, /api/members/ or /api/ideas/
+    // and keep calling with the returned nextCursor until it is null
+    async getPage(path, params = {}) {
+        const query = new URLSearchParams(params).toString();
+        const entry = await this.getCached(`${path}?${query}`);
+        return {
+            items: entry.body,
+            nextCursor: entry.headers.get('X-Next-Cursor')
+        };
+    },
+
     // Goals
     async getGoals(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/goals/?${query}`);
-        return response.json();
+        return this.getJSON(`/api/goals/?${query}`);
+    },
+
+    // [{ name, count }] for the tag cloud; filter goals with getGoals({ tags: 'a,b', tag_match: 'all' })
+    async getGoalTags(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return this.getJSON(`/api/goals/tags?${query}`);
     },
 
     async getGoal(id) {
-        const response = await fetch(`/api/goals/${id}`);
-        return response.json();
+        return this.getJSON(`/api/goals/${id}`);
     },
 
     async createGoal(data) {
@@ -38,8 +80,7 @@ const API = {
     // Milestones
     async getMilestones(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/milestones/?${query}`);
-        return response.json();
+        return this.getJSON(`/api/milestones/?${query}`);
     },
 
     async createMilestone(data) {
@@ -68,8 +109,7 @@ const API = {
     // Tasks
     async getTasks(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/tasks/?${query}`);
-        return response.json();
+        return this.getJSON(`/api/tasks/?${query}`);
     },
 
     async createTask(data) {
@@ -98,8 +138,7 @@ const API = {
     // Members
     async getMembers(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/members/?${query}`);
-        return response.json();
+        return this.getJSON(`/api/members/?${query}`);
     },
 
     async createMember(data) {
@@ -127,40 +166,67 @@ const API = {
 
     async getMembersSummary(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/members/summary?${query}`);
-        return response.json();
+        return this.getJSON(`/api/members/summary?${query}`);
     },
 
     // Years
     async getYears() {
-        const response = await fetch('/api/years');
-        return response.json();
+        return this.getJSON('/api/years');
     },
 
     // Dashboard
     async getDashboardSummary(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/dashboard/summary?${query}`);
-        return response.json();
+        return this.getJSON(`/api/dashboard/summary?${query}`);
     },
 
     // Gantt
     async getGanttData(params = {}) {
         const query = new URLSearchParams(params).toString();
+        return this.getJSON(`/api/gantt/data?${query}`);
+    },
+
+    // Streams /api/gantt/data as format=columnar, calling onChunk with each parsed chunk of columns as it
+    // arrives (one per batch of rows; parent indexes count across chunks, see app/gantt.py)
+    async streamGanttData(params, onChunk) {
+        const query = new URLSearchParams({ ...params, format: 'columnar' }).toString();
         const response = await fetch(`/api/gantt/data?${query}`);
-        return response.json();
+        if (!response.ok) {
+            throw new Error(`Failed to load gantt data (${response.status})`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let pending = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            pending += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = pending.split('\n');
+            pending = done ? '' : lines.pop();
+            lines.filter(line => line).forEach(line => onChunk(JSON.parse(line)));
+            if (done) break;
+        }
+    },
+
+    // Search: { q, type, year, limit, cursor } -> { items, nextCursor }; titles and snippets are HTML with <mark>
+    async search(params) {
+        return this.getPage('/api/search', params);
+    },
+
+    // Incremental sync: { token, reset, more, upserts: { entity: [row] }, deletes: { entity: [id] } }.
+    // Pass the last token as since; on reset drop the local copy; apply deletes before upserts; repeat while more.
+    async getChanges(since = null, limit = 1000) {
+        const params = since ? { since, limit } : { limit };
+        return this.getJSON(`/api/changes?${new URLSearchParams(params).toString()}`);
     },
 
     // Ideas
     async getIdeas(params = {}) {
         const query = new URLSearchParams(params).toString();
-        const response = await fetch(`/api/ideas/?${query}`);
-        return response.json();
+        return this.getJSON(`/api/ideas/?${query}`);
     },
 
     async getIdea(id) {
-        const response = await fetch(`/api/ideas/${id}`);
-        return response.json();
+        return this.getJSON(`/api/ideas/${id}`);
     },
 
     async createIdea(data) {
@@ -193,8 +259,11 @@ const API = {
 
     // Comments
     async getComments(ideaId) {
-        const response = await fetch(`/api/ideas/${ideaId}/comments`);
-        return response.json();
+        return this.getJSON(`/api/ideas/${ideaId}/comments`);
+    },
+
+    async getCommentsPage(ideaId, params = {}) {
+        return this.getPage(`/api/ideas/${ideaId}/comments`, params);
     },
 
     async createComment(ideaId, data) {
@@ -209,5 +278,16 @@ const API = {
     async deleteComment(commentId) {
         const response = await fetch(`/api/ideas/comments/${commentId}`, { method: 'DELETE' });
         return response.json();
+    },
+
+    // Batch: [{ op: 'create'|'update'|'delete', entity: 'goal'|'milestone'|'task', id, ref, data }, ...]
+    // in one transaction; a create's ref can stand in for its id in later operations
+    async batch(operations) {
+        const response = await fetch('/api/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operations })
+        });
+        return response.json();
     }
 };
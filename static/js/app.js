@@ -4,6 +4,7 @@ const App = {
     goals: [],
     members: [],
     ideas: [],
+    commentPageSize: 50,
     currentTab: 'dashboard',
 
     async init() {
@@ -21,6 +22,8 @@ const App = {
 
         // Initial load
         await this.refresh();
+
+        this.listenForChanges();
     },
 
     async loadYears() {
@@ -227,6 +230,125 @@ const App = {
         GanttChart.updateYearDropdown();
     },
 
+    // Live updates: /api/events says what other sessions changed, and only that is fetched again
+    listenForChanges() {
+        if (!window.EventSource) return;
+        const source = new EventSource('/api/events');
+        source.addEventListener('change', (e) => this.applyChange(JSON.parse(e.data)));
+        // Sent when the server could not keep up with this client or restarted
+        source.addEventListener('resync', () => this.scheduleRefresh());
+    },
+
+    // Coalesces bursts of changes into one reload
+    debounce(key, fn, delay = 300) {
+        clearTimeout(this._timers?.[key]);
+        this._timers = { ...this._timers, [key]: setTimeout(fn, delay) };
+    },
+
+    scheduleRefresh() {
+        this.debounce('refresh', async () => {
+            await this.refresh();
+            if (this.currentTab === 'brainstorming') this.loadIdeas();
+        });
+    },
+
+    // Year aggregates are cached server-side and answer 304 when unchanged
+    scheduleViews() {
+        this.debounce('views', async () => {
+            await Dashboard.update(this.currentYear);
+            await GanttChart.update(this.currentYear);
+            if (this.currentTab === 'goal-manager') await GoalManager.update(this.currentYear);
+        });
+    },
+
+    async applyChange(change) {
+        const { entity, id, year, op, parent } = change;
+        if (op === 'reset') {
+            this.scheduleRefresh();
+            return;
+        }
+        if (year !== null && year !== this.currentYear) {
+            // Another year may have gained or lost its last row
+            if (entity !== 'milestone' && entity !== 'task' && entity !== 'comment') {
+                this.debounce('years', () => this.refreshYears());
+            }
+            return;
+        }
+        if (entity === 'goal') {
+            await this.patchGoal(id, op === 'delete');
+        } else if (entity === 'milestone' || entity === 'task') {
+            // A milestone's parent is its goal, a task's its milestone (batch changes carry none)
+            const milestoneId = entity === 'milestone' ? id : parent;
+            const goalId = entity === 'milestone' && parent
+                ? parent
+                : this.goals.find(g => (g.milestones || []).some(m => m.id === milestoneId))?.id;
+            if (goalId) {
+                await this.patchGoal(goalId);
+            } else {
+                this.scheduleRefresh();
+            }
+        } else if (entity === 'member') {
+            this.debounce('members', async () => {
+                if (this.currentTab === 'members') {
+                    await this.loadMembers();
+                } else {
+                    this.members = await API.getMembers({ year: this.currentYear });
+                }
+                this.updateTeamFilter();
+                Editor.loadMembers();
+            });
+        } else if (this.currentTab === 'brainstorming' && entity === 'idea') {
+            await this.patchIdea(id, op === 'delete');
+        } else if (this.currentTab === 'brainstorming' && entity === 'comment') {
+            await this.patchIdeaComments(parent);
+        }
+    },
+
+    async patchGoal(goalId, deleted = false) {
+        const goal = deleted ? null : await API.getGoal(goalId).catch(() => null);
+        const index = this.goals.findIndex(g => g.id === goalId);
+        if (!goal?.id || goal.year !== this.currentYear) {
+            if (index >= 0) this.goals.splice(index, 1);
+        } else if (index >= 0) {
+            this.goals[index] = goal;
+        } else {
+            this.goals.push(goal);
+        }
+        this.renderGoalsTree();
+        this.scheduleViews();
+    },
+
+    async patchIdea(ideaId, deleted = false) {
+        const idea = deleted ? null : await API.getIdea(ideaId).catch(() => null);
+        const index = this.ideas.findIndex(i => i.id === ideaId);
+        if (!idea?.id || idea.year !== this.currentYear) {
+            if (index >= 0) this.ideas.splice(index, 1);
+        } else {
+            delete idea.comments;
+            if (index >= 0) {
+                this.ideas[index] = idea;
+            } else {
+                this.ideas.unshift(idea);
+            }
+        }
+        this.updateIdeasSummary();
+        this.renderIdeasList();
+    },
+
+    // Takes the comment count from the server, so a comment this session added isn't counted twice
+    async patchIdeaComments(ideaId) {
+        const idea = this.ideas.find(i => i.id === ideaId);
+        const card = document.querySelector(`.idea-card[data-id="${ideaId}"]`);
+        if (!idea || !card) return;
+        const fresh = await API.getIdea(ideaId).catch(() => null);
+        if (!fresh?.id) return;
+        idea.comment_count = fresh.comment_count;
+        card.querySelector('.comment-count').textContent = idea.comment_count;
+        if (card.dataset.commentsLoaded) {
+            await this.loadComments(ideaId);
+        }
+    },
+
     async loadMembers() {
         this.members = await API.getMembers({ year: this.currentYear });
         const summary = await API.getMembersSummary({ year: this.currentYear });
@@ -681,10 +803,50 @@ const App = {
                 const body = card.querySelector('.idea-card-body');
                 expand.classList.toggle('expanded');
                 body.classList.toggle('expanded');
+                // Listings carry only comment counts; a card's comments are fetched when it is first opened
+                if (body.classList.contains('expanded') && !card.dataset.commentsLoaded) {
+                    this.loadComments(parseInt(card.dataset.id));
+                }
             });
         });
     },
 
+    renderComment(comment) {
+        const commentDate = new Date(comment.created_at).toLocaleDateString('ko-KR');
+        return `
+            <div class="comment-item">
+                <div class="comment-header">
+                    <span class="comment-author">${comment.author}</span>
+                    <span class="comment-date">${commentDate}</span>
+                </div>
+                <div class="comment-content">${comment.content}</div>
+            </div>
+        `;
+    },
+
+    // Shows the first page of an idea's comments, or appends the page after `cursor`
+    async loadComments(ideaId, cursor = null) {
+        const card = document.querySelector(`.idea-card[data-id="${ideaId}"]`);
+        if (!card) return;
+        const params = { limit: this.commentPageSize };
+        if (cursor) params.cursor = cursor;
+        const page = await API.getCommentsPage(ideaId, params);
+        card.dataset.commentsLoaded = 'true';
+
+        const list = card.querySelector('.comments-list');
+        const html = page.items.map(comment => this.renderComment(comment)).join('');
+        if (cursor) {
+            list.querySelector('.comments-more')?.remove();
+            list.insertAdjacentHTML('beforeend', html);
+        } else {
+            list.innerHTML = html || '<p style="color: var(--text-secondary); font-size: 0.875rem;">댓글이 없습니다.</p>';
+        }
+        if (page.nextCursor) {
+            list.insertAdjacentHTML('beforeend',
+                `<button class="btn btn-sm comments-more" onclick="App.loadComments(${ideaId}, '${page.nextCursor}')">댓글 더 보기</button>`);
+        }
+    },
+
     renderIdeaCard(idea) {
         const typeClass = idea.type;
         const typeLabel = idea.type === 'issue' ? '문제점 개선' : idea.type === 'feature' ? '신규 기능' : '사용자 피드백';
@@ -693,19 +855,6 @@ const App = {
         const statusLabel = idea.status === 'open' ? '검토 중' : idea.status === 'approved' ? '승인됨' : idea.status === 'rejected' ? '거절됨' : '목표 전환';
         const createdDate = new Date(idea.created_at).toLocaleDateString('ko-KR');
 
-        const commentsHtml = idea.comments.map(comment => {
-            const commentDate = new Date(comment.created_at).toLocaleDateString('ko-KR');
-            return `
-                <div class="comment-item">
-                    <div class="comment-header">
-                        <span class="comment-author">${comment.author}</span>
-                        <span class="comment-date">${commentDate}</span>
-                    </div>
-                    <div class="comment-content">${comment.content}</div>
-                </div>
-            `;
-        }).join('');
-
         const canConvert = idea.status === 'approved';
         const canApprove = idea.status === 'open';
         const isConverted = idea.status === 'converted';
@@ -734,8 +883,8 @@ const App = {
                         ${idea.product ? `<span>📦 제품: ${idea.product}</span>` : ''}
                     </div>
                     <div class="idea-comments">
-                        <h4>💬 댓글 (${idea.comments.length})</h4>
-                        <div class="comments-list">${commentsHtml || '<p style="color: var(--text-secondary); font-size: 0.875rem;">댓글이 없습니다.</p>'}</div>
+                        <h4>💬 댓글 (<span class="comment-count">${idea.comment_count}</span>)</h4>
+                        <div class="comments-list"></div>
                         <div class="comment-form">
                             <input type="text" id="commentAuthor-${idea.id}" placeholder="작성자" style="flex: 0 0 100px;">
                             <input type="text" id="commentContent-${idea.id}" placeholder="댓글을 입력하세요...">
@@ -804,7 +953,12 @@ const App = {
         await API.createComment(ideaId, { author, content });
         authorInput.value = '';
         contentInput.value = '';
-        await this.loadIdeas();
+        const idea = this.ideas.find(i => i.id === ideaId);
+        if (idea) {
+            idea.comment_count += 1;
+            document.querySelector(`.idea-card[data-id="${ideaId}"] .comment-count`).textContent = idea.comment_count;
+        }
+        await this.loadComments(ideaId);
     },
 
     // Export
@@ -934,7 +1088,7 @@ const App = {
     // Export DB
     async exportDb() {
         try {
-            const response = await fetch('/api/export-db');
+            const response = await fetch('/api/export-db?compress=gzip');
             if (!response.ok) {
                 throw new Error('DB 내보내기 실패');
             }
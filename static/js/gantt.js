@@ -4,6 +4,11 @@ const GanttChart = {
     viewMode: 'Month',
     currentTasks: [],
     currentYear: null,
+    // Items are fetched a few months at a time; more are fetched as the timeline is scrolled right
+    windowMonths: 3,
+    items: new Map(),
+    loadedEnd: null,
+    loading: null,
 
     init() {
         // Setup view mode buttons
@@ -19,6 +24,11 @@ const GanttChart = {
             });
         });
 
+        // Fetch the next window when the timeline is scrolled near its right edge (scroll events don't bubble)
+        document.getElementById('gantt').addEventListener('scroll', (e) => {
+            this.handleScroll(e.target);
+        }, true);
+
         // Update year dropdown based on available years
         this.updateYearDropdown();
     },
@@ -35,7 +45,7 @@ const GanttChart = {
         }
     },
 
-    scrollToSelectedDate() {
+    async scrollToSelectedDate() {
         if (!this.chart) return;
 
         const yearSelect = document.getElementById('ganttScrollYear');
@@ -49,6 +59,10 @@ const GanttChart = {
         const targetMonth = (quarter - 1) * 3;
         const targetDate = new Date(year, targetMonth, 1);
 
+        // Make sure the quarter has been fetched before scrolling to it
+        await this.loadUntil(this.toISO(new Date(Date.UTC(year, targetMonth + 3, 0))));
+        if (!this.chart) return;
+
         // Use Frappe Gantt's set_scroll_position method
         this.chart.set_scroll_position(targetDate);
     },
@@ -104,39 +118,24 @@ const GanttChart = {
         this.currentYear = year;
 
         // Define date range: from start of selected year to end of next year
-        const rangeStart = `${year}-01-01`;
-        const rangeEnd = `${year + 1}-12-31`;
+        this.rangeStart = `${year}-01-01`;
+        this.rangeEnd = `${year + 1}-12-31`;
 
-        try {
-            const data = await API.getGanttData({ year });
+        // A newer update() call makes earlier fetches stop drawing
+        const token = this.updateToken = (this.updateToken || 0) + 1;
+        this.items = new Map();
+        this.loadedEnd = null;
+        this.loading = null;
+        this.chart = null;
+        this.currentTasks = [];
 
-            // Filter out items without dates and clamp to year range
-            let tasks = data
-                .filter(item => item.start && item.end)
-                .filter(item => {
-                    // Only include tasks that overlap with our range
-                    return item.end >= rangeStart && item.start <= rangeEnd;
-                })
-                .map(item => {
-                    // Clamp dates to the range
-                    let start = item.start;
-                    let end = item.end;
-
-                    if (start < rangeStart) start = rangeStart;
-                    if (end > rangeEnd) end = rangeEnd;
-
-                    return {
-                        id: item.id,
-                        name: item.name,
-                        start: start,
-                        end: end,
-                        progress: item.progress,
-                        dependencies: item.dependencies || '',
-                        custom_class: this.getCustomClass(item)
-                    };
-                });
-
-            if (tasks.length === 0) {
+        try {
+            await this.loadUntil(this.addMonths(this.rangeStart, this.windowMonths * 2));
+            // Nothing in the first window: look at the rest of the range in one go before giving up
+            if (this.currentTasks.length === 0) {
+                await this.loadUntil(this.rangeEnd);
+            }
+            if (token === this.updateToken && this.currentTasks.length === 0) {
                 container.innerHTML = `
                     <div class="empty-state">
                         <div class="empty-state-icon">📅</div>
@@ -144,13 +143,7 @@ const GanttChart = {
                         <p>목표에 시작일과 종료일을 설정해주세요.</p>
                     </div>
                 `;
-                this.chart = null;
-                this.currentTasks = [];
-                return;
             }
-
-            this.currentTasks = tasks;
-            this.renderChart(tasks);
         } catch (error) {
             console.error('Gantt chart error:', error);
             container.innerHTML = `
@@ -163,6 +156,146 @@ const GanttChart = {
         }
     },
 
+    // Fetch windows until everything up to `end` (clamped to the range) is loaded
+    async loadUntil(end) {
+        const token = this.updateToken;
+        if (end > this.rangeEnd) end = this.rangeEnd;
+        while (token === this.updateToken && (this.loadedEnd === null || this.loadedEnd < end)) {
+            if (!this.loading) {
+                const start = this.loadedEnd === null ? this.rangeStart : this.addDays(this.loadedEnd, 1);
+                this.loading = this.loadWindow(token, start, end).finally(() => {
+                    if (token === this.updateToken) this.loading = null;
+                });
+            }
+            await this.loading;
+        }
+    },
+
+    async loadWindow(token, start, end) {
+        // The columnar format is several times smaller than the item list and quicker to parse. Chunks arrive
+        // per batch of rows; the chart is drawn from the first one and refreshed once the window is in
+        const ids = [];
+        await API.streamGanttData({ year: this.currentYear, start, end }, (chunk) => {
+            if (token !== this.updateToken) return;
+            this.decodeColumnar(chunk, ids).forEach(item => this.items.set(item.id, item));
+            if (!this.chart) this.showItems();
+        });
+        if (token !== this.updateToken) return;
+        this.loadedEnd = end;
+        this.showItems();
+    },
+
+    // Items of a format=columnar chunk, as the default format would have sent them. `ids` holds the item ids
+    // of the earlier chunks of the same response, which parent indexes may point into; this chunk's are added
+    decodeColumnar(data, ids) {
+        const base = data.base ? Date.parse(`${data.base}T00:00:00Z`) : 0;
+        const dates = new Map();
+        const toDate = (offset) => {
+            if (offset === null) return null;
+            if (!dates.has(offset)) dates.set(offset, this.toISO(new Date(base + offset * 86400000)));
+            return dates.get(offset);
+        };
+        // Milestones and tasks are indented under their parents, as in the default format
+        const indents = { goal: '', milestone: '  ', task: '    ' };
+        const first = ids.length;
+        data.id.forEach((id, i) => ids.push(`${data.types[data.type[i]]}-${id}`));
+        return data.id.map((_, i) => {
+            const type = data.types[data.type[i]];
+            const item = {
+                id: ids[first + i],
+                name: indents[type] + data.name[i],
+                start: toDate(data.start[i]),
+                end: toDate(data.end[i]),
+                progress: data.progress[i],
+                type
+            };
+            if (type === 'goal') item.goal_type = data.goal_type[i];
+            item.dependencies = data.parent[i] === null ? '' : ids[data.parent[i]];
+            return item;
+        });
+    },
+
+    handleScroll(scroller) {
+        if (!this.chart || this.loading || this.loadedEnd === null || this.loadedEnd >= this.rangeEnd) return;
+        this.scroller = scroller;
+        // Within one screen of the right edge
+        if (scroller.scrollLeft + scroller.clientWidth * 2 >= scroller.scrollWidth) {
+            this.loadUntil(this.addMonths(this.addDays(this.loadedEnd, 1), this.windowMonths)).catch(error => {
+                console.error('Gantt chart error:', error);
+            });
+        }
+    },
+
+    showItems() {
+        const rangeStart = this.rangeStart;
+        const rangeEnd = this.rangeEnd;
+        // Windows are fetched separately, so put the items back in goal > milestone > task order
+        const order = (item) => {
+            const id = parseInt(item.id.split('-')[1]);
+            if (item.type === 'goal') return [id, 0, 0];
+            if (item.type === 'milestone') return [parseInt(item.dependencies.split('-')[1]), id, 0];
+            const milestone = this.items.get(item.dependencies);
+            return [milestone ? order(milestone)[0] : 0, parseInt(item.dependencies.split('-')[1]), id];
+        };
+        const keyed = Array.from(this.items.values()).map(item => ({ item, key: order(item) }));
+        keyed.sort((a, b) => a.key[0] - b.key[0] || a.key[1] - b.key[1] || a.key[2] - b.key[2]);
+
+        const tasks = keyed.map(entry => entry.item)
+            // Filter out items without dates and clamp to year range
+            .filter(item => item.start && item.end)
+            .filter(item => {
+                // Only include tasks that overlap with our range
+                return item.end >= rangeStart && item.start <= rangeEnd;
+            })
+            .map(item => {
+                // Clamp dates to the range
+                let start = item.start;
+                let end = item.end;
+
+                if (start < rangeStart) start = rangeStart;
+                if (end > rangeEnd) end = rangeEnd;
+
+                return {
+                    id: item.id,
+                    name: item.name,
+                    start: start,
+                    end: end,
+                    progress: item.progress,
+                    dependencies: item.dependencies || '',
+                    custom_class: this.getCustomClass(item)
+                };
+            });
+
+        if (tasks.length === 0) return;
+        this.currentTasks = tasks;
+        if (!this.chart) {
+            this.renderChart(tasks);
+            return;
+        }
+        // Keep the timeline where the user left it
+        const scrollLeft = this.scroller ? this.scroller.scrollLeft : 0;
+        this.chart.refresh(tasks);
+        if (this.scroller) this.scroller.scrollLeft = scrollLeft;
+    },
+
+    toISO(date) {
+        return date.toISOString().slice(0, 10);
+    },
+
+    addDays(iso, days) {
+        const date = new Date(`${iso}T00:00:00Z`);
+        date.setUTCDate(date.getUTCDate() + days);
+        return this.toISO(date);
+    },
+
+    // Last day of the `months` months starting at `iso`
+    addMonths(iso, months) {
+        const date = new Date(`${iso}T00:00:00Z`);
+        date.setUTCMonth(date.getUTCMonth() + months);
+        date.setUTCDate(date.getUTCDate() - 1);
+        return this.toISO(date);
+    },
+
     getCustomClass(item) {
         if (item.type === 'goal') {
             return item.goal_type === 'issue' ? 'bar-issue' : 'bar-feature';
@@ -9,7 +9,8 @@ const GoalManager = {
 
     async update(year) {
         this.currentYear = year;
-        this.goals = await API.getGoals({ year });
+        // Cards only show goal fields, so skip the milestone/task tree
+        this.goals = await API.getGoals({ year, depth: 'goal' });
         this.render();
     },
 